@@ -0,0 +1,54 @@
+# benchmarks/bench_comunicados.py
+"""
+Mede o tempo de extração dos comunicados em páginas do portal SICOM salvas em disco, comparando com
+a construção da árvore completa da página pelo html.parser (o custo mínimo da análise anterior).
+
+Uso: python benchmarks/bench_comunicados.py [--repeticoes N] [--limite N] [PAGINA.html ...]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from services.comunicados_service import _extrair_comunicados  # noqa: E402
+
+PAGINA_PADRAO = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'comunicados_sicom.html')
+
+
+def medir(funcao, repeticoes: int):
+    funcao()  # primeira execução: compilação das expressões e caches do BeautifulSoup
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def resumo(tempos) -> str:
+    return f"mediana {statistics.median(tempos):.2f} ms | média {statistics.mean(tempos):.2f} ms | máx {max(tempos):.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paginas", nargs="*", default=[PAGINA_PADRAO])
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--limite", type=int, default=5)
+    args = parser.parse_args()
+
+    for caminho in args.paginas:
+        with open(caminho, encoding="utf-8") as arquivo:
+            html = arquivo.read()
+        arvore = medir(lambda: BeautifulSoup(html, 'html.parser').find_all('article', class_='post'), args.repeticoes)
+        extracao = medir(lambda: _extrair_comunicados(html, args.limite), args.repeticoes)
+        print(f"{os.path.basename(caminho)} ({len(html.encode())} bytes, limite {args.limite}, {args.repeticoes} repetições)")
+        print(f"  árvore completa:       {resumo(arvore)}")
+        print(f"  _extrair_comunicados:  {resumo(extracao)}")
+
+
+if __name__ == "__main__":
+    main()
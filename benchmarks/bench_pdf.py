@@ -0,0 +1,65 @@
+# benchmarks/bench_pdf.py
+"""
+Mede o tempo de geração dos PDFs de horas extras.
+
+Uso: python benchmarks/bench_pdf.py [--repeticoes N] [--dias N] [--perfil compacto|original]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.pdf_service import gerar_pdf_horas_extras, PDF_PERFIL  # noqa: E402
+
+
+def dados_formulario(quantidade_dias: int) -> dict:
+    return {
+        "dados_colaborador": {
+            "nome": "Fulano de Tal", "nome_departamento": "Contabilidade",
+            "nome_cargo": "Analista", "nome_responsavel": "Responsável Silva",
+        },
+        "detalhes_selecionados": [
+            {
+                "data": date(2025, 3, 1) + timedelta(days=i),
+                "batidas_str": "08:00 - 12:00 - 13:00 - 19:00",
+                "horas_extras_timedelta": timedelta(hours=2),
+            }
+            for i in range(quantidade_dias)
+        ],
+        "justificativa": "Fechamento do balanço mensal.\n" * 3,
+        "atividades": "Conciliação bancária e lançamentos contábeis.\n" * 3,
+    }
+
+
+def medir(funcao, dados, repeticoes: int, **kwargs):
+    tamanho = funcao(dados, **kwargs).getbuffer().nbytes  # primeira execução: importações e caches do processo
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(dados, **kwargs)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos, tamanho
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=10)
+    parser.add_argument("--perfil", default=PDF_PERFIL)
+    args = parser.parse_args()
+
+    tempos, tamanho = medir(gerar_pdf_horas_extras, dados_formulario(args.dias), args.repeticoes, perfil=args.perfil)
+    print(
+        f"gerar_pdf_horas_extras ({args.dias} dia(s), perfil {args.perfil}, {args.repeticoes} repetições): "
+        f"{tamanho} bytes | "
+        f"mediana {statistics.median(tempos):.1f} ms | média {statistics.mean(tempos):.1f} ms | "
+        f"mín {min(tempos):.1f} ms | máx {max(tempos):.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,8 @@ FORUM_LINKS = {
 
     # RH
     #"bancohoras": "https://discord.com/channels/<server_id>/<forum_id>/<topic_id_bancohoras>",
+    #"relatorio-equipe": "https://discord.com/channels/<server_id>/<forum_id>/<topic_id_relatorio_equipe>",
+    #"fechamento-horas": "https://discord.com/channels/<server_id>/<forum_id>/<topic_id_fechamento_horas>",
 
     # Gerenciamento
     #"definir-responsavel": "https://discord.com/channels/<server_id>/<forum_id>/<topic_id_definir_responsavel>",
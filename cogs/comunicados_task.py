@@ -4,48 +4,54 @@ from discord import app_commands
 from discord.ext import commands, tasks
 import logging
 import os
-from datetime import time
+from datetime import datetime, time
 from zoneinfo import ZoneInfo
 
 # Importando das outras camadas
-from services.comunicados_service import fetch_ultimos_comunicados
+from services.comunicados_service import (
+    PoliticaConsulta, atualizar_comunicados_recentes, espera_solicitada, obter_comunicados_recentes, percorrer_paginas,
+)
 from views.comunicado_sicom_view import insere_comunicado_embed
-from database.queries import verifica_comunicado_postado , marcar_comunicado_postado
+from database.queries import existem_comunicados_registrados, reservar_comunicados, liberar_comunicados
 
 logger = logging.getLogger(__name__)
 
-# Horários para a tarefa ser executada (no fuso horário do servidor)
+# Limite de embeds em uma mensagem do Discord
+EMBEDS_POR_MENSAGEM = 10
+
 FUSO_SAO_PAULO = ZoneInfo("America/Sao_Paulo")
-# Carrega os horários do .env, com um valor padrão caso não esteja definido
-# Exemplo: "09:00,14:00" para verificar às 9h e 14h
-horarios_str = os.getenv("COMUNICADOS_HORARIOS", "09:00,14:00")
-VERIFICA_HORARIOS = []
 
-try:
-    # Separa a string por vírgulas, ex: "09:00,14:00" -> ["09:00", "14:00"]
-    times_str_list = [t.strip() for t in horarios_str.split(',') if t.strip()]
-    for t_str in times_str_list:
-        # Separa cada horário por dois pontos, ex: "09:00" -> [9, 0]
-        h, m = map(int, t_str.split(':'))
-        VERIFICA_HORARIOS.append(time(hour=h, minute=m, tzinfo=FUSO_SAO_PAULO))
-    
-    if not VERIFICA_HORARIOS:
-        raise ValueError("A variável de horários está vazia.")
-
-    logger.info(f"Tarefa de comunicados agendada para os seguintes horários (America/Sao_Paulo): {times_str_list}")
+# Intervalos, em segundos, entre as consultas ao portal (ver PoliticaConsulta)
+INTERVALO_MINIMO = float(os.getenv("COMUNICADOS_INTERVALO_MINIMO", "120"))
+INTERVALO_MAXIMO = float(os.getenv("COMUNICADOS_INTERVALO_MAXIMO", "900"))
+INTERVALO_FORA_EXPEDIENTE = float(os.getenv("COMUNICADOS_INTERVALO_FORA_EXPEDIENTE", "3600"))
+INTERVALO_ERRO_MAXIMO = float(os.getenv("COMUNICADOS_INTERVALO_ERRO_MAXIMO", "3600"))
+# Páginas anteriores da listagem percorridas quando surgem comunicados novos (limita a primeira execução)
+PAGINAS_MAXIMAS = int(os.getenv("COMUNICADOS_PAGINAS_MAXIMAS", "3"))
 
+# Expediente do portal, de segunda a sexta (America/Sao_Paulo). Exemplo: "08:00-18:00"
+expediente_str = os.getenv("COMUNICADOS_EXPEDIENTE", "08:00-18:00")
+try:
+    inicio_str, fim_str = expediente_str.split('-')
+    INICIO_EXPEDIENTE = datetime.strptime(inicio_str.strip(), "%H:%M").time()
+    FIM_EXPEDIENTE = datetime.strptime(fim_str.strip(), "%H:%M").time()
+    if INICIO_EXPEDIENTE >= FIM_EXPEDIENTE:
+        raise ValueError("o início do expediente deve ser anterior ao fim.")
 except Exception as e:
-    logger.error(f"Formato inválido para COMUNICADOS_HORARIOS ('{horarios_str}'). Usando horários padrão (09:00/14:00). Erro: {e}")
-    # Se houver qualquer erro no formato, usa um horário padrão seguro.
-    VERIFICA_HORARIOS = [
-        time(hour=9, minute=0, tzinfo=FUSO_SAO_PAULO),
-        time(hour=14, minute=00, tzinfo=FUSO_SAO_PAULO)
-    ]
+    logger.error(f"Formato inválido para COMUNICADOS_EXPEDIENTE ('{expediente_str}'). Usando o padrão (08:00-18:00). Erro: {e}")
+    INICIO_EXPEDIENTE, FIM_EXPEDIENTE = time(hour=8), time(hour=18)
 
 class ComunicadoSicom(commands.Cog):
     """Cog para gerenciar comunicados do SICOM."""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._snapshot_renderizado = None
+        self._embeds_renderizados = []
+        self._ultimo_snapshot = None
+        self.politica = PoliticaConsulta(
+            INTERVALO_MINIMO, INTERVALO_MAXIMO, INTERVALO_FORA_EXPEDIENTE, INTERVALO_ERRO_MAXIMO,
+            INICIO_EXPEDIENTE, FIM_EXPEDIENTE,
+        )
         self.channel_id = int(os.getenv("COMUNICADOS_SICOM_ID", "0"))
         if not self.channel_id:
             logger.error("NEWS_CHANNEL_ID não está configurado no .env! A tarefa de notícias não será iniciada.")
@@ -56,40 +62,97 @@ class ComunicadoSicom(commands.Cog):
         """Função chamada quando o Cog é descarregado, para parar a tarefa."""
         self.verifica_comunicados.cancel()
 
-    @tasks.loop(time=VERIFICA_HORARIOS)
+    @tasks.loop(seconds=INTERVALO_MINIMO)
     async def verifica_comunicados(self):
-        """Tarefa que verifica por novos comunicados do SICOM."""
-        logger.info("Executando a tarefa de verificação de comunicados do SICOM...")
-        
+        """Tarefa que verifica por novos comunicados do SICOM, espaçando as consultas conforme a política."""
+        try:
+            novos = await self._verificar()
+        except Exception as e:
+            espera = espera_solicitada(e)
+            self.politica.registrar_erro(espera)
+            logger.warning(f"Falha ao verificar comunicados do SICOM ({self.politica.erros_seguidos}ª seguida): {e}")
+        else:
+            if novos:
+                self.politica.registrar_novidade()
+            else:
+                self.politica.registrar_sem_novidade()
+
+        proxima = self.politica.proxima_espera(datetime.now(FUSO_SAO_PAULO))
+        logger.debug(f"Próxima verificação de comunicados do SICOM em {proxima:.0f} s.")
+        self.verifica_comunicados.change_interval(seconds=proxima)
+
+    async def _verificar(self) -> int:
+        """Consulta o portal e posta os comunicados ainda não publicados; devolve quantos foram postados."""
         channel = self.bot.get_channel(self.channel_id)
         if not channel:
             logger.error("Não foi possível encontrar o canal de notícias com ID %s.", self.channel_id)
-            return
+            return 0
 
-        # Busca apenas os 2 comunicados mais recentes para a verificação diária
-        ultimos_comunicados = await fetch_ultimos_comunicados(limit=2)
+        # Consulta o portal (renovando também o snapshot do /comunicados)
+        ultimos_comunicados = await atualizar_comunicados_recentes()
         if not ultimos_comunicados:
-            logger.warning("Não foi possível buscar comunicados do SICOM na tarefa agendada.")
-            return
-
-        # Itera sobre os comunicados encontrados para verificar se são novos
-        for comunicados in ultimos_comunicados:
-            is_posted = await verifica_comunicado_postado(comunicados['link'])
-
-            if not is_posted:
-                logger.info("Novo comunicado encontrado: %s", comunicados['titulo_comunicado'])
-                embed = insere_comunicado_embed(comunicados)
-
-                try:
-                    await channel.send(content="@everyone, um novo comunicado do SICOM foi publicado!", embed=embed)
-                    await marcar_comunicado_postado(comunicados['link'], comunicados['titulo_comunicado'], comunicados['data_comunicado'])
-                    logger.info("Novo comunicado '%s' enviado com sucesso para o Discord.", comunicados['titulo_comunicado'])
-                except discord.Forbidden:
-                    logger.error("Permissão negada para enviar mensagem no canal %s.", channel.name)
-                except Exception as e:
-                    logger.error("Erro ao enviar novo comunicado: %s", e, exc_info=True)
+            raise RuntimeError("a página de comunicados do SICOM não tem a estrutura esperada.")
+        if ultimos_comunicados == self._ultimo_snapshot:
+            # Nada mudou no topo da listagem: nem o banco precisa ser consultado
+            return 0
+
+        if self._ultimo_snapshot is None and not await self._historico_registrado():
+            self._ultimo_snapshot = ultimos_comunicados
+            return 0
+
+        # Registra página a página; uma página com algum comunicado já registrado encerra a busca
+        novos = []
+        async for comunicados in percorrer_paginas(PAGINAS_MAXIMAS):
+            reservados = await reservar_comunicados(comunicados)
+            if reservados is None:
+                await liberar_comunicados([comunicado['link'] for comunicado in novos])
+                raise RuntimeError("não foi possível registrar os comunicados no banco.")
+            novos.extend(reservados)
+            if len(reservados) < len({comunicado['link'] for comunicado in comunicados}):
+                break
+        self._ultimo_snapshot = ultimos_comunicados
+        if not novos:
+            logger.info("Nenhum comunicado novo do SICOM.")
+            return 0
+
+        # Os mais antigos primeiro, para que o canal fique em ordem cronológica
+        novos.reverse()
+        for inicio in range(0, len(novos), EMBEDS_POR_MENSAGEM):
+            lote = novos[inicio:inicio + EMBEDS_POR_MENSAGEM]
+            aviso = (
+                "@everyone, um novo comunicado do SICOM foi publicado!" if len(lote) == 1
+                else f"@everyone, {len(lote)} novos comunicados do SICOM foram publicados!"
+            )
+            try:
+                await channel.send(content=aviso, embeds=[insere_comunicado_embed(comunicado) for comunicado in lote])
+            except discord.Forbidden:
+                logger.error("Permissão negada para enviar mensagem no canal %s.", channel.name)
+            except Exception as e:
+                logger.error("Erro ao enviar novos comunicados: %s", e, exc_info=True)
             else:
-                logger.info("O comunicado '%s' já foi postado. Ignorando.", comunicados['titulo_comunicado'])
+                logger.info("%d novo(s) comunicado(s) enviado(s) para o Discord: %s", len(lote), [c['titulo_comunicado'] for c in lote])
+                continue
+            # A próxima verificação tenta de novo os comunicados que não chegaram ao canal
+            await liberar_comunicados([comunicado['link'] for comunicado in novos[inicio:]])
+            self._ultimo_snapshot = None
+            return inicio
+        return len(novos)
+
+    async def _historico_registrado(self) -> bool:
+        """
+        Com a tabela de comunicados vazia (primeira execução), registra os comunicados da primeira página
+        sem postá-los: o canal não recebe o histórico do portal de uma vez, só o que for publicado depois.
+        """
+        registrados = await existem_comunicados_registrados()
+        if registrados is None:
+            raise RuntimeError("não foi possível consultar os comunicados registrados no banco.")
+        if registrados:
+            return True
+        async for comunicados in percorrer_paginas(1):
+            if await reservar_comunicados(comunicados) is None:
+                raise RuntimeError("não foi possível registrar os comunicados no banco.")
+            logger.info(f"Tabela de comunicados vazia: {len(comunicados)} comunicado(s) atuais registrados sem postagem.")
+        return False
 
     @verifica_comunicados.before_loop
     async def before_verifica_comunicados(self):
@@ -101,15 +164,21 @@ class ComunicadoSicom(commands.Cog):
         """Comando que busca e exibe os últimos 5 comunicados."""
         await interaction.response.defer(ephemeral=True)
         
-        comunicados = await fetch_ultimos_comunicados(limit=5)
+        comunicados = await obter_comunicados_recentes()
         
         if not comunicados:
             await interaction.followup.send("❌ Não foi possível buscar os comunicados no momento. Tente novamente mais tarde.", ephemeral=True)
             return
 
-        embeds = [insere_comunicado_embed(com) for com in comunicados]
+        await interaction.followup.send("Aqui estão os últimos 5 comunicados do SICOM:", embeds=self._embeds(comunicados)[:5], ephemeral=True)
 
-        await interaction.followup.send("Aqui estão os últimos 5 comunicados do SICOM:", embeds=embeds, ephemeral=True)
+    def _embeds(self, comunicados) -> list:
+        """Embeds do snapshot atual, montados uma única vez por snapshot."""
+        # As verificações periódicas renovam o snapshot a cada poucos minutos, quase sempre com o mesmo conteúdo
+        if comunicados != self._snapshot_renderizado:
+            self._embeds_renderizados = [insere_comunicado_embed(com) for com in comunicados]
+            self._snapshot_renderizado = comunicados
+        return self._embeds_renderizados
 
 async def setup(bot: commands.Bot):
     """Função de setup para carregar o Cog."""
@@ -0,0 +1,36 @@
+# cogs/email_task.py
+from discord.ext import commands, tasks
+import logging
+import os
+
+from services.email_service import caixa_saida_email
+
+logger = logging.getLogger(__name__)
+
+# Intervalo, em segundos, entre as varreduras da caixa de saída (novas tentativas e e-mails de outras instâncias)
+EMAIL_OUTBOX_INTERVALO = float(os.getenv("EMAIL_OUTBOX_INTERVALO", "15"))
+
+
+class EmailTask(commands.Cog):
+    """Cog que envia periodicamente os e-mails pendentes da caixa de saída."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.envia_emails.start()
+
+    def cog_unload(self):
+        """Para o envio periódico quando o Cog é descarregado."""
+        self.envia_emails.cancel()
+
+    @tasks.loop(seconds=EMAIL_OUTBOX_INTERVALO)
+    async def envia_emails(self):
+        """Envia os e-mails cuja próxima tentativa já venceu."""
+        await caixa_saida_email.processar()
+
+    @envia_emails.before_loop
+    async def antes_do_envio(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(EmailTask(bot))
+    logger.info("Cog 'EmailTask' carregado com sucesso.")
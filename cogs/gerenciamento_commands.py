@@ -1,22 +1,52 @@
 # cogs/gerenciamento_commands.py
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
-from typing import List
-from services.portal_service import PortalDatabaseService
+import os
+from typing import List, Optional
+from services.portal_service import portal_service
+from services.equipes_catalogo import catalogo_equipes
 from database.bot_queries import definir_responsavel, remover_responsavel, listar_todos_responsaveis
 
 logger = logging.getLogger(__name__)
 
+# Intervalo (em minutos) entre as atualizações do catálogo de equipes em memória
+INTERVALO_CATALOGO_EQUIPES = int(os.getenv("EQUIPES_CATALOGO_INTERVALO_MIN", "30"))
+
+async def nome_corporativo(portal_db, discord_id: int) -> Optional[str]:
+    """
+    Nome do colaborador no portal corporativo, se a consulta der certo. Sem ele o mapeamento é
+    salvo do mesmo jeito: o nome é preenchido depois, na primeira consulta de um liderado.
+    """
+    try:
+        perfil = await portal_db.buscar_dados_colaborador_por_discord_id_async(discord_id)
+    except Exception as e:
+        logger.warning(f"Não foi possível buscar o nome corporativo de {discord_id}: {e}")
+        return None
+    return perfil['nome'] if perfil else None
+
 class GerenciamentoCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.portal_db = PortalDatabaseService()
+        self.portal_db = portal_service
+        self.atualiza_catalogo_equipes.start()
+
+    def cog_unload(self):
+        """Para a atualização periódica do catálogo quando o Cog é descarregado."""
+        self.atualiza_catalogo_equipes.cancel()
+
+    @tasks.loop(minutes=INTERVALO_CATALOGO_EQUIPES)
+    async def atualiza_catalogo_equipes(self):
+        """Mantém o snapshot de equipes usado pelo autocomplete e pela listagem."""
+        try:
+            await catalogo_equipes.atualizar()
+        except Exception as e:
+            logger.error(f"Falha ao atualizar o catálogo de equipes: {e}", exc_info=True)
 
     # --- Autocomplete para o nome da equipe ---
     async def equipe_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-        equipes = self.portal_db.buscar_equipes_autocomplete(current)
+        equipes = await catalogo_equipes.autocompletar(current, limite=25)
         return [app_commands.Choice(name=equipe['descricao'], value=str(equipe['id'])) for equipe in equipes][:25]
 
     # === COMANDOS DE ADMIN ===
@@ -25,11 +55,15 @@ class GerenciamentoCommands(commands.Cog):
     @app_commands.checks.has_role("ADM") # <-- Defina o cargo de admin aqui
     async def definir_responsavel(self, interaction: discord.Interaction, equipe: str, responsavel: discord.Member):
         equipe_id = int(equipe)
-        success = await definir_responsavel(equipe_id, responsavel.id)
+        await interaction.response.defer(ephemeral=True)
+
+        # Guarda o nome corporativo junto do mapeamento para não consultá-lo a cada /bancohoras
+        nome_responsavel = await nome_corporativo(self.portal_db, responsavel.id)
+        success = await definir_responsavel(equipe_id, responsavel.id, nome_responsavel)
         if success:
-            await interaction.response.send_message(f"✅ {responsavel.mention} foi definido como responsável pela equipe selecionada.", ephemeral=True)
+            await interaction.followup.send(f"✅ {responsavel.mention} foi definido como responsável pela equipe selecionada.", ephemeral=True)
         else:
-            await interaction.response.send_message("❌ Erro ao definir responsável.", ephemeral=True)
+            await interaction.followup.send("❌ Erro ao definir responsável.", ephemeral=True)
 
     @app_commands.command(name="remover-responsavel", description="[Admin] Remove o responsável de uma equipe.")
     @app_commands.autocomplete(equipe=equipe_autocomplete)
@@ -49,7 +83,7 @@ class GerenciamentoCommands(commands.Cog):
         
         # Busca os mapeamentos do nosso banco e as equipes do banco corporativo
         mapeamentos = await listar_todos_responsaveis()
-        todas_as_equipes = self.portal_db.buscar_todas_equipes()
+        todas_as_equipes = await catalogo_equipes.todas()
 
         mapa_responsaveis = {map['equipe_id']: map['responsavel_discord_id'] for map in mapeamentos}
         
@@ -0,0 +1,53 @@
+# cogs/ledger_task.py
+from discord.ext import commands, tasks
+import logging
+import os
+from datetime import time
+from zoneinfo import ZoneInfo
+
+from services.ledger_service import ledger_horas_extras
+
+logger = logging.getLogger(__name__)
+
+FUSO_SAO_PAULO = ZoneInfo("America/Sao_Paulo")
+horario_str = os.getenv("LEDGER_HORARIO", "02:00")
+try:
+    h, m = map(int, horario_str.split(':'))
+    HORARIO_SINCRONIZACAO = time(hour=h, minute=m, tzinfo=FUSO_SAO_PAULO)
+except ValueError:
+    logger.error(f"Formato inválido para LEDGER_HORARIO ('{horario_str}'). Usando o horário padrão (02:00).")
+    HORARIO_SINCRONIZACAO = time(hour=2, minute=0, tzinfo=FUSO_SAO_PAULO)
+
+
+class LedgerTask(commands.Cog):
+    """Cog que sincroniza toda noite o ledger local de horas extras a partir do ponto corporativo."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.sincroniza_ledger.start()
+
+    def cog_unload(self):
+        """Para a sincronização agendada quando o Cog é descarregado."""
+        self.sincroniza_ledger.cancel()
+
+    @tasks.loop(time=HORARIO_SINCRONIZACAO)
+    async def sincroniza_ledger(self):
+        """Sincroniza os dias fechados desde a última execução."""
+        try:
+            await ledger_horas_extras.sincronizar()
+        except Exception as e:
+            logger.error(f"Falha ao sincronizar o ledger de horas extras: {e}", exc_info=True)
+
+    @sincroniza_ledger.before_loop
+    async def antes_da_sincronizacao(self):
+        """Na inicialização, recupera o atraso caso a última sincronização noturna não tenha rodado."""
+        await self.bot.wait_until_ready()
+        try:
+            if not await ledger_horas_extras.sincronizado():
+                await ledger_horas_extras.sincronizar()
+        except Exception as e:
+            logger.error(f"Falha ao recuperar a sincronização do ledger de horas extras: {e}", exc_info=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(LedgerTask(bot))
+    logger.info("Cog 'LedgerTask' carregado com sucesso.")
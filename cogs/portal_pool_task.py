@@ -0,0 +1,40 @@
+# cogs/portal_pool_task.py
+from discord.ext import commands, tasks
+import logging
+import os
+
+from services.portal_service import portal_service
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (em minutos) entre as verificações das conexões ociosas do pool corporativo
+INTERVALO_VERIFICACAO_POOL = int(os.getenv("CORP_DB_VERIFICACAO_INTERVALO_MIN", "5"))
+
+
+class PortalPoolTask(commands.Cog):
+    """Cog que valida periodicamente as conexões ociosas do pool com o banco corporativo."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.verifica_pool_corporativo.start()
+
+    def cog_unload(self):
+        """Para a verificação periódica quando o Cog é descarregado."""
+        self.verifica_pool_corporativo.cancel()
+
+    @tasks.loop(minutes=INTERVALO_VERIFICACAO_POOL)
+    async def verifica_pool_corporativo(self):
+        """Descarta conexões ociosas quebradas antes que um comando precise delas."""
+        try:
+            ativas = await portal_service.verificar_saude()
+            logger.debug(f"Pool corporativo verificado: {ativas} conexão(ões) ociosa(s) saudável(is).")
+        except Exception as e:
+            logger.error(f"Falha ao verificar as conexões do pool corporativo: {e}", exc_info=True)
+
+    @verifica_pool_corporativo.before_loop
+    async def antes_da_verificacao(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PortalPoolTask(bot))
+    logger.info("Cog 'PortalPoolTask' carregado com sucesso.")
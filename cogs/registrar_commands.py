@@ -3,7 +3,7 @@ from discord import app_commands
 from discord.ext import commands
 import logging
 from database import bot_queries
-from services.portal_service import PortalDatabaseService
+from services.portal_service import portal_service
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +19,7 @@ class RegistroColaboradorModal(discord.ui.Modal, title="Quem é que tá aí? 
     def __init__(self, user: discord.Member):
         super().__init__()
         self.user = user
-        self.portal = PortalDatabaseService()
+        self.portal = portal_service
 
     async def on_submit(self, interaction: discord.Interaction):
         cpf_str = str(self.cpf.value).strip()
@@ -36,7 +36,7 @@ class RegistroColaboradorModal(discord.ui.Modal, title="Quem é que tá aí? 
                 return
 
             # 2️⃣ Busca no portal corporativo
-            colaborador_portal = self.portal.buscar_colaborador_por_cpf(cpf_str)
+            colaborador_portal = await self.portal.buscar_colaborador_por_cpf_async(cpf_str)
             if not colaborador_portal:
                 await interaction.response.send_message(
                     "❌ CPF não encontrado no portal corporativo. Verifique e tente novamente.",
@@ -3,8 +3,16 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-from views.rh_view import BotoesSelecaoTipoView
-from services.portal_service import PortalDatabaseService
+from datetime import date, timedelta
+from typing import List
+from views.rh_view import BotoesSelecaoTipoView, formatar_timedelta
+from services.portal_service import portal_service
+from services.equipes_catalogo import catalogo_equipes
+from services.calculo_ponto import montar_relatorio_equipe
+from services.pdf_service import gerar_pdf_relatorio_equipe
+from services.pdf_pool import pool_pdf
+from services.pdf_storage import armazenamento_pdf
+from services.fechamento_service import fechamento_mensal
 from database import bot_queries
 
 from cogs.registrar_commands import RegistroColaboradorModal
@@ -14,7 +22,7 @@ logger = logging.getLogger(__name__)
 class RHCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.portal_db = PortalDatabaseService()
+        self.portal_db = portal_service
 
     @app_commands.command(name="bancohoras", description="Inicia o preenchimento do formulário de horas extras.")
     async def bancohoras(self, interaction: discord.Interaction):
@@ -31,6 +39,7 @@ class RHCommands(commands.Cog):
                 return
 
             colaborador = await self.portal_db.buscar_dados_completos_colaborador(interaction.user.id)
+            logger.debug(f"Cache de perfis: {self.portal_db.cache_perfis.estatisticas()}")
 
             # 3️⃣ Usuário já registrado → pode defer e continuar fluxo
             await interaction.response.defer(ephemeral=True)
@@ -58,5 +67,125 @@ class RHCommands(commands.Cog):
                 await interaction.response.send_message("❌ Ocorreu um erro durante a interação.", ephemeral=True)
 
 
+    # --- Autocomplete para o nome da equipe ---
+    async def equipe_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        equipes = await catalogo_equipes.autocompletar(current, limite=25)
+        return [app_commands.Choice(name=equipe['descricao'], value=str(equipe['id'])) for equipe in equipes]
+
+    @app_commands.command(name="relatorio-equipe", description="[Responsável] Gera o relatório de horas extras da sua equipe.")
+    @app_commands.autocomplete(equipe=equipe_autocomplete)
+    @app_commands.describe(
+        equipe="A equipe da qual você é responsável.",
+        dias="Quantidade de dias a considerar (1 a 90). Padrão: 30."
+    )
+    async def relatorio_equipe(self, interaction: discord.Interaction, equipe: str, dias: app_commands.Range[int, 1, 90] = 30):
+        """Consolida as horas extras de todos os membros de uma equipe em um embed e um PDF."""
+        await interaction.response.defer(ephemeral=True)
+        equipe_id = int(equipe)
+
+        # Apenas o responsável mapeado para a equipe (ou um ADM) pode ver o relatório
+        mapeamento = await bot_queries.buscar_responsavel_por_equipe(equipe_id)
+        eh_admin = any(role.name == "ADM" for role in getattr(interaction.user, "roles", []))
+        if not eh_admin and (not mapeamento or mapeamento['responsavel_discord_id'] != interaction.user.id):
+            await interaction.followup.send("❌ Apenas o responsável pela equipe pode gerar este relatório.", ephemeral=True)
+            return
+
+        data_fim = date.today()
+        data_inicio = data_fim - timedelta(days=dias)
+        try:
+            relatorio = await self.portal_db.buscar_horas_extras_equipe_async(equipe_id, data_inicio, data_fim)
+        except Exception as e:
+            logger.error(f"Erro ao buscar as batidas da equipe {equipe_id}: {e}", exc_info=True)
+            await interaction.followup.send("❌ Não foi possível consultar o ponto da equipe no momento.", ephemeral=True)
+            return
+
+        membros = relatorio['membros']
+        linhas = montar_relatorio_equipe(relatorio['dias'], membros)
+        linhas_resumo = linhas['membros']
+        total_equipe = sum((linha['total_horas_extras'] for linha in linhas_resumo), timedelta())
+        equipe_info = catalogo_equipes.obter(equipe_id)
+        nome_equipe = equipe_info['descricao'] if equipe_info else f"Equipe {equipe_id}"
+
+        embed = discord.Embed(
+            title=f"📊 Horas Extras — {nome_equipe}",
+            description=(
+                f"Período: **{data_inicio.strftime('%d/%m/%Y')}** a **{data_fim.strftime('%d/%m/%Y')}**\n"
+                f"Membros ativos: **{len(membros)}** | Com horas extras: **{len(linhas_resumo)}**\n"
+                f"Total da equipe: **{formatar_timedelta(total_equipe)}h**"
+            ),
+            color=discord.Color.blue()
+        )
+        if linhas_resumo:
+            maiores = [
+                f"**{linha['nome']}** — `{formatar_timedelta(linha['total_horas_extras'])}h` em {linha['dias']} dia(s)"
+                for linha in linhas_resumo[:10]
+            ]
+            embed.add_field(name="🔝 Maiores totais", value="\n".join(maiores), inline=False)
+        embed.set_footer(text="O detalhamento completo está no PDF em anexo.")
+
+        dados_relatorio = {
+            "nome_equipe": nome_equipe,
+            "data_inicio": data_inicio,
+            "data_fim": data_fim,
+            **linhas,
+        }
+        try:
+            pdf_stream = await pool_pdf.executar(gerar_pdf_relatorio_equipe, dados_relatorio)
+        except Exception as e:
+            logger.error(f"Erro ao gerar o PDF do relatório da equipe {equipe_id}: {e}", exc_info=True)
+            await interaction.followup.send(embed=embed, content="⚠️ Não foi possível gerar o PDF do relatório.", ephemeral=True)
+            return
+
+        nome_arquivo = f"Relatorio_HE_{equipe_id}_{data_fim.strftime('%d%m%Y')}.pdf"
+        await interaction.followup.send(embed=embed, file=discord.File(pdf_stream, filename=nome_arquivo), ephemeral=True)
+
+    @app_commands.command(name="fechamento-horas", description="[Admin] Consolida em um PDF as solicitações aprovadas de um mês.")
+    @app_commands.checks.has_role("ADM")
+    @app_commands.describe(
+        mes="Mês do fechamento (1 a 12). Padrão: mês anterior.",
+        ano="Ano do fechamento. Padrão: ano do mês anterior."
+    )
+    async def fechamento_horas(self, interaction: discord.Interaction,
+                               mes: app_commands.Range[int, 1, 12] = None, ano: app_commands.Range[int, 2000, 2100] = None):
+        """Gera o PDF do fechamento mensal: totais por colaborador e os documentos aprovados, com marcadores."""
+        await interaction.response.defer(ephemeral=True)
+
+        mes_anterior = date.today().replace(day=1) - timedelta(days=1)
+        data_inicio = date(ano or mes_anterior.year, mes or mes_anterior.month, 1)
+        data_fim = (data_inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        try:
+            fechamento = await fechamento_mensal.gerar(data_inicio, data_fim)
+        except Exception as e:
+            logger.error(f"Erro ao gerar o fechamento de {data_inicio:%m/%Y}: {e}", exc_info=True)
+            await interaction.followup.send("❌ Não foi possível gerar o fechamento do mês.", ephemeral=True)
+            return
+
+        if not fechamento:
+            await interaction.followup.send(f"ℹ️ Nenhuma solicitação aprovada em {data_inicio:%m/%Y}.", ephemeral=True)
+            return
+
+        total = sum((colaborador['total_horas_extras'] for colaborador in fechamento['colaboradores']), timedelta())
+        embed = discord.Embed(
+            title=f"📁 Fechamento de Horas Extras — {data_inicio:%m/%Y}",
+            description=(
+                f"Solicitações aprovadas: **{fechamento['solicitacoes']}**\n"
+                f"Colaboradores: **{len(fechamento['colaboradores'])}**\n"
+                f"Total de horas extras: **{formatar_timedelta(total)}h**"
+            ),
+            color=discord.Color.blue()
+        )
+
+        caminho_pdf = armazenamento_pdf.caminho(fechamento['pdf_hash'])
+        limite = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        if caminho_pdf.stat().st_size > limite:
+            embed.set_footer(text=f"O PDF excede o limite de anexos do Discord. Arquivo no servidor: {caminho_pdf}")
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
+        nome_arquivo = f"Fechamento_HE_{data_inicio:%m%Y}.pdf"
+        await interaction.followup.send(embed=embed, file=discord.File(caminho_pdf, filename=nome_arquivo), ephemeral=True)
+
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(RHCommands(bot))
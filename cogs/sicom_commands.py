@@ -1,14 +1,16 @@
 # cogs/sicom_commands.py
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
+import os
 from typing import Optional
 import unidecode
 import re
 
 # Importando da camada de Modelo (database)
 from database.queries import (
+    carregar_indices_autocomplete,
     fetch_municipio_autocomplete, 
     fetch_credenciais_por_id,
     fetch_administracao_autocomplete,
@@ -17,17 +19,39 @@ from database.queries import (
     insert_municipio,
     create_municipio_administracao_link,
     check_credencial,
-    insert_credencial
+    insert_credencial,
+    cache_credenciais
 )
 # Importando da camada de Visão
 from views.sicom_view import create_credentials_embed
 
 logger = logging.getLogger(__name__)
 
+# Intervalo (em minutos) entre as recargas dos índices dos autocompletes, que trazem
+# os cadastros feitos fora do bot (ex: carga_dados.py ou outra instância)
+INTERVALO_INDICES_AUTOCOMPLETE = int(os.getenv("SICOM_INDICES_INTERVALO_MIN", "10"))
+
 class SicomCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        """Carrega os índices dos autocompletes; se falhar, os autocompletes consultam o banco."""
+        await carregar_indices_autocomplete()
+        self.recarrega_indices_autocomplete.start()
+
+    def cog_unload(self):
+        """Para a recarga periódica dos índices quando o Cog é descarregado."""
+        self.recarrega_indices_autocomplete.cancel()
+
+    @tasks.loop(minutes=INTERVALO_INDICES_AUTOCOMPLETE)
+    async def recarrega_indices_autocomplete(self):
+        """Mantém os índices em memória alinhados com as tabelas de municípios e administrações."""
+        # A primeira iteração coincide com a carga feita no cog_load
+        if self.recarrega_indices_autocomplete.current_loop == 0:
+            return
+        await carregar_indices_autocomplete()
+
     def _formatar_e_validar_nome(self, nome: str) -> str:
         """
         Formata o nome do município e valida suas regras.
@@ -64,6 +88,7 @@ class SicomCommands(commands.Cog):
         
         municipio_id = int(municipio)
         results = await fetch_credenciais_por_id(municipio_id)
+        logger.debug(f"Cache de credenciais: {cache_credenciais.estatisticas()}")
 
         if not results:
             await interaction.followup.send("Nenhuma credencial encontrada para este município.", ephemeral=True)
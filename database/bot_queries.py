@@ -1,49 +1,21 @@
 # database/bot_queries.py
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime, date
-from sqlalchemy import select, insert, delete, update, or_
+from typing import AsyncIterator, Dict, List, Optional
+from datetime import datetime, date, timedelta
+from sqlalchemy import select, insert, delete, update, or_, exists, func
 from sqlalchemy.dialects.postgresql import insert as pg_insert
+from asyncpg.exceptions import UniqueViolationError
 
 # Importa a conexão principal com o banco de dados do bot
 from .db_manager import database
 # Importa a definição das novas tabelas
-from .models import responsaveis_equipes, solicitacoes_horas_extras, colaboradores
+from .models import (
+    responsaveis_equipes, solicitacoes_horas_extras, solicitacoes_dias, colaboradores,
+    ledger_horas_extras, sincronizacoes, email_outbox
+)
 
 logger = logging.getLogger(__name__)
 
-async def definir_responsavel(equipe_id: int, responsavel_discord_id: int) -> bool:
-    """Cria ou atualiza o responsável por uma equipe (UPSERT)."""
-    try:
-        stmt = pg_insert(responsaveis_equipes).values(
-            equipe_id=equipe_id,
-            responsavel_discord_id=responsavel_discord_id,
-            data_atualizacao=datetime.now()
-        ).on_conflict_do_update(
-            index_elements=['equipe_id'],
-            set_={'responsavel_discord_id': responsavel_discord_id, 'data_atualizacao': datetime.now()}
-        )
-        await database.execute(stmt)
-        return True
-    except Exception as e:
-        logger.error(f"Erro ao definir responsável para equipe_id {equipe_id}: {e}", exc_info=True)
-        return False
-
-async def remover_responsavel(equipe_id: int) -> bool:
-    """Remove o responsável de uma equipe."""
-    try:
-        query = delete(responsaveis_equipes).where(responsaveis_equipes.c.equipe_id == equipe_id)
-        await database.execute(query)
-        return True
-    except Exception as e:
-        logger.error(f"Erro ao remover responsável da equipe_id {equipe_id}: {e}", exc_info=True)
-        return False
-
-async def listar_todos_responsaveis() -> List[Dict]:
-    """Lista todos os mapeamentos de equipe x responsável."""
-    query = select(responsaveis_equipes)
-    return await database.fetch_all(query)
-
 # --- Funções para Mapeamento de Usuários (tabela public.colaboradores) ---
 
 async def buscar_colaborador_mapeado(discord_id: int) -> Optional[Dict]:
@@ -86,16 +58,27 @@ async def buscar_responsavel_por_equipe(equipe_id: int) -> Optional[Dict]:
     query = select(responsaveis_equipes).where(responsaveis_equipes.c.equipe_id == equipe_id)
     return await database.fetch_one(query)
 
-async def definir_responsavel(equipe_id: int, responsavel_discord_id: int) -> bool:
-    """Cria ou atualiza o responsável por uma equipe (UPSERT)."""
+async def buscar_responsaveis_por_equipes(equipe_ids: List[int]) -> Dict[int, Dict]:
+    """Busca, em uma única consulta, os responsáveis de várias equipes, indexados pelo ID da equipe."""
+    query = select(responsaveis_equipes).where(responsaveis_equipes.c.equipe_id.in_(equipe_ids))
+    rows = await database.fetch_all(query)
+    return {row['equipe_id']: dict(row) for row in rows}
+
+async def definir_responsavel(equipe_id: int, responsavel_discord_id: int, responsavel_nome: Optional[str] = None) -> bool:
+    """Cria ou atualiza o responsável por uma equipe (UPSERT), guardando também o seu nome."""
     try:
         stmt = pg_insert(responsaveis_equipes).values(
             equipe_id=equipe_id,
             responsavel_discord_id=responsavel_discord_id,
+            responsavel_nome=responsavel_nome,
             data_atualizacao=datetime.now()
         ).on_conflict_do_update(
             index_elements=['equipe_id'],
-            set_={'responsavel_discord_id': responsavel_discord_id, 'data_atualizacao': datetime.now()}
+            set_={
+                'responsavel_discord_id': responsavel_discord_id,
+                'responsavel_nome': responsavel_nome,
+                'data_atualizacao': datetime.now()
+            }
         )
         await database.execute(stmt)
         return True
@@ -103,6 +86,18 @@ async def definir_responsavel(equipe_id: int, responsavel_discord_id: int) -> bo
         logger.error(f"Erro ao definir responsável para equipe_id {equipe_id}: {e}", exc_info=True)
         return False
 
+async def registrar_nome_responsavel(responsavel_discord_id: int, responsavel_nome: str) -> bool:
+    """Grava o nome de um responsável em todos os mapeamentos em que ele aparece."""
+    try:
+        query = update(responsaveis_equipes).where(
+            responsaveis_equipes.c.responsavel_discord_id == responsavel_discord_id
+        ).values(responsavel_nome=responsavel_nome)
+        await database.execute(query)
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao registrar o nome do responsável {responsavel_discord_id}: {e}", exc_info=True)
+        return False
+
 async def remover_responsavel(equipe_id: int) -> bool:
     """Remove o responsável de uma equipe."""
     try:
@@ -119,54 +114,100 @@ async def listar_todos_responsaveis() -> List[Dict]:
     return await database.fetch_all(query)
 
 
-# --- Funções para Solicitações de Horas Extras (tabela public.solicitacoes_horas_extras) ---
+# --- Funções para Solicitações de Horas Extras (tabelas public.solicitacoes_horas_extras e public.solicitacoes_dias) ---
+
+# Status em que os dias de uma solicitação ficam indisponíveis para um novo lançamento
+STATUS_BLOQUEIAM_DATAS = ('APROVADO', 'PENDENTE_APROVACAO_RESPONSAVEL')
+
+def _datas_do_formulario(dados_formulario: Dict) -> List[date]:
+    """Extrai as datas (sem repetição) dos dias selecionados de um formulário já serializado."""
+    datas = {date.fromisoformat(str(dia['data'])[:10]) for dia in dados_formulario.get('detalhes_selecionados', [])}
+    return sorted(datas)
 
 async def criar_solicitacao(solicitante_id: int, dados_formulario: Dict) -> Optional[int]:
-    """Cria um novo registro de solicitação e retorna o ID."""
+    """
+    Cria um novo registro de solicitação e retorna o ID. Os dias selecionados são gravados em
+    public.solicitacoes_dias na mesma transação; se algum deles já estiver em outra solicitação
+    ativa, o índice único impede o registro e nada é gravado.
+    """
     try:
-        query = insert(solicitacoes_horas_extras).values(
-            solicitante_discord_id=solicitante_id,
-            status='PENDENTE_APROVACAO_RESPONSAVEL',
-            dados_formulario=dados_formulario
-        ).returning(solicitacoes_horas_extras.c.id)
-        result = await database.execute(query)
+        async with database.transaction():
+            query = insert(solicitacoes_horas_extras).values(
+                solicitante_discord_id=solicitante_id,
+                status='PENDENTE_APROVACAO_RESPONSAVEL',
+                dados_formulario=dados_formulario
+            ).returning(solicitacoes_horas_extras.c.id)
+            result = await database.execute(query)
+            dias = [
+                {"solicitacao_id": result, "discord_id": solicitante_id, "data": data, "status": 'PENDENTE_APROVACAO_RESPONSAVEL'}
+                for data in _datas_do_formulario(dados_formulario)
+            ]
+            if dias:
+                await database.execute_many(insert(solicitacoes_dias), values=dias)
+        await atualizar_reivindicacao_ledger(result, True)
         return result
+    except UniqueViolationError:
+        logger.warning(f"Solicitação de {solicitante_id} recusada: um dos dias já está em outra solicitação ativa.")
+        return None
     except Exception as e:
         logger.error(f"Erro ao criar solicitação para {solicitante_id}: {e}", exc_info=True)
         return None
 
-async def atualizar_status_solicitacao(solicitacao_id: int, status: str, responsavel_id: int):
-    """Atualiza o status de uma solicitação existente."""
+async def buscar_solicitacao(solicitacao_id: int) -> Optional[Dict]:
+    """Busca uma solicitação pelo ID."""
+    query = select(solicitacoes_horas_extras).where(solicitacoes_horas_extras.c.id == solicitacao_id)
+    row = await database.fetch_one(query)
+    return dict(row) if row else None
+
+async def registrar_pdf_solicitacao(solicitacao_id: int, pdf_hash: str, assinado: bool = False) -> bool:
+    """Vincula à solicitação o hash do PDF armazenado (o de revisão ou, com `assinado`, o aprovado)."""
+    coluna = 'pdf_assinado_hash' if assinado else 'pdf_hash'
     try:
-        query = update(solicitacoes_horas_extras).where(solicitacoes_horas_extras.c.id == solicitacao_id).values(
-            status=status,
-            responsavel_discord_id=responsavel_id,
-            data_decisao=datetime.now()
-        )
+        query = update(solicitacoes_horas_extras).where(
+            solicitacoes_horas_extras.c.id == solicitacao_id
+        ).values({coluna: pdf_hash})
         await database.execute(query)
         return True
-    except Exception:
+    except Exception as e:
+        logger.error(f"Erro ao registrar o PDF da solicitação {solicitacao_id}: {e}", exc_info=True)
         return False
 
-async def buscar_datas_bloqueadas(discord_id: int) -> List[date]:
+async def atualizar_status_solicitacao(solicitacao_id: int, status: str, responsavel_id: int,
+                                       status_atual: Optional[str] = None) -> bool:
     """
-    Busca todas as datas de horas extras que estão pendentes ou já foram aprovadas.
-    Extrai a data de um array de objetos JSONB.
-    """
-    query = """
-    SELECT
-        (dia ->> 'data')::date -- 3. Extrai o valor da chave 'data' como texto e converte para data
-    FROM
-        public.solicitacoes_horas_extras s,
-        -- 1. Pega o campo 'detalhes_selecionados', que é um array JSONB
-        -- 2. Transforma cada objeto do array em uma linha separada chamada 'dia'
-        jsonb_array_elements(s.dados_formulario -> 'detalhes_selecionados') AS dia
-    WHERE 
-        s.solicitante_discord_id = :discord_id 
-        AND s.status IN ('APROVADO', 'PENDENTE_APROVACAO_RESPONSAVEL')
+    Atualiza o status de uma solicitação existente e dos seus dias. Com `status_atual`, a
+    atualização só ocorre se a solicitação ainda estiver nesse status (evita decisões em dobro).
     """
     try:
-        results = await database.fetch_all(query, values={"discord_id": discord_id})
+        async with database.transaction():
+            condicoes = [solicitacoes_horas_extras.c.id == solicitacao_id]
+            if status_atual is not None:
+                condicoes.append(solicitacoes_horas_extras.c.status == status_atual)
+            query = update(solicitacoes_horas_extras).where(*condicoes).values(
+                status=status,
+                responsavel_discord_id=responsavel_id,
+                data_decisao=datetime.now()
+            ).returning(solicitacoes_horas_extras.c.id)
+            if await database.execute(query) is None:
+                return False
+            await database.execute(
+                update(solicitacoes_dias).where(solicitacoes_dias.c.solicitacao_id == solicitacao_id).values(status=status)
+            )
+        if status not in STATUS_BLOQUEIAM_DATAS:
+            await atualizar_reivindicacao_ledger(solicitacao_id, False)
+        return True
+    except Exception:
+        return False
+
+async def buscar_datas_bloqueadas(discord_id: int) -> List[date]:
+    """Busca todas as datas de horas extras que estão pendentes ou já foram aprovadas."""
+    # O filtro de status coincide com o do índice parcial solicitacoes_dias_ativos_idx
+    query = select(solicitacoes_dias.c.data).where(
+        solicitacoes_dias.c.discord_id == discord_id,
+        solicitacoes_dias.c.status.in_(STATUS_BLOQUEIAM_DATAS)
+    )
+    try:
+        results = await database.fetch_all(query)
         return [row[0] for row in results]
     except Exception as e:
         logger.error(f"Erro ao buscar datas bloqueadas para {discord_id}: {e}", exc_info=True)
@@ -174,20 +215,209 @@ async def buscar_datas_bloqueadas(discord_id: int) -> List[date]:
     
 async def cancelar_solicitacao(solicitacao_id: int, solicitante_id: int) -> bool:
     """
-    Atualiza o status de uma solicitação para 'CANCELADO'.
+    Atualiza o status de uma solicitação pendente para 'CANCELADO'.
     A verificação do solicitante_id garante que apenas o próprio usuário possa cancelar.
     """
     try:
-        query = update(solicitacoes_horas_extras).where(
-            solicitacoes_horas_extras.c.id == solicitacao_id,
-            solicitacoes_horas_extras.c.solicitante_discord_id == solicitante_id
-        ).values(
-            status='CANCELADO',
-            data_decisao=datetime.now()
-        )
-        await database.execute(query)
+        async with database.transaction():
+            query = update(solicitacoes_horas_extras).where(
+                solicitacoes_horas_extras.c.id == solicitacao_id,
+                solicitacoes_horas_extras.c.solicitante_discord_id == solicitante_id,
+                solicitacoes_horas_extras.c.status == 'PENDENTE_APROVACAO_RESPONSAVEL'
+            ).values(
+                status='CANCELADO',
+                data_decisao=datetime.now()
+            ).returning(solicitacoes_horas_extras.c.id)
+            if await database.execute(query) is None:
+                return False
+            await database.execute(
+                update(solicitacoes_dias).where(
+                    solicitacoes_dias.c.solicitacao_id == solicitacao_id,
+                    solicitacoes_dias.c.discord_id == solicitante_id
+                ).values(status='CANCELADO')
+            )
+        await atualizar_reivindicacao_ledger(solicitacao_id, False)
         logger.info(f"Solicitação ID {solicitacao_id} cancelada pelo usuário {solicitante_id}.")
         return True
     except Exception as e:
         logger.error(f"Erro ao cancelar solicitação {solicitacao_id}: {e}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
+
+
+async def iterar_solicitacoes_aprovadas(data_inicio: date, data_fim: date) -> AsyncIterator[Dict]:
+    """
+    Percorre as solicitações aprovadas com algum dia no período, ordenadas pelo nome do colaborador
+    e, entre homônimos, agrupadas pelo solicitante.
+    As linhas vêm de um cursor do lado do servidor (database.iterate), sem carregar o resultado inteiro.
+    """
+    nome_responsavel = select(func.max(responsaveis_equipes.c.responsavel_nome)).where(
+        responsaveis_equipes.c.responsavel_discord_id == solicitacoes_horas_extras.c.responsavel_discord_id
+    ).scalar_subquery()
+    tem_dia_no_periodo = exists().where(
+        solicitacoes_dias.c.solicitacao_id == solicitacoes_horas_extras.c.id,
+        solicitacoes_dias.c.data.between(data_inicio, data_fim)
+    )
+    query = select(
+        solicitacoes_horas_extras.c.id,
+        solicitacoes_horas_extras.c.solicitante_discord_id,
+        solicitacoes_horas_extras.c.responsavel_discord_id,
+        solicitacoes_horas_extras.c.dados_formulario,
+        solicitacoes_horas_extras.c.pdf_assinado_hash,
+        solicitacoes_horas_extras.c.data_decisao,
+        nome_responsavel.label("responsavel_nome"),
+    ).where(
+        solicitacoes_horas_extras.c.status == 'APROVADO',
+        tem_dia_no_periodo
+    ).order_by(
+        solicitacoes_horas_extras.c.dados_formulario[('dados_colaborador', 'nome')].astext,
+        solicitacoes_horas_extras.c.solicitante_discord_id,
+        solicitacoes_horas_extras.c.id
+    )
+    async for row in database.iterate(query):
+        yield dict(row)
+
+# --- Funções para o Ledger de Horas Extras (tabelas public.ledger_horas_extras e public.sincronizacoes) ---
+
+async def buscar_marca_dagua(nome: str) -> Optional[date]:
+    """Retorna o último dia já sincronizado por uma rotina de sincronização incremental."""
+    query = select(sincronizacoes.c.marca_dagua).where(sincronizacoes.c.nome == nome)
+    return await database.fetch_val(query)
+
+async def gravar_ledger_horas_extras(nome_sincronizacao: str, data_inicio: date, data_fim: date, dias: List[Dict]):
+    """
+    Substitui o período [data_inicio, data_fim] do ledger pelos dias calculados, remarca os dias já
+    reivindicados em solicitações ativas e avança a marca d'água, tudo em uma única transação.
+    """
+    valores = [
+        {
+            "discord_id": dia["colaborador"],
+            "data": dia["data"],
+            "batidas_str": dia["batidas_str"],
+            "minutos_trabalhados": dia["minutos_trabalhados"],
+            "minutos_extras": int(dia["horas_extras_timedelta"].total_seconds() // 60),
+            "reivindicado": False,
+        }
+        for dia in dias
+    ]
+    marcar_reivindicados = """
+    UPDATE public.ledger_horas_extras l
+    SET reivindicado = TRUE
+    FROM public.solicitacoes_dias d
+    WHERE d.discord_id = l.discord_id
+        AND d.data = l.data
+        AND d.status IN ('APROVADO', 'PENDENTE_APROVACAO_RESPONSAVEL')
+        AND l.data BETWEEN :data_inicio AND :data_fim
+    """
+    async with database.transaction():
+        await database.execute(delete(ledger_horas_extras).where(
+            ledger_horas_extras.c.data.between(data_inicio, data_fim)
+        ))
+        if valores:
+            await database.execute_many(insert(ledger_horas_extras), values=valores)
+        await database.execute(marcar_reivindicados, values={"data_inicio": data_inicio, "data_fim": data_fim})
+        await database.execute(pg_insert(sincronizacoes).values(
+            nome=nome_sincronizacao, marca_dagua=data_fim, data_atualizacao=datetime.now()
+        ).on_conflict_do_update(
+            index_elements=['nome'],
+            set_={'marca_dagua': data_fim, 'data_atualizacao': datetime.now()}
+        ))
+
+async def buscar_dias_disponiveis_ledger(discord_id: int, data_inicio: date, data_fim: date) -> List[Dict]:
+    """Busca no ledger os dias com horas extras ainda não reivindicados, do mais recente ao mais antigo."""
+    query = select(
+        ledger_horas_extras.c.data,
+        ledger_horas_extras.c.batidas_str,
+        ledger_horas_extras.c.minutos_extras,
+    ).where(
+        ledger_horas_extras.c.discord_id == discord_id,
+        ledger_horas_extras.c.data.between(data_inicio, data_fim),
+        ledger_horas_extras.c.reivindicado.is_(False)
+    ).order_by(ledger_horas_extras.c.data.desc())
+    return [dict(row) for row in await database.fetch_all(query)]
+
+async def possui_historico_ledger(discord_id: int, data_inicio: date, data_fim: date) -> bool:
+    """Indica se o ledger tem algum dia do colaborador no período, reivindicado ou não."""
+    query = select(ledger_horas_extras.c.data).where(
+        ledger_horas_extras.c.discord_id == discord_id,
+        ledger_horas_extras.c.data.between(data_inicio, data_fim)
+    ).limit(1)
+    return await database.fetch_val(query) is not None
+
+async def atualizar_reivindicacao_ledger(solicitacao_id: int, reivindicado: bool):
+    """Marca (ou libera) no ledger os dias incluídos em uma solicitação."""
+    query = """
+    UPDATE public.ledger_horas_extras l
+    SET reivindicado = :reivindicado
+    FROM public.solicitacoes_dias d
+    WHERE d.solicitacao_id = :solicitacao_id
+        AND d.discord_id = l.discord_id
+        AND d.data = l.data
+    """
+    try:
+        await database.execute(query, values={"solicitacao_id": solicitacao_id, "reivindicado": reivindicado})
+    except Exception as e:
+        # O ledger é só um atalho de leitura: a seleção de dias ainda confere as datas bloqueadas
+        logger.error(f"Erro ao atualizar o ledger para a solicitação {solicitacao_id}: {e}", exc_info=True)
+
+
+# --- Funções para a Caixa de Saída de E-mails (tabela public.email_outbox) ---
+
+async def inserir_email_outbox(assunto: str, corpo: str, destinatarios: List[str],
+                               anexo_pdf_hash: Optional[str] = None, anexo_nome: Optional[str] = None) -> int:
+    """Grava um e-mail pendente de envio e retorna o seu ID."""
+    query = insert(email_outbox).values(
+        assunto=assunto,
+        corpo=corpo,
+        destinatarios=destinatarios,
+        anexo_pdf_hash=anexo_pdf_hash,
+        anexo_nome=anexo_nome,
+    ).returning(email_outbox.c.id)
+    return await database.execute(query)
+
+async def reservar_emails_outbox(limite: int, reserva: timedelta) -> List[Dict]:
+    """
+    Reserva até `limite` e-mails pendentes cuja próxima tentativa já venceu, adiando-a por `reserva`.
+    O FOR UPDATE SKIP LOCKED evita que duas instâncias peguem o mesmo e-mail; como a reserva é
+    gravada na hora, nenhuma linha fica bloqueada durante o envio, e um e-mail reservado por uma
+    instância que caiu volta a ser enviado quando a reserva expira.
+    """
+    disponiveis = select(email_outbox.c.id).where(
+        email_outbox.c.status == 'PENDENTE',
+        email_outbox.c.proxima_tentativa <= func.now()
+    ).order_by(
+        email_outbox.c.proxima_tentativa, email_outbox.c.id
+    ).limit(limite).with_for_update(skip_locked=True)
+    query = update(email_outbox).where(
+        email_outbox.c.id.in_(disponiveis.scalar_subquery())
+    ).values(proxima_tentativa=func.now() + reserva).returning(*email_outbox.c)
+    rows = await database.fetch_all(query)
+    return sorted((dict(row) for row in rows), key=lambda email: email["id"])
+
+async def concluir_email_outbox(email_id: int):
+    """Marca um e-mail como enviado."""
+    query = update(email_outbox).where(email_outbox.c.id == email_id).values(
+        status='ENVIADO',
+        tentativas=email_outbox.c.tentativas + 1,
+        ultimo_erro=None,
+        data_envio=func.now()
+    )
+    await database.execute(query)
+
+async def registrar_falha_email_outbox(email_id: int, erro: str, espera: Optional[timedelta]):
+    """Registra uma tentativa malsucedida: o e-mail volta a ser tentado após `espera` ou, sem espera, é dado como falho."""
+    valores = {"tentativas": email_outbox.c.tentativas + 1, "ultimo_erro": erro}
+    if espera is None:
+        valores["status"] = 'FALHOU'
+    else:
+        valores["proxima_tentativa"] = func.now() + espera
+    await database.execute(update(email_outbox).where(email_outbox.c.id == email_id).values(valores))
+
+async def liberar_emails_outbox(email_ids: List[int], espera: timedelta):
+    """Devolve e-mails reservados e não tentados, para nova tentativa após `espera` (sem contar tentativa)."""
+    if not email_ids:
+        return
+    query = update(email_outbox).where(
+        email_outbox.c.id.in_(email_ids),
+        email_outbox.c.status == 'PENDENTE'
+    ).values(proxima_tentativa=func.now() + espera)
+    await database.execute(query)
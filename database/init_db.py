@@ -1,6 +1,8 @@
 """Inicializa o banco de daddos executando o script de criação do schema do Publito Bot."""
 
 import os
+import sys
+import glob
 import asyncio
 import asyncpg
 from dotenv import load_dotenv
@@ -22,5 +24,19 @@ async def run_schema_script():
     await conn.close()
     print("Schema criado com sucesso.")
 
+async def run_migrations():
+    """Aplica, em ordem, os scripts (idempotentes) de ./database/migrations em um banco já existente."""
+    conn = await asyncpg.connect(dsn=DATABASE_URL)
+
+    for path in sorted(glob.glob("./database/migrations/*.sql")):
+        with open(path, "r", encoding="utf-8") as f:
+            await conn.execute(f.read())
+        print(f"Migração aplicada: {os.path.basename(path)}")
+
+    await conn.close()
+
 if __name__ == "__main__":
-    asyncio.run(run_schema_script())
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        asyncio.run(run_migrations())
+    else:
+        asyncio.run(run_schema_script())
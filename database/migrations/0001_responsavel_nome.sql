@@ -0,0 +1,4 @@
+-- Guarda o nome corporativo do responsável junto do mapeamento de equipes,
+-- evitando uma consulta extra ao banco corporativo a cada /bancohoras.
+ALTER TABLE public.responsaveis_equipes
+ADD COLUMN IF NOT EXISTS responsavel_nome VARCHAR(255);
@@ -0,0 +1,18 @@
+-- Ledger materializado de horas extras por dia, sincronizado a partir do ponto corporativo,
+-- e a tabela de marcas d'água das sincronizações incrementais.
+CREATE TABLE IF NOT EXISTS public.ledger_horas_extras (
+    discord_id BIGINT NOT NULL,
+    data DATE NOT NULL,
+    batidas_str VARCHAR(255) NOT NULL,
+    minutos_trabalhados INTEGER NOT NULL,
+    minutos_extras INTEGER NOT NULL,
+    reivindicado BOOLEAN NOT NULL DEFAULT FALSE,
+    data_sincronizacao TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (discord_id, data)
+);
+
+CREATE TABLE IF NOT EXISTS public.sincronizacoes (
+    nome VARCHAR(50) PRIMARY KEY,
+    marca_dagua DATE NOT NULL,
+    data_atualizacao TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
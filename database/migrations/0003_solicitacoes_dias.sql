@@ -0,0 +1,22 @@
+-- Normaliza os dias de cada solicitação em uma tabela própria, indexada para a busca de datas
+-- bloqueadas, e preenche a tabela a partir do JSONB das solicitações existentes.
+CREATE TABLE IF NOT EXISTS public.solicitacoes_dias (
+    solicitacao_id INTEGER NOT NULL REFERENCES public.solicitacoes_horas_extras(id) ON DELETE CASCADE,
+    discord_id BIGINT NOT NULL,
+    data DATE NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    PRIMARY KEY (solicitacao_id, data)
+);
+
+-- Um mesmo dia só pode estar em uma solicitação ativa por colaborador; serve também à busca de datas bloqueadas
+CREATE UNIQUE INDEX IF NOT EXISTS solicitacoes_dias_ativos_idx
+ON public.solicitacoes_dias (discord_id, data)
+WHERE status IN ('APROVADO', 'PENDENTE_APROVACAO_RESPONSAVEL');
+
+-- Caso o histórico já tenha o mesmo dia em duas solicitações ativas, só a mais antiga fica ativa
+INSERT INTO public.solicitacoes_dias (solicitacao_id, discord_id, data, status)
+SELECT s.id, s.solicitante_discord_id, (dia ->> 'data')::date, s.status
+FROM public.solicitacoes_horas_extras s,
+     jsonb_array_elements(s.dados_formulario -> 'detalhes_selecionados') AS dia
+ORDER BY s.id
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,7 @@
+-- Os PDFs das solicitações passam a ser guardados no armazenamento endereçado por conteúdo;
+-- a solicitação guarda apenas o hash SHA-256 de cada documento.
+ALTER TABLE public.solicitacoes_horas_extras
+ADD COLUMN IF NOT EXISTS pdf_hash CHAR(64);
+
+ALTER TABLE public.solicitacoes_horas_extras
+ADD COLUMN IF NOT EXISTS pdf_assinado_hash CHAR(64);
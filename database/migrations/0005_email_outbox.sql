@@ -0,0 +1,20 @@
+-- Caixa de saída de e-mails: as mensagens são gravadas na mesma base do bot e enviadas em segundo
+-- plano, com novas tentativas, mesmo que o servidor SMTP esteja fora do ar no momento da aprovação.
+CREATE TABLE IF NOT EXISTS public.email_outbox (
+    id SERIAL PRIMARY KEY,
+    assunto TEXT NOT NULL,
+    corpo TEXT NOT NULL,
+    destinatarios JSONB NOT NULL,
+    anexo_pdf_hash CHAR(64),
+    anexo_nome VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDENTE' CHECK (status IN ('PENDENTE', 'ENVIADO', 'FALHOU')),
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ultimo_erro TEXT,
+    data_criacao TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    data_envio TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS email_outbox_pendentes_idx
+ON public.email_outbox (proxima_tentativa, id)
+WHERE status = 'PENDENTE';
@@ -52,9 +52,9 @@ comunicados = sqlalchemy.Table(
     "comunicados",
     metadata,
     sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
-    sqlalchemy.Column("url", sqlalchemy.String, nullable=False, unique=True),
-    sqlalchemy.Column("titulo_comunicado", sqlalchemy.String),
-    sqlalchemy.Column("data_postagem", sqlalchemy.DateTime),
+    sqlalchemy.Column("url", sqlalchemy.String(255), nullable=False, unique=True),
+    sqlalchemy.Column("titulo_comunicado", sqlalchemy.String(255)),
+    sqlalchemy.Column("data_postagem", sqlalchemy.String(15)),
     sqlalchemy.Column("data_postagem_discord", sqlalchemy.DateTime, server_default=sqlalchemy.func.now()),
     schema="sicom"
 )
@@ -77,6 +77,7 @@ responsaveis_equipes = sqlalchemy.Table(
     metadata,
     sqlalchemy.Column("equipe_id", sqlalchemy.Integer, primary_key=True),
     sqlalchemy.Column("responsavel_discord_id", sqlalchemy.BigInteger, nullable=False),
+    sqlalchemy.Column("responsavel_nome", sqlalchemy.String(255)),
     sqlalchemy.Column("data_atualizacao", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.func.now()),
     schema="public"
 )
@@ -89,11 +90,63 @@ solicitacoes_horas_extras = sqlalchemy.Table(
     sqlalchemy.Column("responsavel_discord_id", sqlalchemy.BigInteger),
     sqlalchemy.Column("status", sqlalchemy.String(50), nullable=False),
     sqlalchemy.Column("dados_formulario", JSONB), # Usando o tipo JSONB importado
+    sqlalchemy.Column("pdf_hash", sqlalchemy.CHAR(64)),
+    sqlalchemy.Column("pdf_assinado_hash", sqlalchemy.CHAR(64)),
     sqlalchemy.Column("data_solicitacao", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.func.now()),
     sqlalchemy.Column("data_decisao", sqlalchemy.DateTime(timezone=True)),
     schema="public"
 )
 
+solicitacoes_dias = sqlalchemy.Table(
+    "solicitacoes_dias",
+    metadata,
+    sqlalchemy.Column("solicitacao_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("public.solicitacoes_horas_extras.id", ondelete="CASCADE"), primary_key=True),
+    sqlalchemy.Column("discord_id", sqlalchemy.BigInteger, nullable=False),
+    sqlalchemy.Column("data", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("status", sqlalchemy.String(50), nullable=False),
+    schema="public"
+)
+
+ledger_horas_extras = sqlalchemy.Table(
+    "ledger_horas_extras",
+    metadata,
+    sqlalchemy.Column("discord_id", sqlalchemy.BigInteger, primary_key=True),
+    sqlalchemy.Column("data", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("batidas_str", sqlalchemy.String(255), nullable=False),
+    sqlalchemy.Column("minutos_trabalhados", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("minutos_extras", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("reivindicado", sqlalchemy.Boolean, nullable=False, default=False),
+    sqlalchemy.Column("data_sincronizacao", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.func.now()),
+    schema="public"
+)
+
+sincronizacoes = sqlalchemy.Table(
+    "sincronizacoes",
+    metadata,
+    sqlalchemy.Column("nome", sqlalchemy.String(50), primary_key=True),
+    sqlalchemy.Column("marca_dagua", sqlalchemy.Date, nullable=False),
+    sqlalchemy.Column("data_atualizacao", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.func.now()),
+    schema="public"
+)
+
+email_outbox = sqlalchemy.Table(
+    "email_outbox",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("assunto", sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column("corpo", sqlalchemy.Text, nullable=False),
+    sqlalchemy.Column("destinatarios", JSONB, nullable=False),
+    sqlalchemy.Column("anexo_pdf_hash", sqlalchemy.CHAR(64)),
+    sqlalchemy.Column("anexo_nome", sqlalchemy.String(255)),
+    sqlalchemy.Column("status", sqlalchemy.String(20), nullable=False, server_default="PENDENTE"),
+    sqlalchemy.Column("tentativas", sqlalchemy.Integer, nullable=False, server_default="0"),
+    sqlalchemy.Column("proxima_tentativa", sqlalchemy.DateTime(timezone=True), nullable=False, server_default=sqlalchemy.func.now()),
+    sqlalchemy.Column("ultimo_erro", sqlalchemy.Text),
+    sqlalchemy.Column("data_criacao", sqlalchemy.DateTime(timezone=True), server_default=sqlalchemy.func.now()),
+    sqlalchemy.Column("data_envio", sqlalchemy.DateTime(timezone=True)),
+    schema="public"
+)
+
 logs_bot = sqlalchemy.Table(
     "logs_bot",
     metadata,
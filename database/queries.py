@@ -1,23 +1,72 @@
+import os
 import logging
 from typing import List, Dict, Optional
-from sqlalchemy import select, update, or_, insert
+from sqlalchemy import select, update, or_, insert, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import date
 from asyncpg.exceptions import UniqueViolationError
 # Importa os modelos e a instância de conexão corretos
 from .db_manager import database
 from .models import municipios, administracoes, municipios_administracoes, credenciais, comunicados
+from utils.indice_texto import IndiceTexto, normalizar_texto
+from utils.cache import CacheTTL
 
 logger = logging.getLogger(__name__)
 
+# Resultado de fetch_credenciais_por_id por município; as escritas deste módulo invalidam a chave afetada
+# e o TTL cobre alterações feitas fora do bot (ex: carga_dados.py).
+cache_credenciais = CacheTTL(
+    "credenciais_por_municipio",
+    max_itens=int(os.getenv("SICOM_CACHE_MAX_ITENS", "512")),
+    ttl=int(os.getenv("SICOM_CACHE_TTL", "600")),
+)
+
+# Índices em memória dos autocompletes ("municipios" e "administracoes"), carregados na
+# inicialização do bot, recarregados após as escritas que alteram os cadastros e, para
+# cobrir alterações feitas fora do bot, periodicamente pelo cog do SICOM.
+_indices_autocomplete: Dict[str, IndiceTexto] = {}
+
+async def carregar_indices_autocomplete() -> bool:
+    """(Re)carrega os índices de municípios e administrações usados pelos autocompletes."""
+    try:
+        rows_municipios = await database.fetch_all(
+            select(municipios.c.cod_municipio, municipios.c.nom_municipio).order_by(municipios.c.nom_municipio)
+        )
+        rows_administracoes = await database.fetch_all(
+            select(
+                administracoes.c.cod_administracao,
+                administracoes.c.sigla_administracao,
+                administracoes.c.des_administracao
+            ).order_by(administracoes.c.sigla_administracao)
+        )
+    except Exception as e:
+        logger.error(f"Erro ao carregar os índices de autocomplete: {e}", exc_info=True)
+        return False
+
+    # Os índices são trocados de uma só vez: buscas em andamento nunca veem um índice parcial
+    _indices_autocomplete["municipios"] = IndiceTexto(
+        [dict(row) for row in rows_municipios], campos=("nom_municipio",)
+    )
+    _indices_autocomplete["administracoes"] = IndiceTexto(
+        [dict(row) for row in rows_administracoes], campos=("sigla_administracao", "des_administracao")
+    )
+    logger.info(f"Índices de autocomplete carregados: {len(rows_municipios)} município(s) e {len(rows_administracoes)} administração(ões).")
+    return True
+
 async def fetch_municipio_autocomplete(search_term: str) -> List[Dict]:
     """
-    Busca municípios no banco de dados para a função de autocomplete.
-    Usa ILIKE na coluna nom_municipio.
+    Busca municípios para a função de autocomplete.
+    Usa o índice em memória (acentos e caixa ignorados) e, se ele ainda não foi carregado,
+    ILIKE na coluna nom_municipio.
     """
+    indice = _indices_autocomplete.get("municipios")
+    if indice is not None:
+        return indice.buscar(search_term, limite=25)
     try:
         query = (
             select(municipios.c.cod_municipio, municipios.c.nom_municipio)
-            .where(municipios.c.nom_municipio.ilike(f"%{search_term}%"))
+            # Os nomes são gravados sem acento, então o termo também é normalizado
+            .where(municipios.c.nom_municipio.ilike(f"%{normalizar_texto(search_term)}%"))
             .limit(25)
             .order_by(municipios.c.nom_municipio)
         )
@@ -29,42 +78,62 @@ async def fetch_municipio_autocomplete(search_term: str) -> List[Dict]:
 async def fetch_credenciais_por_id(municipio_id: int) -> List[Dict]:
     """
     Busca todas as credenciais de um município específico pelo seu ID,
-    juntando todas as tabelas necessárias.
+    juntando todas as tabelas necessárias. O resultado é mantido em cache por município.
     """
     try:
-        # Define a junção complexa entre as quatro tabelas
-        j = credenciais.join(
-            municipios_administracoes,
-            credenciais.c.cod_entidade == municipios_administracoes.c.cod_entidade
-        ).join(
-            municipios,
-            municipios_administracoes.c.cod_municipio == municipios.c.cod_municipio
-        ).join(
-            administracoes,
-            municipios_administracoes.c.cod_administracao == administracoes.c.cod_administracao
-        )
-
-        # Seleciona as colunas desejadas, usando labels para clareza
-        query = (
-            select(
-                municipios.c.nom_municipio.label("municipio_nome"),
-                administracoes.c.sigla_administracao.label("adm_sigla"),
-                administracoes.c.des_administracao.label("adm_descricao"),
-                credenciais.c.cpf_usuario,
-                credenciais.c.senha,
-                credenciais.c.status_validade
-            )
-            .select_from(j)
-            .where(municipios.c.cod_municipio == municipio_id) # Filtra pelo ID do município
-            .order_by(administracoes.c.sigla_administracao)
-        )
-        return await database.fetch_all(query)
+        return await cache_credenciais.obter(municipio_id, lambda: _consultar_credenciais(municipio_id))
     except Exception as e:
         logger.error(f"Erro ao buscar credenciais para o município ID {municipio_id}: {e}", exc_info=True)
         return []
+
+async def _invalidar_credenciais_da_entidade(entity_id: int):
+    """Invalida no cache o município da entidade; sem conseguir identificá-lo, descarta o cache inteiro."""
+    try:
+        cod_municipio = await database.fetch_val(
+            select(municipios_administracoes.c.cod_municipio).where(municipios_administracoes.c.cod_entidade == entity_id)
+        )
+    except Exception as e:
+        logger.warning(f"Não foi possível identificar o município da entidade {entity_id} ({e}). Limpando o cache de credenciais.")
+        cache_credenciais.limpar()
+        return
+    if cod_municipio is not None:
+        cache_credenciais.invalidar(cod_municipio)
+
+async def _consultar_credenciais(municipio_id: int) -> List[Dict]:
+    """Executa a junção entre credenciais, entidades, municípios e administrações."""
+    # Define a junção complexa entre as quatro tabelas
+    j = credenciais.join(
+        municipios_administracoes,
+        credenciais.c.cod_entidade == municipios_administracoes.c.cod_entidade
+    ).join(
+        municipios,
+        municipios_administracoes.c.cod_municipio == municipios.c.cod_municipio
+    ).join(
+        administracoes,
+        municipios_administracoes.c.cod_administracao == administracoes.c.cod_administracao
+    )
+
+    # Seleciona as colunas desejadas, usando labels para clareza
+    query = (
+        select(
+            municipios.c.nom_municipio.label("municipio_nome"),
+            administracoes.c.sigla_administracao.label("adm_sigla"),
+            administracoes.c.des_administracao.label("adm_descricao"),
+            credenciais.c.cpf_usuario,
+            credenciais.c.senha,
+            credenciais.c.status_validade
+        )
+        .select_from(j)
+        .where(municipios.c.cod_municipio == municipio_id) # Filtra pelo ID do município
+        .order_by(administracoes.c.sigla_administracao)
+    )
+    return [dict(row) for row in await database.fetch_all(query)]
     
 async def fetch_administracao_autocomplete(search_term: str) -> List[Dict]:
     """Busca administrações para a função de autocomplete, pesquisando na sigla e na descrição."""
+    indice = _indices_autocomplete.get("administracoes")
+    if indice is not None:
+        return indice.buscar(search_term, limite=25)
     try:
         query = (
             select(
@@ -117,6 +186,7 @@ async def update_credenciais(entity_id: int, updates: Dict) -> bool:
             .values(**updates) # O operador ** desempacota o dicionário
         )
         await database.execute(query)
+        await _invalidar_credenciais_da_entidade(entity_id)
         return True
     except Exception as e:
         logger.error(f"Erro ao atualizar credenciais para entidade ID {entity_id}: {e}", exc_info=True)
@@ -125,8 +195,10 @@ async def update_credenciais(entity_id: int, updates: Dict) -> bool:
 async def insert_municipio(nome: str, cnpj: str) -> Dict[str, any]:
     """Tenta inserir um novo município na tabela sicom.municipios."""
     try:
-        query = insert(municipios).values(nom_municipio=nome, cnpj_municipio=cnpj)
-        await database.execute(query)
+        query = insert(municipios).values(nom_municipio=nome, cnpj_municipio=cnpj).returning(municipios.c.cod_municipio)
+        cod_municipio = await database.execute(query)
+        cache_credenciais.invalidar(cod_municipio)
+        await carregar_indices_autocomplete()
         return {"success": True, "message": "Município registrado com sucesso!"}
 
     # Captura a exceção específica de violação de unicidade
@@ -163,6 +235,8 @@ async def create_municipio_administracao_link(municipio_id: int, administracao_i
         )
         # fetch_one() é usado para obter o resultado do 'returning'
         result = await database.fetch_one(query)
+        cache_credenciais.invalidar(municipio_id)
+        await carregar_indices_autocomplete()
         return result["cod_entidade"] if result else None
     except Exception as e:
         logger.error(f"Erro ao criar link para município {municipio_id} e adm {administracao_id}: {e}", exc_info=True)
@@ -189,25 +263,58 @@ async def insert_credencial(entity_id: int, cpf_usuario: str, senha: str, status
             status_validade=status_validade
         )
         await database.execute(query)
+        await _invalidar_credenciais_da_entidade(entity_id)
         return True
     except Exception as e:
         logger.error(f"Erro ao inserir credencial para entidade {entity_id}: {e}", exc_info=True)
         return False
 
-async def verifica_comunicado_postado(url: str) -> bool:
-    """Verifica se um comunicado com uma determinada URL já foi postado."""
+def _linha_comunicado(comunicado: Dict) -> Optional[Dict]:
+    """
+    Linha de sicom.comunicados para um comunicado do portal, com os textos cortados ao tamanho das
+    colunas: um título longo não pode derrubar a inserção do lote inteiro. Uma URL longa demais não
+    cabe na chave única e o comunicado é ignorado.
+    """
+    url = comunicado['link']
+    if len(url) > comunicados.c.url.type.length:
+        logger.warning(f"Comunicado ignorado: URL com mais de {comunicados.c.url.type.length} caracteres ({url[:80]}...).")
+        return None
+    return {
+        "url": url,
+        "titulo_comunicado": (comunicado['titulo_comunicado'] or "")[:comunicados.c.titulo_comunicado.type.length],
+        "data_postagem": (comunicado['data_comunicado'] or "")[:comunicados.c.data_postagem.type.length],
+    }
+
+async def reservar_comunicados(lista_comunicados: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Registra de uma vez os comunicados ainda não postados (INSERT ... ON CONFLICT (url) DO NOTHING
+    RETURNING) e retorna, na ordem recebida, apenas os que esta chamada registrou: se duas
+    instâncias do bot verificarem ao mesmo tempo, cada comunicado é reservado por uma só.
+    Retorna None se o banco falhar.
+    """
+    por_url = {comunicado['link']: comunicado for comunicado in lista_comunicados}
+    linhas = [linha for linha in map(_linha_comunicado, por_url.values()) if linha]
+    if not linhas:
+        return []
     try:
-        query = select(comunicados.c.id).where(comunicados.c.url == url)
-        result = await database.fetch_one(query)
-        return result is not None
+        query = pg_insert(comunicados).values(linhas).on_conflict_do_nothing(index_elements=['url']).returning(comunicados.c.url)
+        reservados = {row['url'] for row in await database.fetch_all(query)}
     except Exception as e:
-        logger.error(f"Erro ao verificar comunicado postado para a URL {url}: {e}")
-        return True # Assume que foi postado em caso de erro para evitar spam
+        logger.error(f"Erro ao registrar comunicados postados: {e}")
+        return None # Não posta nada em caso de erro para evitar spam
+    return [comunicado for url, comunicado in por_url.items() if url in reservados]
 
-async def marcar_comunicado_postado(url: str, titulo_comunicado: str, data_comunicado: str) -> None:
-    """Marca um comunicado como postado, inserindo-o no banco de dados."""
+async def existem_comunicados_registrados() -> Optional[bool]:
+    """Indica se a tabela de comunicados já tem algum registro; retorna None se o banco falhar."""
     try:
-        query = insert(comunicados).values(url=url, titulo_comunicado=titulo_comunicado, data_postagem=data_comunicado)
-        await database.execute(query)
+        return await database.fetch_val(select(comunicados.c.id).limit(1)) is not None
+    except Exception as e:
+        logger.error(f"Erro ao verificar os comunicados registrados: {e}")
+        return None
+
+async def liberar_comunicados(urls: List[str]) -> None:
+    """Desfaz a reserva de comunicados que não puderam ser postados, para a próxima verificação tentar de novo."""
+    try:
+        await database.execute(delete(comunicados).where(comunicados.c.url.in_(urls)))
     except Exception as e:
-        logger.error(f"Erro ao marcar comunicado como postado para a URL {url}: {e}")
\ No newline at end of file
+        logger.error(f"Erro ao liberar comunicados não postados {urls}: {e}")
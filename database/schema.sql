@@ -77,6 +77,7 @@ CREATE TABLE IF NOT EXISTS public.colaboradores (
 CREATE TABLE IF NOT EXISTS public.responsaveis_equipes (
     equipe_id INTEGER PRIMARY KEY,
     responsavel_discord_id BIGINT NOT NULL,
+    responsavel_nome VARCHAR(255),
     data_atualizacao TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -86,6 +87,8 @@ CREATE TABLE IF NOT EXISTS public.solicitacoes_horas_extras (
     responsavel_discord_id BIGINT,
     status VARCHAR(50) NOT NULL,
     dados_formulario JSONB,
+    pdf_hash CHAR(64),            -- SHA-256 do PDF gerado para revisão (services/pdf_storage.py)
+    pdf_assinado_hash CHAR(64),   -- SHA-256 do PDF assinado na aprovação
     data_solicitacao TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     data_decisao TIMESTAMPTZ
 );
@@ -99,6 +102,58 @@ ADD CONSTRAINT status_check CHECK (status IN (
     'CANCELADO'
 ));
 
+-- Dias incluídos em cada solicitação (normalização de dados_formulario -> 'detalhes_selecionados')
+CREATE TABLE IF NOT EXISTS public.solicitacoes_dias (
+    solicitacao_id INTEGER NOT NULL REFERENCES public.solicitacoes_horas_extras(id) ON DELETE CASCADE,
+    discord_id BIGINT NOT NULL,
+    data DATE NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    PRIMARY KEY (solicitacao_id, data)
+);
+
+-- Um mesmo dia só pode estar em uma solicitação ativa por colaborador; serve também à busca de datas bloqueadas
+CREATE UNIQUE INDEX IF NOT EXISTS solicitacoes_dias_ativos_idx
+ON public.solicitacoes_dias (discord_id, data)
+WHERE status IN ('APROVADO', 'PENDENTE_APROVACAO_RESPONSAVEL');
+
+-- Horas extras por dia já calculadas a partir do ponto corporativo (sincronizadas toda noite)
+CREATE TABLE IF NOT EXISTS public.ledger_horas_extras (
+    discord_id BIGINT NOT NULL,
+    data DATE NOT NULL,
+    batidas_str VARCHAR(255) NOT NULL,
+    minutos_trabalhados INTEGER NOT NULL,
+    minutos_extras INTEGER NOT NULL,
+    reivindicado BOOLEAN NOT NULL DEFAULT FALSE,
+    data_sincronizacao TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (discord_id, data)
+);
+
+CREATE TABLE IF NOT EXISTS public.sincronizacoes (
+    nome VARCHAR(50) PRIMARY KEY,
+    marca_dagua DATE NOT NULL,
+    data_atualizacao TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Caixa de saída de e-mails, enviada em segundo plano (services/email_service.py)
+CREATE TABLE IF NOT EXISTS public.email_outbox (
+    id SERIAL PRIMARY KEY,
+    assunto TEXT NOT NULL,
+    corpo TEXT NOT NULL,
+    destinatarios JSONB NOT NULL,
+    anexo_pdf_hash CHAR(64),      -- SHA-256 do PDF anexado, lido do armazenamento no momento do envio
+    anexo_nome VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDENTE' CHECK (status IN ('PENDENTE', 'ENVIADO', 'FALHOU')),
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ultimo_erro TEXT,
+    data_criacao TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    data_envio TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS email_outbox_pendentes_idx
+ON public.email_outbox (proxima_tentativa, id)
+WHERE status = 'PENDENTE';
+
 CREATE TABLE IF NOT EXISTS public.logs_bot (
     id SERIAL PRIMARY KEY,
     timestamp_utc TIMESTAMPTZ NOT NULL,
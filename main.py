@@ -7,6 +7,11 @@ import logging
 from dotenv import load_dotenv
 
 from database.db_manager import database
+from services.portal_service import portal_service
+from services.comunicados_service import portal_comunicados
+from services.pdf_pool import pool_pdf
+from services.email_service import caixa_saida_email
+from views.rh_view import BotaoSolicitacao
 
 # --- Configuração de Logging ---
 
@@ -34,6 +39,12 @@ class MyBot(commands.Bot):
 
     async def setup_hook(self):
         logger.info("--- Executando setup_hook ---")
+
+        # 0. Iniciar o pool de renderização de PDF antes de qualquer outra inicialização
+        try:
+            await pool_pdf.iniciar()
+        except Exception as e:
+            logger.error(f"Falha ao iniciar o pool de renderização de PDF: {e}", exc_info=True)
         
         # 1. Conectar ao banco de dados
         try:
@@ -52,6 +63,9 @@ class MyBot(commands.Bot):
             'cogs.comunicados_task',
             'cogs.ajuda_commands',
             'cogs.registrar_commands',
+            'cogs.ledger_task',
+            'cogs.email_task',
+            'cogs.portal_pool_task',
         ]
         for cog in cogs_to_load:
             try:
@@ -60,7 +74,10 @@ class MyBot(commands.Bot):
             except Exception as e:
                 logger.error(f"Falha ao carregar o cog '{cog}': {e}", exc_info=True)
             
-        # 3. Sincronizar comandos com o Discord
+        # 3. Registrar os botões persistentes das solicitações (continuam funcionando após reinicializações)
+        self.add_dynamic_items(BotaoSolicitacao)
+
+        # 4. Sincronizar comandos com o Discord
         try:
             synced = await self.tree.sync()
             logger.info(f"{len(synced)} comando(s) sincronizado(s) globalmente.")
@@ -71,8 +88,17 @@ class MyBot(commands.Bot):
         logger.info(f'Bot conectado como {self.user.name} (ID: {self.user.id})')
 
     async def close(self):
+        # Antes do banco: os envios em andamento ainda registram o resultado na caixa de saída
+        logger.info("Aguardando os envios de e-mail em andamento e encerrando a conexão SMTP...")
+        await caixa_saida_email.fechar()
         logger.info("Fechando a conexão com o banco de dados...")
         await database.disconnect()
+        logger.info("Encerrando o pool de conexões com o banco corporativo...")
+        portal_service.fechar()
+        logger.info("Encerrando as conexões com o portal SICOM...")
+        await portal_comunicados.fechar()
+        logger.info("Encerrando o pool de renderização de PDF...")
+        pool_pdf.fechar()
         await super().close()
 
 # --- Ponto de Entrada Principal ---
@@ -0,0 +1,140 @@
+# services/calculo_ponto.py
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JORNADA_PADRAO_MINUTOS = 8 * 60
+
+
+def horas_para_minutos(horas: Sequence[str]) -> np.ndarray:
+    """Converte, em lote, strings 'HH:MM' em minutos desde a meia-noite."""
+    if len(horas) == 0:
+        return np.zeros(0, dtype=np.int64)
+    partes = np.char.partition(np.asarray(horas, dtype=str), ':')
+    return partes[:, 0].astype(np.int64) * 60 + partes[:, 2].astype(np.int64)
+
+
+def minutos_para_horas(minutos: np.ndarray) -> np.ndarray:
+    """Converte, em lote, minutos desde a meia-noite em strings 'HH:MM'."""
+    horas = np.char.zfill((minutos // 60).astype(str), 2)
+    resto = np.char.zfill((minutos % 60).astype(str), 2)
+    return np.char.add(np.char.add(horas, ':'), resto)
+
+
+def _codificar(valores: Sequence[Any]):
+    """Retorna (códigos inteiros, valores únicos ordenados) preservando os objetos originais."""
+    array = np.empty(len(valores), dtype=object)
+    array[:] = list(valores)
+    unicos, codigos = np.unique(array, return_inverse=True)
+    return codigos.reshape(-1), unicos
+
+
+def calcular_horas_extras_lote(
+    datas: Sequence[Any],
+    horas: Sequence[str],
+    colaboradores: Optional[Sequence[Any]] = None,
+    jornada_minutos: int = JORNADA_PADRAO_MINUTOS,
+) -> List[Dict]:
+    """
+    Calcula, de uma só vez para vários colaboradores e dias, o total trabalhado e as horas extras.
+
+    Cada posição i das sequências é uma batida (colaboradores[i], datas[i], horas[i]). Dentro de
+    cada dia as batidas devem vir em ordem cronológica (como no ORDER BY das consultas) e são
+    pareadas como entrada/saída. Dias com número ímpar de batidas são ignorados e só os dias com
+    horas extras são retornados, ordenados por colaborador e data decrescente.
+    """
+    total = len(horas)
+    if total == 0:
+        return []
+    minutos = horas_para_minutos(horas)
+    if colaboradores is None:
+        codigos_colab, colabs_unicos = np.zeros(total, dtype=np.int64), np.array([None], dtype=object)
+    else:
+        codigos_colab, colabs_unicos = _codificar(colaboradores)
+    codigos_data, datas_unicas = _codificar(datas)
+
+    # Um grupo por (colaborador, dia); a ordenação estável preserva a ordem das batidas no dia
+    grupo = codigos_colab * len(datas_unicas) + codigos_data
+    ordem = np.argsort(grupo, kind='stable')
+    grupo_ordenado = grupo[ordem]
+    minutos_ordenados = minutos[ordem]
+
+    inicio_grupo = np.r_[True, grupo_ordenado[1:] != grupo_ordenado[:-1]]
+    indices_inicio = np.flatnonzero(inicio_grupo)
+    id_grupo = np.cumsum(inicio_grupo) - 1
+    posicao_no_dia = np.arange(total) - indices_inicio[id_grupo]
+
+    # Entradas (posições pares) subtraem e saídas (ímpares) somam: soma = Σ (saída - entrada)
+    sinal = np.where(posicao_no_dia % 2 == 0, -1, 1)
+    trabalhado = np.bincount(id_grupo, weights=sinal * minutos_ordenados).astype(np.int64)
+    quantidade = np.bincount(id_grupo)
+    extras = trabalhado - jornada_minutos
+
+    grupo_de_cada_dia = grupo_ordenado[indices_inicio]
+    colab_de_cada_dia = grupo_de_cada_dia // len(datas_unicas)
+    data_de_cada_dia = grupo_de_cada_dia % len(datas_unicas)
+
+    impares = np.flatnonzero(quantidade % 2 != 0)
+    for g in impares:
+        logger.warning(
+            f"Dia {datas_unicas[data_de_cada_dia[g]]} para o colaborador {colabs_unicos[colab_de_cada_dia[g]]} "
+            f"tem um número ímpar de batidas. Ignorando."
+        )
+
+    validos = np.flatnonzero((quantidade % 2 == 0) & (extras > 0))
+    validos = validos[np.lexsort((-data_de_cada_dia[validos], colab_de_cada_dia[validos]))]
+
+    horas_formatadas = minutos_para_horas(minutos_ordenados).tolist()
+    dias_detalhados = []
+    for g in validos:
+        inicio = int(indices_inicio[g])
+        dias_detalhados.append({
+            "colaborador": colabs_unicos[colab_de_cada_dia[g]],
+            "data": datas_unicas[data_de_cada_dia[g]],
+            "batidas_str": " - ".join(horas_formatadas[inicio:inicio + quantidade[g]]),
+            "minutos_trabalhados": int(trabalhado[g]),
+            "horas_extras_timedelta": timedelta(minutes=int(extras[g])),
+        })
+    return dias_detalhados
+
+
+def resumir_por_colaborador(dias_detalhados: List[Dict]) -> Dict[Any, Dict]:
+    """Agrupa o resultado de `calcular_horas_extras_lote` em totais por colaborador."""
+    resumo: Dict[Any, Dict] = {}
+    for dia in dias_detalhados:
+        item = resumo.setdefault(dia["colaborador"], {"dias": 0, "total_horas_extras": timedelta()})
+        item["dias"] += 1
+        item["total_horas_extras"] += dia["horas_extras_timedelta"]
+    return resumo
+
+
+def montar_relatorio_equipe(dias_detalhados: List[Dict], membros: Dict[Any, Dict]) -> Dict[str, List[Dict]]:
+    """
+    Linhas do relatório de uma equipe a partir do resultado de `calcular_horas_extras_lote`: o resumo
+    por colaborador (maiores totais primeiro) e os dias detalhados, agrupados por colaborador e em
+    ordem de nome e data. Tudo é identificado pelo ID do colaborador, nunca pelo nome (homônimos).
+    """
+    resumo = resumir_por_colaborador(dias_detalhados)
+    linhas_resumo = sorted(
+        (
+            {
+                "colaborador": colaborador_id,
+                "nome": membros[colaborador_id]['nome'],
+                "matricula": membros[colaborador_id]['matricula'],
+                "dias": item['dias'],
+                "total_horas_extras": item['total_horas_extras'],
+            }
+            for colaborador_id, item in resumo.items()
+        ),
+        key=lambda linha: linha['total_horas_extras'],
+        reverse=True
+    )
+    detalhes = [
+        {**dia, "nome": membros[dia['colaborador']]['nome']}
+        for dia in sorted(dias_detalhados, key=lambda d: (membros[d['colaborador']]['nome'], d['colaborador'], d['data']))
+    ]
+    return {"membros": linhas_resumo, "detalhes": detalhes}
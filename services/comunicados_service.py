@@ -1,8 +1,16 @@
 # services/comunicados_service.py
+import os
+import re
+import time
+import asyncio
+import hashlib
 import httpx
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
-from typing import List, Dict, Optional
+from datetime import datetime, time as horario, timedelta
+from typing import AsyncIterator, Iterable, List, Dict, Optional, Tuple
+
+from utils.cache import CacheTTL
 
 logger = logging.getLogger(__name__)
 SICOM_URL = "https://portalsicom1.tce.mg.gov.br/comunicado/"
@@ -11,45 +19,326 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-async def fetch_ultimos_comunicados(limit: int = 5) -> Optional[List[Dict]]:
+# Cortesia com o portal: requisições simultâneas e intervalo mínimo, em segundos, entre o início de duas requisições
+COMUNICADOS_REQUISICOES_SIMULTANEAS = int(os.getenv("COMUNICADOS_REQUISICOES_SIMULTANEAS", "1"))
+COMUNICADOS_INTERVALO_REQUISICOES = float(os.getenv("COMUNICADOS_INTERVALO_REQUISICOES", "2"))
+# Comunicados extraídos de cada página ao percorrer a paginação (mais que os exibidos por página no portal)
+COMUNICADOS_POR_PAGINA = 50
+
+
+# Só os <article> viram árvore; o restante da página (menus, estilos, barra lateral) é descartado. A classe
+# "post" é conferida depois, no find_all: durante a análise o SoupStrainer recebe o atributo class sem dividir
+SOMENTE_ARTIGOS = SoupStrainer('article')
+# Início de um <article> com a classe "post", localizado no texto bruto para recortar a página antes da análise
+INICIO_ARTIGO = re.compile(r'<article\b[^>]*\bclass=["\'](?:[^"\']*\s)?post(?:\s[^"\']*)?["\']', re.IGNORECASE)
+QUALQUER_ARTIGO = re.compile(r'<article\b', re.IGNORECASE)
+# Blocos cujo conteúdo o parser não trata como tags: um "<article" dentro deles não é um artigo
+BLOCOS_BRUTOS = (("<script", "</script"), ("<style", "</style"), ("<!--", "-->"))
+
+
+def _dentro_de_bloco_bruto(html: str, posicao: int) -> bool:
+    return any(html.rfind(abre, 0, posicao) > html.rfind(fecha, 0, posicao) for abre, fecha in BLOCOS_BRUTOS)
+
+
+def _recortar_artigos(html: str, limit: int) -> Tuple[str, bool]:
+    """
+    Trecho da página do primeiro <article> até o início do artigo "post" seguinte aos `limit`
+    primeiros, e se houve corte no final. Ocorrências dentro de scripts, estilos e comentários são
+    ignoradas, como faz o parser.
+    """
+    inicio = next(
+        (artigo.start() for artigo in QUALQUER_ARTIGO.finditer(html) if not _dentro_de_bloco_bruto(html, artigo.start())),
+        None
+    )
+    if inicio is None:
+        return html, False
+    posicao = 0
+    for artigo in INICIO_ARTIGO.finditer(html, inicio):
+        if _dentro_de_bloco_bruto(html, artigo.start()):
+            continue
+        if posicao == limit:
+            return html[inicio:artigo.start()], True
+        posicao += 1
+    return html[inicio:], False
+
+
+def _extrair_comunicados(html: str, limit: int) -> Optional[List[Dict]]:
+    """Extrai da página do portal os `limit` comunicados mais recentes (None se a estrutura não for reconhecida)."""
+    trecho, cortado = _recortar_artigos(html, limit)
+    articles = BeautifulSoup(trecho, 'html.parser', parse_only=SOMENTE_ARTIGOS).find_all('article', class_='post')
+    # O corte é uma busca textual: se sobrarem menos artigos que o esperado, a página inteira é analisada
+    if cortado and len(articles) < limit:
+        articles = BeautifulSoup(html, 'html.parser', parse_only=SOMENTE_ARTIGOS).find_all('article', class_='post')
+    if not articles:
+        logger.warning("Nenhum 'article' com a classe 'post' foi encontrado. A estrutura do site pode ter mudado.")
+        return None
+
+    comunicados = []
+    for article in articles[:limit]:
+        container = article.find('div', class_='post_text')
+        if not container:
+            continue
+
+        h2_tag = container.find('h2')
+        titulo_postagem = h2_tag.find('a') if h2_tag else None
+        data_postagem = h2_tag.find('span', class_='date') if h2_tag else None
+        resumo = container.find('p')
+
+        if titulo_postagem and resumo:
+            texto_resumo = resumo.get_text(separator=" ", strip=True)
+
+            comunicados.append({
+                "titulo_comunicado": titulo_postagem.get_text(strip=True),
+                "data_comunicado": data_postagem.get_text(strip=True) if data_postagem else "Data não encontrada",
+                "resumo": texto_resumo,
+                "link": titulo_postagem['href']
+            })
+
+    return comunicados
+
+
+class PortalComunicados:
+    """
+    Leitura da página de comunicados do portal SICOM com um único cliente HTTP (conexões mantidas
+    entre as consultas). As consultas são condicionais (ETag / Last-Modified): uma resposta 304, ou
+    um corpo com o mesmo hash da última leitura, reaproveita os comunicados já extraídos sem
+    analisar o HTML de novo. As requisições respeitam um limite de simultaneidade e um intervalo
+    mínimo entre elas. `transport` permite substituir a rede nos testes.
+    """
+
+    def __init__(self, url: str = SICOM_URL, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 requisicoes_simultaneas: int = COMUNICADOS_REQUISICOES_SIMULTANEAS,
+                 intervalo_requisicoes: float = COMUNICADOS_INTERVALO_REQUISICOES):
+        self.url = url
+        self.transport = transport
+        self.requisicoes_simultaneas = requisicoes_simultaneas
+        self.intervalo_requisicoes = intervalo_requisicoes
+        self._simultaneas = asyncio.Semaphore(requisicoes_simultaneas)
+        self._proxima_requisicao = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._hash_corpo: Optional[str] = None
+        self._corpo: Optional[str] = None
+        self._comunicados: Optional[List[Dict]] = None
+        self._limite_extraido = 0
+        self.consultas = 0
+        self.nao_modificadas = 0
+        self.extracoes = 0
+
+    def _cliente(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=HEADERS, verify=False, timeout=15.0, follow_redirects=True, transport=self.transport,
+                limits=httpx.Limits(max_connections=self.requisicoes_simultaneas),
+            )
+        return self._client
+
+    async def _requisitar(self, url: str, cabecalhos: Optional[Dict] = None) -> httpx.Response:
+        """GET respeitando a simultaneidade e o intervalo mínimo entre requisições ao portal."""
+        async with self._simultaneas:
+            # Reserva o horário desta requisição antes de esperar, para que as seguintes fiquem depois dela
+            agora = time.monotonic()
+            inicio = max(agora, self._proxima_requisicao)
+            self._proxima_requisicao = inicio + self.intervalo_requisicoes
+            if inicio > agora:
+                await asyncio.sleep(inicio - agora)
+            return await self._cliente().get(url, headers=cabecalhos)
+
+    async def buscar(self, limit: int = 5) -> Optional[List[Dict]]:
+        """Os `limit` comunicados mais recentes, extraídos da página só quando ela mudou desde a última consulta."""
+        cabecalhos = {}
+        if self._comunicados is not None:
+            if self._etag:
+                cabecalhos["If-None-Match"] = self._etag
+            if self._last_modified:
+                cabecalhos["If-Modified-Since"] = self._last_modified
+
+        inicio = time.perf_counter()
+        response = await self._requisitar(self.url, cabecalhos)
+        tempo_consulta = (time.perf_counter() - inicio) * 1000
+        self.consultas += 1
+
+        if response.status_code == 304:
+            self.nao_modificadas += 1
+            logger.debug(f"Comunicados: página não modificada (304) em {tempo_consulta:.0f} ms.")
+            return self.ultimos_obtidos(limit)
+        response.raise_for_status()
+
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        hash_corpo = hashlib.sha256(response.content).hexdigest()
+        if hash_corpo == self._hash_corpo and self._comunicados is not None:
+            self.nao_modificadas += 1
+            logger.debug(f"Comunicados: página sem alterações (mesmo hash) em {tempo_consulta:.0f} ms.")
+            return self.ultimos_obtidos(limit)
+
+        self._hash_corpo = hash_corpo
+        self._corpo = response.text
+        self._comunicados = None
+        tempo_extracao = self._extrair(limit)
+        logger.info(
+            f"Comunicados: página alterada ({len(response.content)} bytes) obtida em {tempo_consulta:.0f} ms "
+            f"e analisada em {tempo_extracao:.0f} ms."
+        )
+        return self.ultimos_obtidos(limit)
+
+    async def buscar_pagina(self, numero: int, limit: int = COMUNICADOS_POR_PAGINA) -> List[Dict]:
+        """Comunicados de uma página anterior da listagem (/page/N/); lista vazia depois da última página."""
+        response = await self._requisitar(f"{self.url}page/{numero}/")
+        self.consultas += 1
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return _extrair_comunicados(response.text, limit) or []
+
+    def ultimos_obtidos(self, limit: int) -> Optional[List[Dict]]:
+        """Comunicados da última página obtida, sem nova consulta."""
+        # Uma página já obtida, mas lida com um limite menor, é analisada de novo
+        if self._comunicados is not None and limit > self._limite_extraido:
+            self._extrair(limit)
+        return self._comunicados[:limit] if self._comunicados is not None else None
+
+    def _extrair(self, limit: int) -> float:
+        """Extrai os comunicados do corpo guardado e retorna o tempo gasto, em milissegundos."""
+        inicio = time.perf_counter()
+        self._comunicados = _extrair_comunicados(self._corpo, limit)
+        self._limite_extraido = limit
+        self.extracoes += 1
+        if self._comunicados is None:
+            # Estrutura não reconhecida: a próxima consulta não pode ser dada como "sem alterações"
+            self._hash_corpo = None
+        return (time.perf_counter() - inicio) * 1000
+
+    async def fechar(self):
+        """Fecha as conexões mantidas com o portal."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+portal_comunicados = PortalComunicados()
+
+# Comunicados guardados no snapshot compartilhado (o suficiente para o /comunicados)
+COMUNICADOS_SNAPSHOT = 5
+# Snapshot dos últimos comunicados servido ao /comunicados e renovado a cada execução da tarefa agendada.
+# Depois do TTL, o snapshot obsoleto ainda é servido enquanto uma única consulta o renova em segundo plano.
+cache_comunicados = CacheTTL(
+    "comunicados_sicom",
+    max_itens=1,
+    ttl=int(os.getenv("COMUNICADOS_CACHE_TTL", "120")),
+    ttl_negativo=30,
+    janela_obsoleta=int(os.getenv("COMUNICADOS_CACHE_JANELA_OBSOLETA", "600")),
+)
+CHAVE_SNAPSHOT = "ultimos"
+
+
+async def _carregar_snapshot() -> Optional[Tuple[Dict, ...]]:
+    comunicados = await portal_comunicados.buscar(COMUNICADOS_SNAPSHOT)
+    return tuple(comunicados) if comunicados is not None else None
+
+
+async def obter_comunicados_recentes() -> Optional[Tuple[Dict, ...]]:
     """
-    Busca os comunicados mais recentes do portal SICOM.
+    Snapshot compartilhado dos comunicados mais recentes: consultas simultâneas, com o snapshot
+    vencido, resultam em uma única consulta ao portal.
     """
     try:
-        async with httpx.AsyncClient(headers=HEADERS, verify=False) as client:
-            response = await client.get(SICOM_URL, follow_redirects=True, timeout=15.0)
-            response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        comunicados = []
-
-        articles = soup.find_all('article', class_='post') 
-        if not articles:
-            logger.warning("Nenhum 'article' com a classe 'post' foi encontrado. A estrutura do site pode ter mudado.")
-            return None
-
-        for article in articles[:limit]:
-            container = article.find('div', class_='post_text')
-            if not container:
-                continue
-
-            h2_tag = container.find('h2')
-            titulo_postagem = h2_tag.find('a') if h2_tag else None
-            data_postagem = h2_tag.find('span', class_='date') if h2_tag else None
-            resumo = container.find('p')
-
-            if titulo_postagem and resumo:
-                texto_resumo = resumo.get_text(separator=" ", strip=True)
-
-                comunicados.append({
-                    "titulo_comunicado": titulo_postagem.get_text(strip=True),
-                    "data_comunicado": data_postagem.get_text(strip=True) if data_postagem else "Data não encontrada",
-                    "resumo": texto_resumo,
-                    "link": titulo_postagem['href']
-                })
-
-        return comunicados
+        return await cache_comunicados.obter(CHAVE_SNAPSHOT, _carregar_snapshot)
     except Exception as e:
         logger.error(f"Erro inesperado no serviço de comunicados: {e}", exc_info=True)
+        return None
+
+
+async def atualizar_comunicados_recentes() -> Optional[Tuple[Dict, ...]]:
+    """
+    Consulta o portal agora (ignorando o TTL) e renova o snapshot compartilhado. Erros de rede e
+    de HTTP são propagados, para que quem consulta periodicamente possa espaçar as consultas.
+    """
+    return await cache_comunicados.recarregar(CHAVE_SNAPSHOT, _carregar_snapshot)
+
+
+async def percorrer_paginas(paginas_maximas: int) -> AsyncIterator[List[Dict]]:
+    """
+    Comunicados da listagem, página a página, a partir da primeira (a já obtida por
+    `atualizar_comunicados_recentes`, sem nova consulta) e até `paginas_maximas` páginas.
+    """
+    yield portal_comunicados.ultimos_obtidos(COMUNICADOS_POR_PAGINA) or []
+    for numero in range(2, paginas_maximas + 1):
+        comunicados = await portal_comunicados.buscar_pagina(numero)
+        if not comunicados:
+            return
+        yield comunicados
+
+
+def espera_solicitada(erro: Exception) -> Optional[float]:
+    """Segundos pedidos pelo portal no cabeçalho Retry-After de uma resposta 429 ou 503, se houver."""
+    if not isinstance(erro, httpx.HTTPStatusError) or erro.response.status_code not in (429, 503):
+        return None
+    try:
+        return max(float(erro.response.headers.get("Retry-After", "")), 0.0)
+    except ValueError:
+        return None
+
+
+class PoliticaConsulta:
+    """
+    Decide o intervalo até a próxima consulta ao portal. No expediente, as consultas começam a cada
+    `intervalo_minimo` segundos e se espaçam (até `intervalo_maximo`) enquanto não há novidades;
+    uma novidade volta ao mínimo. Erros espaçam as consultas em dobro a cada falha seguida (até
+    `intervalo_erro_maximo`), respeitando o Retry-After do portal. Fora do expediente a consulta é
+    feita a cada `intervalo_fora_expediente`, mas sempre também na abertura do expediente.
+    """
+
+    def __init__(self, intervalo_minimo: float, intervalo_maximo: float,
+                 intervalo_fora_expediente: float, intervalo_erro_maximo: float,
+                 inicio_expediente: horario, fim_expediente: horario,
+                 dias_uteis: Iterable[int] = range(5),
+                 fator_sem_novidade: float = 1.5, fator_erro: float = 2.0):
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+        self.intervalo_fora_expediente = intervalo_fora_expediente
+        self.intervalo_erro_maximo = intervalo_erro_maximo
+        self.inicio_expediente = inicio_expediente
+        self.fim_expediente = fim_expediente
+        self.dias_uteis = frozenset(dias_uteis)
+        self.fator_sem_novidade = fator_sem_novidade
+        self.fator_erro = fator_erro
+        self.intervalo = intervalo_minimo
+        self.espera_erro = 0.0
+        self.erros_seguidos = 0
+
+    def registrar_novidade(self):
+        self.intervalo = self.intervalo_minimo
+        self.erros_seguidos = 0
+
+    def registrar_sem_novidade(self):
+        self.intervalo = min(self.intervalo_maximo, self.intervalo * self.fator_sem_novidade)
+        self.erros_seguidos = 0
+
+    def registrar_erro(self, espera_solicitada: Optional[float] = None):
+        self.erros_seguidos += 1
+        espera = min(self.intervalo_erro_maximo, self.intervalo * self.fator_erro ** self.erros_seguidos)
+        self.espera_erro = max(espera, espera_solicitada or 0.0)
+
+    def em_expediente(self, agora: datetime) -> bool:
+        return agora.weekday() in self.dias_uteis and self.inicio_expediente <= agora.time() < self.fim_expediente
+
+    def _ate_o_expediente(self, agora: datetime) -> float:
+        """Segundos até a próxima abertura do expediente."""
+        for dias in range(8):
+            dia = agora.date() + timedelta(days=dias)
+            abertura = datetime.combine(dia, self.inicio_expediente, tzinfo=agora.tzinfo)
+            if dia.weekday() in self.dias_uteis and abertura > agora:
+                return (abertura - agora).total_seconds()
+        return self.intervalo_fora_expediente
 
-    return None
\ No newline at end of file
+    def proxima_espera(self, agora: datetime) -> float:
+        """Segundos até a próxima consulta, a partir de `agora` (com fuso horário)."""
+        if self.em_expediente(agora):
+            espera = self.intervalo
+        else:
+            espera = max(self.intervalo_minimo, min(self.intervalo_fora_expediente, self._ate_o_expediente(agora)))
+        if self.erros_seguidos:
+            espera = max(espera, self.espera_erro)
+        return espera
@@ -1,76 +1,311 @@
 # services/email_service.py
 import os
-import io
+import asyncio
 import logging
+import time
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from typing import Dict, List
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from services.pdf_storage import ArmazenamentoPDF, BytesLike, armazenamento_pdf
+from database.bot_queries import (
+    inserir_email_outbox,
+    reservar_emails_outbox,
+    concluir_email_outbox,
+    registrar_falha_email_outbox,
+    liberar_emails_outbox,
+)
 
 logger = logging.getLogger(__name__)
 
-def enviar_email_com_anexo(dados_formulario: Dict, pdf_stream: io.BytesIO) -> bool:
-    """Envia o e-mail com o PDF em anexo para o RH e para o colaborador."""
+EMAIL_HOST = os.getenv("EMAIL_HOST")
+EMAIL_PORT = os.getenv("EMAIL_PORT")
+EMAIL_USER = os.getenv("EMAIL_USER")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+EMAIL_RH_RECIPIENT = os.getenv("EMAIL_RH_RECIPIENT")
+
+# Tentativas de envio de cada e-mail da caixa de saída e espera entre elas (dobra a cada falha, até o máximo)
+EMAIL_TENTATIVAS = int(os.getenv("EMAIL_TENTATIVAS", "10"))
+EMAIL_BACKOFF_INICIAL = float(os.getenv("EMAIL_BACKOFF_INICIAL", "30"))
+EMAIL_BACKOFF_MAXIMO = float(os.getenv("EMAIL_BACKOFF_MAXIMO", "3600"))
+# Segundos sem mensagens até a conexão SMTP ser encerrada
+EMAIL_CONEXAO_OCIOSA = float(os.getenv("EMAIL_CONEXAO_OCIOSA", "60"))
+# E-mails reservados por vez e por quanto tempo a reserva impede outra instância de enviá-los
+EMAIL_OUTBOX_LOTE = int(os.getenv("EMAIL_OUTBOX_LOTE", "20"))
+EMAIL_OUTBOX_RESERVA = float(os.getenv("EMAIL_OUTBOX_RESERVA", "300"))
+
+
+def conectar_smtp() -> smtplib.SMTP:
+    """Abre a conexão SSL (porta 465) com o servidor configurado no .env e autentica."""
+    if not all([EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD]):
+        raise RuntimeError("Credenciais de e-mail não configuradas corretamente no arquivo .env.")
+    servidor = smtplib.SMTP_SSL(EMAIL_HOST, int(EMAIL_PORT), timeout=15)
     try:
-        dados_colaborador = dados_formulario["dados_colaborador"]
-        nome_colaborador = dados_colaborador.get('nome', 'Colaborador')
-
-        # --- Carrega as credenciais do ambiente ---
-        from_email = os.getenv("EMAIL_USER")
-        password = os.getenv("EMAIL_PASSWORD")
-        host = os.getenv("EMAIL_HOST")
-        port_str = os.getenv("EMAIL_PORT")
-        email_rh = os.getenv("EMAIL_RH_RECIPIENT")
-
-        if not all([from_email, password, host, port_str, email_rh]):
-            logger.error("Credenciais de e-mail ou e-mail do RH não configuradas corretamente no arquivo .env.")
-            return False
-        port = int(port_str)
-
-        # --- Monta a lista de destinatários ---
-        email_colaborador = dados_colaborador.get("email")
-        destinatarios: List[str] = [email_rh]
-        if email_colaborador:
-            destinatarios.append(email_colaborador)
-        else:
-            logger.warning(f"O e-mail do colaborador '{nome_colaborador}' não foi encontrado. O e-mail será enviado apenas para o RH.")
-
-        # --- Cria a mensagem ---
-        msg = MIMEMultipart()
-        msg['From'] = f"Bot Publito <{from_email}>"
-        msg['To'] = ", ".join(destinatarios)
-        msg['Subject'] = f"Solicitação de Horas Extras - {nome_colaborador}"
-
-        body = (
-            f"Olá,\n\n"
-            f"Segue em anexo o formulário de solicitação de horas extras preenchido por {nome_colaborador}.\n\n"
-            f"Justificativa informada:\n"
-            f"-------------------------------------\n"
-            f"{dados_formulario['justificativa']}\n"
-            f"-------------------------------------\n\n"
-            f"Atenciosamente,\n"
-            f"Publito Bot"
-        )
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-
-        # --- Anexa o PDF ---
-        pdf_stream.seek(0)
-        attachment = MIMEApplication(pdf_stream.read(), _subtype="pdf")
-        attachment.add_header('Content-Disposition', 'attachment', filename=f"Formulario_Horas_Extras_{nome_colaborador.replace(' ', '_')}.pdf")
+        servidor.login(EMAIL_USER, EMAIL_PASSWORD)
+    except BaseException:
+        servidor.close()
+        raise
+    return servidor
+
+
+def compor_email_horas_extras(dados_formulario: Dict) -> Dict:
+    """Assunto, corpo, destinatários (RH e colaborador) e nome do anexo do e-mail de uma solicitação aprovada."""
+    dados_colaborador = dados_formulario["dados_colaborador"]
+    nome_colaborador = dados_colaborador.get('nome', 'Colaborador')
+
+    if not EMAIL_RH_RECIPIENT:
+        raise RuntimeError("E-mail do RH não configurado no arquivo .env.")
+
+    # --- Monta a lista de destinatários ---
+    email_colaborador = dados_colaborador.get("email")
+    destinatarios: List[str] = [EMAIL_RH_RECIPIENT]
+    if email_colaborador:
+        destinatarios.append(email_colaborador)
+    else:
+        logger.warning(f"O e-mail do colaborador '{nome_colaborador}' não foi encontrado. O e-mail será enviado apenas para o RH.")
+
+    corpo = (
+        f"Olá,\n\n"
+        f"Segue em anexo o formulário de solicitação de horas extras preenchido por {nome_colaborador}.\n\n"
+        f"Justificativa informada:\n"
+        f"-------------------------------------\n"
+        f"{dados_formulario['justificativa']}\n"
+        f"-------------------------------------\n\n"
+        f"Atenciosamente,\n"
+        f"Publito Bot"
+    )
+    return {
+        "assunto": f"Solicitação de Horas Extras - {nome_colaborador}",
+        "corpo": corpo,
+        "destinatarios": destinatarios,
+        "anexo_nome": f"Formulario_Horas_Extras_{nome_colaborador.replace(' ', '_')}.pdf",
+    }
+
+
+def montar_mensagem(assunto: str, corpo: str, destinatarios: List[str],
+                    anexo: Optional[BytesLike] = None, anexo_nome: Optional[str] = None) -> MIMEMultipart:
+    """Cria a mensagem MIME, com o PDF em anexo quando houver."""
+    msg = MIMEMultipart()
+    msg['From'] = f"Bot Publito <{EMAIL_USER}>"
+    msg['To'] = ", ".join(destinatarios)
+    msg['Subject'] = assunto
+    msg.attach(MIMEText(corpo, 'plain', 'utf-8'))
+
+    if anexo is not None:
+        attachment = MIMEApplication(bytes(anexo), _subtype="pdf")
+        attachment.add_header('Content-Disposition', 'attachment', filename=anexo_nome or "anexo.pdf")
         msg.attach(attachment)
+    return msg
+
 
-        # --- Envia o e-mail ---
-        # Para porta 465 (SSL)
-        with smtplib.SMTP_SSL(host, port, timeout=15) as server:
-            server.login(from_email, password)
-            server.sendmail(from_email, destinatarios, msg.as_string())
-            
-        logger.info(f"E-mail de horas extras para '{nome_colaborador}' enviado com sucesso para: {destinatarios}.")
+def _erro_permanente(erro: Exception) -> bool:
+    """Recusas definitivas do servidor (códigos 5xx, destinatários recusados) não adiantam ser repetidas."""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
         return True
-    except smtplib.SMTPException as e:
-        logger.error(f"Erro de SMTP ao enviar e-mail: {e}", exc_info=True)
-        return False
-    except Exception as e:
-        logger.error(f"Falha inesperada ao enviar e-mail: {e}", exc_info=True)
-        return False
\ No newline at end of file
+    return isinstance(erro, smtplib.SMTPResponseException) and 500 <= erro.smtp_code < 600
+
+
+def _falha_da_mensagem(erro: Exception) -> bool:
+    """Recusas de uma mensagem específica; qualquer outro erro indica servidor indisponível ou mal configurado."""
+    return isinstance(erro, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError))
+
+
+class EntregaEmail:
+    """
+    Mantém uma única conexão SMTP autenticada, reutilizada entre as mensagens e encerrada após um
+    período ocioso. Cada chamada a `enviar` é uma tentativa: em caso de erro a conexão é descartada
+    e a exceção propagada (as novas tentativas ficam com a caixa de saída). `conectar` permite usar
+    outro servidor nos testes.
+    """
+
+    def __init__(self, conectar: Callable[[], smtplib.SMTP] = conectar_smtp,
+                 remetente: Optional[str] = EMAIL_USER,
+                 conexao_ociosa: float = EMAIL_CONEXAO_OCIOSA):
+        self.conectar = conectar
+        self.remetente = remetente
+        self.conexao_ociosa = conexao_ociosa
+        self._conexao: Optional[smtplib.SMTP] = None
+        self._ultimo_uso = 0.0
+        self._em_uso = asyncio.Lock()
+        self.enviados = 0
+        self.falhas = 0
+        self.conexoes_abertas = 0
+
+    async def enviar(self, mensagem: MIMEMultipart, destinatarios: List[str]):
+        """Envia pela conexão mantida (aberta na primeira mensagem), uma mensagem por vez."""
+        async with self._em_uso:
+            try:
+                await asyncio.to_thread(self._enviar_na_conexao, mensagem, destinatarios)
+            except Exception:
+                self.falhas += 1
+                await asyncio.to_thread(self._desconectar)
+                raise
+            finally:
+                self._ultimo_uso = time.monotonic()
+        self.enviados += 1
+        logger.info(f"E-mail '{mensagem['Subject']}' enviado com sucesso para: {destinatarios}.")
+
+    def _enviar_na_conexao(self, mensagem: MIMEMultipart, destinatarios: List[str]):
+        """Executado em uma thread, com a conexão reservada por `_em_uso`."""
+        if self._conexao is not None:
+            try:
+                self._conexao.sendmail(self.remetente, destinatarios, mensagem.as_string())
+                return
+            except smtplib.SMTPServerDisconnected:
+                # O servidor encerrou a conexão ociosa: reconecta na hora, sem contar como tentativa
+                self._conexao = None
+        self._conexao = self.conectar()
+        self.conexoes_abertas += 1
+        self._conexao.sendmail(self.remetente, destinatarios, mensagem.as_string())
+
+    def _desconectar(self):
+        if self._conexao is None:
+            return
+        conexao, self._conexao = self._conexao, None
+        try:
+            conexao.quit()
+        except Exception:
+            conexao.close()
+
+    async def encerrar_se_ociosa(self):
+        """Encerra a conexão se nenhuma mensagem foi enviada nos últimos `conexao_ociosa` segundos."""
+        if self._conexao is None or self._em_uso.locked():
+            return
+        if time.monotonic() - self._ultimo_uso >= self.conexao_ociosa:
+            async with self._em_uso:
+                await asyncio.to_thread(self._desconectar)
+
+    async def fechar(self):
+        """Encerra a conexão, aguardando o envio em andamento."""
+        async with self._em_uso:
+            await asyncio.to_thread(self._desconectar)
+
+
+class CaixaSaidaEmail:
+    """
+    Caixa de saída durável (tabela public.email_outbox). Quem envia um e-mail apenas o grava; os
+    envios são feitos em segundo plano, em lotes reservados com FOR UPDATE SKIP LOCKED, e cada
+    tentativa fica registrada. Falhas temporárias são reagendadas com espera exponencial; se o
+    servidor SMTP estiver fora do ar, o lote é interrompido e devolvido, sem gastar uma tentativa
+    de cada e-mail. O anexo é referenciado pelo hash no armazenamento de PDFs e lido só no envio.
+    """
+
+    def __init__(self, entrega: EntregaEmail, armazenamento: ArmazenamentoPDF,
+                 lote: int = EMAIL_OUTBOX_LOTE,
+                 reserva: float = EMAIL_OUTBOX_RESERVA,
+                 tentativas: int = EMAIL_TENTATIVAS,
+                 backoff_inicial: float = EMAIL_BACKOFF_INICIAL,
+                 backoff_maximo: float = EMAIL_BACKOFF_MAXIMO):
+        self.entrega = entrega
+        self.armazenamento = armazenamento
+        self.lote = lote
+        self.reserva = timedelta(seconds=reserva)
+        self.tentativas = tentativas
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self._processando = asyncio.Lock()
+        self._tarefas: Set[asyncio.Task] = set()
+
+    async def registrar(self, assunto: str, corpo: str, destinatarios: List[str],
+                        anexo_pdf_hash: Optional[str] = None, anexo_nome: Optional[str] = None) -> Optional[int]:
+        """Grava o e-mail na caixa de saída e dispara o envio em segundo plano. Retorna o ID do registro."""
+        try:
+            email_id = await inserir_email_outbox(assunto, corpo, destinatarios, anexo_pdf_hash, anexo_nome)
+        except Exception as e:
+            logger.error(f"Erro ao gravar o e-mail '{assunto}' na caixa de saída: {e}", exc_info=True)
+            return None
+        self.disparar()
+        return email_id
+
+    async def gravar_horas_extras(self, dados_formulario: Dict, pdf_hash: str) -> int:
+        """
+        Grava o e-mail com o PDF assinado de uma solicitação para o RH e o colaborador, sem disparar o
+        envio: pode fazer parte da transação de quem chama, que dispara o envio depois do commit.
+        Erros são propagados.
+        """
+        email = compor_email_horas_extras(dados_formulario)
+        return await inserir_email_outbox(anexo_pdf_hash=pdf_hash, **email)
+
+    def disparar(self):
+        """Envia os pendentes em segundo plano, sem esperar o próximo ciclo da tarefa periódica (que fica para as novas tentativas)."""
+        tarefa = asyncio.create_task(self.processar(), name="caixa-saida-email")
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    def espera(self, tentativa: int) -> timedelta:
+        """Espera até a próxima tentativa depois da falha de número `tentativa` (1, 2, ...)."""
+        return timedelta(seconds=min(self.backoff_maximo, self.backoff_inicial * 2 ** (tentativa - 1)))
+
+    async def processar(self) -> int:
+        """Envia os e-mails pendentes, lote a lote, até esvaziar a fila ou o servidor falhar. Retorna quantos foram enviados."""
+        enviados = 0
+        try:
+            async with self._processando:
+                while True:
+                    enviados_lote, continuar = await self._processar_lote()
+                    enviados += enviados_lote
+                    if not continuar:
+                        break
+            await self.entrega.encerrar_se_ociosa()
+        except Exception as e:
+            logger.error(f"Erro ao processar a caixa de saída de e-mails: {e}", exc_info=True)
+        return enviados
+
+    async def _processar_lote(self) -> Tuple[int, bool]:
+        """Envia um lote reservado. Retorna os enviados e se vale a pena buscar o próximo lote."""
+        emails = await reservar_emails_outbox(self.lote, self.reserva)
+        enviados = 0
+        for posicao, email in enumerate(emails):
+            tentativa = email["tentativas"] + 1
+            try:
+                mensagem = self._montar(email)
+            except Exception as e:
+                # Sem o anexo não há o que reenviar
+                logger.error(f"E-mail {email['id']} da caixa de saída descartado: {e}")
+                await registrar_falha_email_outbox(email["id"], str(e), None)
+                continue
+
+            try:
+                await self.entrega.enviar(mensagem, email["destinatarios"])
+            except Exception as e:
+                definitiva = (_falha_da_mensagem(e) and _erro_permanente(e)) or tentativa >= self.tentativas
+                espera = None if definitiva else self.espera(tentativa)
+                await registrar_falha_email_outbox(email["id"], str(e), espera)
+                if definitiva:
+                    logger.error(f"E-mail {email['id']} ('{email['assunto']}') não enviado após {tentativa} tentativa(s): {e}")
+                else:
+                    logger.warning(f"Falha ao enviar o e-mail {email['id']} (tentativa {tentativa}): {e}. Nova tentativa em {espera.total_seconds():.0f}s.")
+                if not _falha_da_mensagem(e):
+                    # Servidor indisponível: o restante do lote volta para a fila junto com este e-mail
+                    restantes = [restante["id"] for restante in emails[posicao + 1:]]
+                    await liberar_emails_outbox(restantes, self.espera(tentativa))
+                    return enviados, False
+                continue
+
+            await concluir_email_outbox(email["id"])
+            enviados += 1
+        return enviados, len(emails) == self.lote
+
+    def _montar(self, email: Dict) -> MIMEMultipart:
+        if not email["anexo_pdf_hash"]:
+            return montar_mensagem(email["assunto"], email["corpo"], email["destinatarios"])
+        with self.armazenamento.mapear(email["anexo_pdf_hash"]) as pdf:
+            return montar_mensagem(email["assunto"], email["corpo"], email["destinatarios"], pdf, email["anexo_nome"])
+
+    async def fechar(self, timeout: float = 30):
+        """Aguarda (até `timeout` segundos) os envios em andamento e encerra a conexão SMTP."""
+        if self._tarefas:
+            _, pendentes = await asyncio.wait(self._tarefas, timeout=timeout)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if pendentes:
+                # O que não foi enviado continua na caixa de saída para a próxima execução
+                logger.warning(f"Encerrando com {len(pendentes)} envio(s) de e-mail em andamento.")
+        await self.entrega.fechar()
+
+
+entrega_email = EntregaEmail()
+caixa_saida_email = CaixaSaidaEmail(entrega_email, armazenamento_pdf)
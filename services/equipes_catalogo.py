@@ -0,0 +1,60 @@
+# services/equipes_catalogo.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from services.portal_service import PortalDatabaseService, portal_service
+from utils.indice_texto import IndiceTexto
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoEquipes:
+    """Snapshot em memória de portalrh.equipe, indexado para o autocomplete de equipes."""
+
+    def __init__(self, portal: PortalDatabaseService):
+        self.portal = portal
+        self._indice = IndiceTexto([], campos=("descricao",))
+        self._lock = asyncio.Lock()
+        self.atualizado_em: Optional[datetime] = None
+
+    @property
+    def carregado(self) -> bool:
+        return self.atualizado_em is not None
+
+    async def atualizar(self):
+        """Recarrega o snapshot a partir do banco corporativo e reconstrói o índice."""
+        async with self._lock:
+            equipes = await self.portal.buscar_todas_equipes_async()
+            # O índice é trocado de uma só vez: leitores nunca veem um snapshot parcial
+            self._indice = IndiceTexto(equipes, campos=("descricao",))
+            self.atualizado_em = datetime.now()
+        logger.info(f"Catálogo de equipes atualizado com {len(equipes)} equipe(s).")
+
+    async def garantir_carregado(self):
+        """Carrega o snapshot sob demanda caso a atualização periódica ainda não tenha rodado."""
+        if not self.carregado:
+            await self.atualizar()
+
+    def buscar(self, termo: str, limite: int = 25) -> List[Dict]:
+        """Busca equipes no snapshot por substring, ignorando acentos e caixa."""
+        return self._indice.buscar(termo, limite)
+
+    async def autocompletar(self, termo: str, limite: int = 25) -> List[Dict]:
+        """Busca para autocomplete; antes da primeira carga do snapshot, consulta o banco diretamente."""
+        if self.carregado:
+            return self.buscar(termo, limite)
+        return (await self.portal.buscar_equipes_autocomplete_async(termo))[:limite]
+
+    def obter(self, equipe_id: int) -> Optional[Dict]:
+        """Retorna uma equipe do snapshot pelo ID."""
+        return next((equipe for equipe in self._indice.itens if equipe['id'] == equipe_id), None)
+
+    async def todas(self) -> List[Dict]:
+        """Retorna todas as equipes do snapshot, ordenadas por descrição."""
+        await self.garantir_carregado()
+        return list(self._indice.itens)
+
+
+catalogo_equipes = CatalogoEquipes(portal_service)
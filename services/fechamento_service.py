@@ -0,0 +1,123 @@
+# services/fechamento_service.py
+import os
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from services.pdf_pool import pool_pdf
+from services.pdf_service import gerar_pdf_totais_fechamento, consolidar_pdfs
+from services.pdf_storage import armazenamento_pdf
+from database.bot_queries import iterar_solicitacoes_aprovadas, registrar_pdf_solicitacao
+from services.formulario_service import reidratar_formulario, gerar_e_armazenar_pdf
+
+logger = logging.getLogger(__name__)
+
+# Documentos assinados que faltam no armazenamento e são gerados ao mesmo tempo durante o fechamento
+FECHAMENTO_RENDERIZACOES_SIMULTANEAS = int(os.getenv("FECHAMENTO_RENDERIZACOES_SIMULTANEAS", "8"))
+
+
+def montar_pdf_fechamento(dados_fechamento: Dict, secoes: List[Dict]) -> str:
+    """Gera a página de totais, junta os documentos e armazena o consolidado (executado no pool de renderização)."""
+    capa = gerar_pdf_totais_fechamento(dados_fechamento)
+    temporario = armazenamento_pdf.criar_temporario()
+    try:
+        consolidar_pdfs(temporario, capa, "Totais do período", secoes)
+        return armazenamento_pdf.importar(temporario)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def _dados_aprovador(solicitacao: Dict) -> Dict:
+    """Reconstrói o bloco de assinatura de uma aprovação cujo PDF assinado não está no armazenamento."""
+    data_decisao: Optional[datetime] = solicitacao["data_decisao"]
+    return {
+        "nome": solicitacao["responsavel_nome"] or f"ID {solicitacao['responsavel_discord_id']}",
+        "id_discord": solicitacao["responsavel_discord_id"],
+        "data_hora": data_decisao.strftime('%d/%m/%Y às %H:%M:%S') if data_decisao else "-",
+    }
+
+
+class FechamentoMensal:
+    """Consolida em um único PDF os documentos das solicitações aprovadas de um período."""
+
+    def __init__(self, renderizacoes_simultaneas: int = FECHAMENTO_RENDERIZACOES_SIMULTANEAS):
+        self.renderizacoes_simultaneas = renderizacoes_simultaneas
+
+    async def _pdf_assinado(self, solicitacao: Dict, dados_formulario: Dict) -> str:
+        """Hash do PDF assinado: o armazenado ou, se faltar, um gerado agora e vinculado à solicitação."""
+        pdf_hash = solicitacao["pdf_assinado_hash"]
+        if pdf_hash and armazenamento_pdf.existe(pdf_hash):
+            return pdf_hash
+        dados_para_assinar = dict(dados_formulario)
+        dados_para_assinar["dados_aprovador"] = _dados_aprovador(solicitacao)
+        pdf_hash = await pool_pdf.executar(gerar_e_armazenar_pdf, dados_para_assinar)
+        await registrar_pdf_solicitacao(solicitacao["id"], pdf_hash, assinado=True)
+        return pdf_hash
+
+    async def gerar(self, data_inicio: date, data_fim: date) -> Optional[Dict]:
+        """
+        Percorre as solicitações aprovadas do período, gera em paralelo os PDFs assinados que faltarem
+        e monta o consolidado: uma página de totais e, por colaborador, os seus documentos. Retorna o
+        hash do PDF e os totais, ou None se não houver solicitações aprovadas no período.
+        """
+        secoes: List[Dict] = []
+        colaboradores: List[Dict] = []
+        pendentes: Dict[asyncio.Task, Dict] = {}
+        solicitante_atual = None
+
+        try:
+            async for solicitacao in iterar_solicitacoes_aprovadas(data_inicio, data_fim):
+                dados_formulario = reidratar_formulario(solicitacao["dados_formulario"])
+                solicitante = solicitacao["solicitante_discord_id"]
+                nome = dados_formulario.get("dados_colaborador", {}).get("nome", "N/A")
+                dias = [
+                    dia for dia in dados_formulario["detalhes_selecionados"]
+                    if data_inicio <= dia["data"] <= data_fim
+                ]
+
+                # As linhas vêm ordenadas pelo nome e agrupadas pelo solicitante: uma nova seção começa quando
+                # o colaborador muda (homônimos têm seções e totais próprios)
+                if solicitante != solicitante_atual:
+                    solicitante_atual = solicitante
+                    secoes.append({"titulo": nome, "documentos": []})
+                    colaboradores.append({"nome": nome, "solicitacoes": 0, "dias": 0, "total_horas_extras": timedelta()})
+                colaboradores[-1]["solicitacoes"] += 1
+                colaboradores[-1]["dias"] += len(dias)
+                colaboradores[-1]["total_horas_extras"] += sum((dia["horas_extras_timedelta"] for dia in dias), timedelta())
+
+                documento = {"titulo": f"Solicitação #{solicitacao['id']}"}
+                secoes[-1]["documentos"].append(documento)
+                pendentes[asyncio.create_task(self._pdf_assinado(solicitacao, dados_formulario))] = documento
+                # Limita as renderizações em andamento: o cursor só avança quando alguma termina
+                if len(pendentes) >= self.renderizacoes_simultaneas:
+                    concluidas, _ = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                    self._registrar_concluidas(concluidas, pendentes)
+
+            if pendentes:
+                concluidas, _ = await asyncio.wait(pendentes)
+                self._registrar_concluidas(concluidas, pendentes)
+        except BaseException:
+            # Um fechamento incompleto não é entregue: as renderizações restantes são descartadas
+            for tarefa in pendentes:
+                tarefa.cancel()
+            raise
+
+        if not secoes:
+            return None
+
+        dados_fechamento = {"data_inicio": data_inicio, "data_fim": data_fim, "colaboradores": colaboradores}
+        pdf_hash = await pool_pdf.executar(montar_pdf_fechamento, dados_fechamento, secoes)
+        quantidade = sum(colaborador["solicitacoes"] for colaborador in colaboradores)
+        logger.info(f"Fechamento de {data_inicio} a {data_fim} consolidado: {quantidade} solicitação(ões), PDF {pdf_hash[:12]}.")
+        return {"pdf_hash": pdf_hash, "colaboradores": colaboradores, "solicitacoes": quantidade}
+
+    @staticmethod
+    def _registrar_concluidas(concluidas, pendentes: Dict[asyncio.Task, Dict]):
+        """Anota o caminho dos documentos prontos; a falha de qualquer um deles interrompe o fechamento."""
+        for tarefa in concluidas:
+            documento = pendentes.pop(tarefa)
+            documento["caminho"] = str(armazenamento_pdf.caminho(tarefa.result()))
+
+
+fechamento_mensal = FechamentoMensal()
@@ -0,0 +1,47 @@
+# services/formulario_service.py
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict
+
+from services.pdf_service import gerar_pdf_horas_extras, carimbar_aprovacao
+from services.pdf_storage import armazenamento_pdf
+
+
+def sanitizar_para_json(data: Any) -> Any:
+    """Converte tipos de dados não serializáveis (Decimal, date, etc.) para tipos JSON."""
+    if isinstance(data, dict):
+        return {key: sanitizar_para_json(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [sanitizar_para_json(item) for item in data]
+    if isinstance(data, Decimal):
+        return float(data)
+    if isinstance(data, timedelta):
+        return data.total_seconds()
+    if isinstance(data, (date, datetime)):
+        return data.isoformat()
+    return data
+
+def reidratar_formulario(dados_formulario: Dict) -> Dict:
+    """Desfaz `sanitizar_para_json` nos campos usados pelo PDF e pelas mensagens (datas e horas extras)."""
+    dados = dict(dados_formulario)
+    dados["detalhes_selecionados"] = [
+        {
+            **dia,
+            "data": datetime.fromisoformat(dia["data"]).date() if isinstance(dia["data"], str) else dia["data"],
+            "horas_extras_timedelta": timedelta(seconds=dia["horas_extras_timedelta"]),
+        }
+        for dia in dados_formulario.get("detalhes_selecionados", [])
+    ]
+    return dados
+
+# As funções abaixo rodam no pool de renderização e, por isso, ficam fora das views e dos cogs
+
+def gerar_e_armazenar_pdf(dados_formulario: Dict) -> str:
+    """Gera o PDF e o grava no armazenamento, retornando o hash."""
+    return armazenamento_pdf.salvar(gerar_pdf_horas_extras(dados_formulario).getbuffer())
+
+def carimbar_pdf_armazenado(pdf_hash: str, dados_aprovador: Dict) -> str:
+    """Carimba a assinatura sobre o PDF de revisão armazenado e armazena o resultado, retornando o novo hash."""
+    with armazenamento_pdf.mapear(pdf_hash) as pdf:
+        pdf_assinado = carimbar_aprovacao(pdf, dados_aprovador)
+    return armazenamento_pdf.salvar(pdf_assinado.getbuffer())
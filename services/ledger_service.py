@@ -0,0 +1,102 @@
+# services/ledger_service.py
+import os
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from services.portal_service import PortalDatabaseService, portal_service, DIAS_PONTO_RECENTE
+from database.bot_queries import (
+    buscar_marca_dagua,
+    gravar_ledger_horas_extras,
+    buscar_dias_disponiveis_ledger,
+    possui_historico_ledger,
+    buscar_datas_bloqueadas,
+)
+
+logger = logging.getLogger(__name__)
+
+NOME_SINCRONIZACAO = "ledger_horas_extras"
+# Dias já sincronizados que são recalculados a cada execução, para absorver batidas ajustadas depois
+LEDGER_DIAS_REPROCESSAMENTO = int(os.getenv("LEDGER_DIAS_REPROCESSAMENTO", "3"))
+
+
+class LedgerHorasExtras:
+    """Ledger local das horas extras por dia, sincronizado de forma incremental a partir do ponto corporativo."""
+
+    def __init__(self, portal: PortalDatabaseService):
+        self.portal = portal
+
+    async def sincronizar(self, hoje: Optional[date] = None) -> int:
+        """
+        Recalcula os dias desde a marca d'água (menos a janela de reprocessamento) até ontem e grava
+        no ledger. O dia corrente nunca é materializado, pois ainda pode receber batidas.
+        Retorna a quantidade de dias com horas extras gravados.
+        """
+        hoje = hoje or date.today()
+        data_fim = hoje - timedelta(days=1)
+        marca = await buscar_marca_dagua(NOME_SINCRONIZACAO)
+        if marca is None:
+            data_inicio = hoje - timedelta(days=DIAS_PONTO_RECENTE)
+        else:
+            # Após uma parada longa, não há motivo para recalcular além da janela usada na seleção de dias
+            data_inicio = max(
+                min(marca, data_fim) - timedelta(days=LEDGER_DIAS_REPROCESSAMENTO - 1),
+                hoje - timedelta(days=DIAS_PONTO_RECENTE),
+            )
+
+        dias = await self.portal.buscar_horas_extras_por_discord_async(data_inicio, data_fim)
+        await gravar_ledger_horas_extras(NOME_SINCRONIZACAO, data_inicio, data_fim, dias)
+        logger.info(f"Ledger de horas extras sincronizado de {data_inicio} a {data_fim}: {len(dias)} dia(s).")
+        return len(dias)
+
+    async def sincronizado(self, hoje: Optional[date] = None) -> bool:
+        """Indica se o ledger cobre todos os dias até ontem."""
+        hoje = hoje or date.today()
+        marca = await buscar_marca_dagua(NOME_SINCRONIZACAO)
+        return marca is not None and marca >= hoje - timedelta(days=1)
+
+    async def coberto(self, id_discord: int, hoje: Optional[date] = None) -> bool:
+        """
+        Indica se o colaborador já entrava nas sincronizações anteriores à última. Quem foi vinculado ao
+        Discord depois disso só tem no ledger os dias da janela de reprocessamento; sem nenhum dia mais
+        antigo, não há como distinguir "sem horas extras" de "ainda não sincronizado".
+        """
+        hoje = hoje or date.today()
+        return await possui_historico_ledger(
+            id_discord,
+            hoje - timedelta(days=DIAS_PONTO_RECENTE),
+            hoje - timedelta(days=LEDGER_DIAS_REPROCESSAMENTO + 1),
+        )
+
+    async def buscar_dias_disponiveis(self, id_discord: int) -> List[Dict]:
+        """
+        Dias recentes com horas extras ainda não lançados em solicitações ativas. Os dias passados vêm
+        do ledger e só o dia corrente é consultado no banco corporativo; se o ledger estiver
+        desatualizado ou não tiver o histórico do colaborador, todo o período é consultado ao vivo.
+        """
+        hoje = date.today()
+        data_inicio = hoje - timedelta(days=DIAS_PONTO_RECENTE)
+
+        if not await self.sincronizado(hoje):
+            logger.warning("Ledger de horas extras desatualizado. Consultando o ponto diretamente no banco corporativo.")
+            dias = await self.portal.buscar_detalhes_ponto_recente_async(id_discord)
+        elif not await self.coberto(id_discord, hoje):
+            logger.info(f"Ledger sem histórico para {id_discord}. Consultando o ponto diretamente no banco corporativo.")
+            dias = await self.portal.buscar_detalhes_ponto_recente_async(id_discord)
+        else:
+            dias_ledger = await buscar_dias_disponiveis_ledger(id_discord, data_inicio, hoje - timedelta(days=1))
+            dias = await self.portal.buscar_detalhes_ponto_periodo_async(id_discord, hoje, hoje)
+            dias += [
+                {
+                    "data": dia["data"],
+                    "batidas_str": dia["batidas_str"],
+                    "horas_extras_timedelta": timedelta(minutes=dia["minutos_extras"]),
+                }
+                for dia in dias_ledger
+            ]
+
+        datas_bloqueadas = set(await buscar_datas_bloqueadas(id_discord))
+        return [dia for dia in dias if dia['data'] not in datas_bloqueadas]
+
+
+ledger_horas_extras = LedgerHorasExtras(portal_service)
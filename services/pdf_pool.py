@@ -0,0 +1,157 @@
+# services/pdf_pool.py
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PDF_POOL_PROCESSOS = int(os.getenv("PDF_POOL_PROCESSOS", "2"))
+# Máximo de renderizações em andamento ou na fila; acima disso os chamadores aguardam a vez
+PDF_POOL_FILA_MAXIMA = int(os.getenv("PDF_POOL_FILA_MAXIMA", "32"))
+
+# Módulos carregados uma única vez no servidor (forkserver) do qual os processos de trabalho são criados.
+# O "__main__" fica de fora: reimportar o main.py reconfiguraria o logging e abriria os clientes do bot.
+MODULOS_PRECARREGADOS = ["services.pdf_service", "services.formulario_service"]
+
+
+def _aquecer() -> int:
+    """
+    Carrega o ReportLab, as fontes padrão e o modelo dos PDFs (estilos e imagens já codificadas) no
+    processo de trabalho antes da primeira renderização real.
+    """
+    import io
+    from reportlab.pdfgen import canvas
+    from services.pdf_service import modelo_pdf
+    c = canvas.Canvas(io.BytesIO())
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(0, 0, "aquecimento")
+    c.save()
+    modelo_pdf()
+    return os.getpid()
+
+
+def _executar_com_tempo(funcao: Callable, args: Tuple) -> Tuple[Any, float]:
+    """Executa a tarefa no processo de trabalho e mede o tempo gasto só com a renderização."""
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+class PoolRenderizacaoPDF:
+    """
+    Pool de processos dedicado à geração de PDFs. O ReportLab é CPU-bound e segura o GIL: fora do
+    processo principal, a renderização não atrasa o heartbeat do gateway nem os demais comandos.
+    As tarefas e os seus argumentos precisam ser serializáveis (funções de módulo, dicts, datas...).
+    """
+
+    def __init__(self, processos: int = PDF_POOL_PROCESSOS, fila_maxima: int = PDF_POOL_FILA_MAXIMA):
+        self.processos = processos
+        self.fila_maxima = fila_maxima
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._vagas: Optional[asyncio.Semaphore] = None
+        self.pendentes = 0   # aguardando vaga + entregues ao pool
+        self.no_pool = 0     # entregues ao pool (em renderização ou na fila interna do executor)
+        self.concluidas = 0
+        self.falhas = 0
+        self.recriacoes = 0
+        self.tempo_renderizacao_total = 0.0
+        self.tempo_renderizacao_maximo = 0.0
+        self.tempo_espera_total = 0.0
+
+    @property
+    def ativo(self) -> bool:
+        return self._executor is not None
+
+    def _criar_executor(self) -> ProcessPoolExecutor:
+        # forkserver: o bot já tem threads (resolver do aiohttp, executor padrão do asyncio) e um fork do
+        # processo principal poderia herdar locks presos. Os processos de trabalho saem de um servidor
+        # iniciado do zero, que carrega uma única vez os módulos de renderização.
+        contexto = multiprocessing.get_context("forkserver")
+        contexto.set_forkserver_preload(MODULOS_PRECARREGADOS)
+        return ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+
+    def _recriar(self, executor: ProcessPoolExecutor):
+        """Substitui um executor quebrado (processo de trabalho encerrado abruptamente) por um novo."""
+        if self._executor is not executor:
+            return  # outra tarefa que falhou junto já recriou o pool
+        logger.error("Um processo do pool de renderização de PDF foi encerrado abruptamente. Recriando o pool.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._criar_executor()
+        self.recriacoes += 1
+
+    async def iniciar(self):
+        """Cria os processos de trabalho e os aquece."""
+        if self._executor is not None:
+            return
+        self._executor = self._criar_executor()
+        self._vagas = asyncio.Semaphore(self.fila_maxima)
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _aquecer) for _ in range(self.processos)))
+        logger.info(f"Pool de renderização de PDF iniciado com {self.processos} processo(s): {sorted(set(pids))}.")
+
+    async def executar(self, funcao: Callable, *args) -> Any:
+        """
+        Executa `funcao(*args)` em um processo do pool e retorna o resultado. Se um processo de trabalho
+        morrer, as tarefas em andamento falham com BrokenProcessPool e o pool é recriado para as próximas.
+        """
+        if self._executor is None:
+            await self.iniciar()
+
+        self.pendentes += 1
+        entrada = time.perf_counter()
+        try:
+            async with self._vagas:
+                self.no_pool += 1
+                executor = self._executor
+                try:
+                    resultado, segundos = await asyncio.get_running_loop().run_in_executor(
+                        executor, _executar_com_tempo, funcao, args
+                    )
+                except BrokenProcessPool:
+                    self._recriar(executor)
+                    raise
+                finally:
+                    self.no_pool -= 1
+        except Exception:
+            self.falhas += 1
+            raise
+        finally:
+            self.pendentes -= 1
+
+        total = time.perf_counter() - entrada
+        self.concluidas += 1
+        self.tempo_renderizacao_total += segundos
+        self.tempo_renderizacao_maximo = max(self.tempo_renderizacao_maximo, segundos)
+        self.tempo_espera_total += max(total - segundos, 0.0)
+        logger.debug(f"{funcao.__name__} renderizado em {segundos * 1000:.0f} ms (fila: {self.pendentes}).")
+        return resultado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Profundidade da fila e tempos de renderização."""
+        return {
+            "processos": self.processos,
+            "pendentes": self.pendentes,
+            "no_pool": self.no_pool,
+            "concluidas": self.concluidas,
+            "falhas": self.falhas,
+            "recriacoes": self.recriacoes,
+            "tempo_medio_renderizacao": self.tempo_renderizacao_total / self.concluidas if self.concluidas else 0.0,
+            "tempo_maximo_renderizacao": self.tempo_renderizacao_maximo,
+            "tempo_medio_espera": self.tempo_espera_total / self.concluidas if self.concluidas else 0.0,
+        }
+
+    def fechar(self):
+        """Encerra os processos, aguardando as renderizações em andamento e descartando as que não começaram."""
+        if self._executor is None:
+            return
+        logger.info(f"Encerrando o pool de renderização de PDF: {self.estatisticas()}")
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+
+pool_pdf = PoolRenderizacaoPDF()
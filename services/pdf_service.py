@@ -2,22 +2,54 @@
 
 import io
 import os
+import math
 import logging
-from typing import Dict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import date, timedelta
+from xml.sax.saxutils import escape
 
 # Libs para geração de PDF
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle,
-    Paragraph, Spacer, Image
+    Paragraph, Spacer, Image, Flowable
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas as pdf_canvas
+from reportlab.lib.utils import ImageReader
+from reportlab import rl_config
+from pypdf import PdfReader, PdfWriter
+from PIL import Image as PILImage
 
 logger = logging.getLogger(__name__)
 
+# As keywords do PDF guardam onde o bloco de assinatura deve ser carimbado: "assinatura:<página>:<x>:<y>:<altura>"
+PREFIXO_RESERVA_ASSINATURA = "assinatura:"
+
+# "compacto": imagens reamostradas e recomprimidas e páginas comprimidas; "original": imagens em resolução total
+PERFIL_COMPACTO = "compacto"
+PERFIL_ORIGINAL = "original"
+PDF_PERFIL = os.getenv("PDF_PERFIL", PERFIL_COMPACTO)
+# Resolução das imagens do layout no perfil compacto, considerando o tamanho em que são impressas
+PDF_DPI_IMAGENS = int(os.getenv("PDF_DPI_IMAGENS", "150"))
+
+# Documentos anexados ao PDF consolidado entre duas unificações de objetos idênticos (logo, rodapé, fontes)
+PDF_CONSOLIDADO_LOTE = int(os.getenv("PDF_CONSOLIDADO_LOTE", "25"))
+# Passadas de unificação no fim da consolidação (a segunda alcança os objetos que só ficam idênticos
+# depois da primeira; a terceira é margem)
+PASSADAS_UNIFICACAO = 3
+
+# Streams gravados em binário: a codificação ASCII85 do ReportLab aumenta as imagens em 25% e, sem a
+# extensão C (rl_accel), é a etapa mais lenta da geração
+rl_config.useA85 = 0
+
+LARGURA_LOGO = 5 * cm
+LARGURA_RODAPE = 10 * cm
+
 
 def formatar_timedelta(td: timedelta) -> str:
     """Formata um objeto timedelta em uma string legível 'HH:MM'."""
@@ -27,51 +59,200 @@ def formatar_timedelta(td: timedelta) -> str:
     return f"{hours:02d}:{minutes:02d}"
 
 
-def _add_cabecalho(canvas, doc):
+class _ImagemPreparada:
+    """
+    Imagem do layout lida e decodificada uma única vez por processo. O `ImageReader` guarda os pixels
+    já convertidos (e, com `largura_pixels`, já reduzidos para essa largura): cada documento só os
+    comprime, e as páginas de um mesmo documento compartilham o XObject criado pelo drawImage.
+    """
+
+    def __init__(self, caminho: str, largura_pixels: Optional[int] = None):
+        self.caminho = caminho
+        with PILImage.open(caminho) as original:
+            transparente = original.mode in ('RGBA', 'LA', 'PA') or 'transparency' in original.info
+            imagem = original.convert('RGBA' if transparente else 'RGB')
+        if largura_pixels is not None and imagem.width > largura_pixels:
+            altura_pixels = max(1, round(imagem.height * largura_pixels / imagem.width))
+            imagem = imagem.resize((largura_pixels, altura_pixels), PILImage.LANCZOS)
+        self.leitor = ImageReader(imagem)
+        # Decodifica agora (no aquecimento do pool), e não no primeiro documento
+        self.leitor.getRGBData()
+
+    def desenhar(self, canvas, x: float, y: float, largura: float, anchor: str):
+        canvas.drawImage(self.leitor, x, y, width=largura, preserveAspectRatio=True, anchor=anchor, mask='auto')
+
+
+class _ModeloPDF:
+    """Partes fixas dos documentos (estilos, estilos de tabela e imagens), montadas uma vez por processo."""
+
+    def __init__(self, perfil: str = PERFIL_COMPACTO):
+        if perfil not in (PERFIL_COMPACTO, PERFIL_ORIGINAL):
+            logger.warning(f"Perfil de PDF desconhecido ('{perfil}'). Usando o perfil '{PERFIL_COMPACTO}'.")
+            perfil = PERFIL_COMPACTO
+        self.perfil = perfil
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='CenterH2', alignment=1, parent=styles['h2'], fontName='Helvetica-Bold'))
+        styles.add(ParagraphStyle(name='h2_custom', parent=styles['h2'], fontName='Helvetica-Bold', spaceAfter=6))
+        styles.add(ParagraphStyle(name='CenterText', alignment=1, parent=styles['Normal']))
+        styles.add(ParagraphStyle(name='SignatureStyle', parent=styles['Normal'], fontSize=8, leading=10))
+        self.styles = styles
+
+        self.estilo_tabela_dias = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('SPAN', (0, -1), (1, -1)), ('ALIGN', (0, -1), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#EAEAEA'))
+        ])
+        self.estilo_tabela_colaborador = TableStyle([
+            ('GRID', (0,0), (-1,-1), 1, colors.black),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('PADDING', (0,0), (-1,-1), 6)
+        ])
+        self.estilo_tabela_relatorio = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ])
+        self.estilo_linha_total = TableStyle([
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#EAEAEA'))
+        ])
+        self.estilo_assinatura = TableStyle([
+            ('BOX', (0,0), (-1,-1), 1, colors.green),
+            ('PADDING', (0,0), (-1,-1), 6),
+            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#F0FFF0'))
+        ])
+
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.caminho_logo = os.path.join(project_root, "assets", "logo.png")
+        self.caminho_rodape = os.path.join(project_root, "assets", "rodape.png")
+        self.logo = self._preparar_imagem(self.caminho_logo, LARGURA_LOGO)
+        self.rodape = self._preparar_imagem(self.caminho_rodape, LARGURA_RODAPE)
+
+    def _preparar_imagem(self, caminho: str, largura_impressa: float) -> Optional[_ImagemPreparada]:
+        if not os.path.exists(caminho):
+            return None
+        largura_pixels = None
+        if self.perfil == PERFIL_COMPACTO:
+            largura_pixels = math.ceil(largura_impressa / 72 * PDF_DPI_IMAGENS)  # largura em pontos -> pixels
+        try:
+            return _ImagemPreparada(caminho, largura_pixels)
+        except Exception as e:
+            logger.error(f"Erro ao carregar a imagem {caminho}: {e}", exc_info=True)
+            return None
+
+    def documento(self, file_stream: io.BytesIO) -> SimpleDocTemplate:
+        """Documento A4 com as margens do layout e a compressão de páginas do perfil."""
+        return SimpleDocTemplate(
+            file_stream, pagesize=A4,
+            leftMargin=2*cm, rightMargin=2*cm,
+            topMargin=4*cm, bottomMargin=3*cm,
+            pageCompression=1 if self.perfil == PERFIL_COMPACTO else 0
+        )
+
+    def desenhar_moldura(self, canvas, doc):
+        """Cabeçalho e rodapé de cada página."""
+        _add_cabecalho(canvas, doc, self)
+        _add_rodape(canvas, doc, self)
+
+    def finalizar(self, file_stream: io.BytesIO, descricao: str) -> io.BytesIO:
+        """Volta o stream ao início e registra o tamanho do documento gerado."""
+        file_stream.seek(0)
+        logger.info(f"{descricao} gerado: {file_stream.getbuffer().nbytes} bytes (perfil {self.perfil}).")
+        return file_stream
+
+
+@lru_cache(maxsize=None)
+def _modelo_do_perfil(perfil: str) -> _ModeloPDF:
+    return _ModeloPDF(perfil)
+
+
+def modelo_pdf(perfil: Optional[str] = None) -> _ModeloPDF:
+    """Modelo compartilhado pelos documentos do processo; o pool de renderização o monta no aquecimento."""
+    return _modelo_do_perfil(perfil or PDF_PERFIL)
+
+
+def _add_cabecalho(canvas, doc, modelo: _ModeloPDF):
     """Desenha o cabeçalho com logo."""
     canvas.saveState()
     try:
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        logo_path = os.path.join(project_root, "assets", "logo.png")
-        if os.path.exists(logo_path):
-            image_width = 5 * cm
+        if modelo.logo is not None:
+            image_width = LARGURA_LOGO
             x_centered = (doc.pagesize[0] - image_width) / 2
             y_pos = doc.pagesize[1] - 14 * cm
-            canvas.drawImage(
-                logo_path, x_centered, y_pos,
-                width=image_width, preserveAspectRatio=True, anchor='n',
-                mask='auto'
-            )
+            modelo.logo.desenhar(canvas, x_centered, y_pos, image_width, anchor='n')
         else:
-            logger.warning(f"Logo não encontrado: {logo_path}")
+            logger.warning(f"Logo não encontrado: {modelo.caminho_logo}")
     except Exception as e:
         logger.error(f"Erro ao desenhar o logo: {e}", exc_info=True)
     canvas.restoreState()
 
 
-def _add_rodape(canvas, doc):
+def _add_rodape(canvas, doc, modelo: _ModeloPDF):
     """Desenha o rodapé com imagem."""
     canvas.saveState()
     try:
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-        rodape_path = os.path.join(project_root, "assets", "rodape.png")
-        if os.path.exists(rodape_path):
-            image_width = 10 * cm
+        if modelo.rodape is not None:
+            image_width = LARGURA_RODAPE
             x_centered = (doc.pagesize[0] - image_width) / 2
             y_pos = 1.5 * cm
-            canvas.drawImage(
-                rodape_path, x_centered, y_pos,
-                width=image_width, preserveAspectRatio=True, anchor='s',
-                mask='auto'
-            )
+            modelo.rodape.desenhar(canvas, x_centered, y_pos, image_width, anchor='s')
         else:
-            logger.warning(f"Rodapé não encontrado: {rodape_path}")
+            logger.warning(f"Rodapé não encontrado: {modelo.caminho_rodape}")
     except Exception as e:
         logger.error(f"Erro ao desenhar o rodapé: {e}", exc_info=True)
     canvas.restoreState()
 
 
-def gerar_pdf_horas_extras(dados_formulario: Dict) -> io.BytesIO:
+def _tabela_assinatura(dados_aprovador: Dict) -> Table:
+    """Bloco verde de assinatura digital, usado tanto na geração completa quanto no carimbo."""
+    modelo = modelo_pdf()
+    estilo = modelo.styles['SignatureStyle']
+    assinatura_data = [
+        [Paragraph(f"<b>Aprovado Digitalmente por:</b> {dados_aprovador['nome']}", estilo)],
+        [Paragraph(f"<b>ID Discord:</b> {dados_aprovador['id_discord']}", estilo)],
+        [Paragraph(f"<b>Data/Hora:</b> {dados_aprovador['data_hora']}", estilo)]
+    ]
+    assinatura_table = Table(assinatura_data, colWidths=[7*cm])
+    assinatura_table.setStyle(modelo.estilo_assinatura)
+    return assinatura_table
+
+
+def _tamanho_assinatura(largura_disponivel: float) -> Tuple[float, float]:
+    """Largura e altura de um bloco de assinatura com uma linha por campo."""
+    exemplo = {"nome": "-", "id_discord": 0, "data_hora": "00/00/0000 às 00:00:00"}
+    return _tabela_assinatura(exemplo).wrap(largura_disponivel, 0)
+
+
+class _ReservaAssinatura(Flowable):
+    """Espaço vazio do tamanho do bloco de assinatura; ao ser desenhado, registra a sua posição nas keywords do PDF."""
+
+    def __init__(self, largura: float, altura: float):
+        super().__init__()
+        self.width = largura
+        self.height = altura
+        self.hAlign = 'CENTER'  # mesmo alinhamento padrão de Table
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        x, y = self.canv.absolutePosition(0, 0)
+        self.canv.setKeywords(
+            f"{PREFIXO_RESERVA_ASSINATURA}{self.canv.getPageNumber()}:{x:.2f}:{y:.2f}:{self.height:.2f}"
+        )
+
+
+def gerar_pdf_horas_extras(dados_formulario: Dict, perfil: Optional[str] = None) -> io.BytesIO:
     """
     Gera o PDF com dados do formulário e, se houver, a assinatura digital.
     """
@@ -85,17 +266,9 @@ def gerar_pdf_horas_extras(dados_formulario: Dict) -> io.BytesIO:
 
     nome_colaborador = dados_colaborador.get('nome', 'N/A')
 
-    doc = SimpleDocTemplate(
-        file_stream, pagesize=A4,
-        leftMargin=2*cm, rightMargin=2*cm,
-        topMargin=4*cm, bottomMargin=3*cm
-    )
-
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='CenterH2', alignment=1, parent=styles['h2'], fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='h2_custom', parent=styles['h2'], fontName='Helvetica-Bold', spaceAfter=6))
-    styles.add(ParagraphStyle(name='CenterText', alignment=1, parent=styles['Normal']))
-    styles.add(ParagraphStyle(name='SignatureStyle', parent=styles['Normal'], fontSize=8, leading=10))
+    modelo = modelo_pdf(perfil)
+    styles = modelo.styles
+    doc = modelo.documento(file_stream)
 
     elements = []
 
@@ -116,11 +289,7 @@ def gerar_pdf_horas_extras(dados_formulario: Dict) -> io.BytesIO:
 
     id_data = [[p_nome, p_depto], [p_cargo, p_coord]]
     id_table = Table(id_data, colWidths=[doc.width/2.0, doc.width/2.0])
-    id_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('PADDING', (0,0), (-1,-1), 6)
-    ]))
+    id_table.setStyle(modelo.estilo_tabela_colaborador)
     elements.append(id_table)
     elements.append(Spacer(1, 0.4*cm))
 
@@ -152,18 +321,7 @@ def gerar_pdf_horas_extras(dados_formulario: Dict) -> io.BytesIO:
     table_data.append(['', 'TOTAL', formatar_timedelta(total_geral_extras)])
     col_widths = [doc.width*0.25, doc.width*0.50, doc.width*0.25]
     table = Table(table_data, colWidths=col_widths)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('SPAN', (0, -1), (1, -1)), ('ALIGN', (0, -1), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#EAEAEA'))
-    ]))
+    table.setStyle(modelo.estilo_tabela_dias)
     elements.append(table)
     elements.append(Spacer(1, 0.8*cm))
 
@@ -171,26 +329,219 @@ def gerar_pdf_horas_extras(dados_formulario: Dict) -> io.BytesIO:
     current_date_str = date.today().strftime('%d / %m / %Y')
     elements.append(Paragraph(f"Data de geração: {current_date_str}", styles['SignatureStyle']))
 
-    # Assinatura digital (se houver)
+    # Assinatura digital (se houver). Sem aprovação, o espaço do bloco fica reservado para que a
+    # aprovação apenas carimbe o documento já gerado (ver `carimbar_aprovacao`).
+    elements.append(Spacer(1, 0.4*cm))
     if dados_aprovador:
-        assinatura_data = [
-            [Paragraph(f"<b>Aprovado Digitalmente por:</b> {dados_aprovador['nome']}", styles['SignatureStyle'])],
-            [Paragraph(f"<b>ID Discord:</b> {dados_aprovador['id_discord']}", styles['SignatureStyle'])],
-            [Paragraph(f"<b>Data/Hora:</b> {dados_aprovador['data_hora']}", styles['SignatureStyle'])]
-        ]
-        assinatura_table = Table(assinatura_data, colWidths=[7*cm])
-        assinatura_table.setStyle(TableStyle([
-            ('BOX', (0,0), (-1,-1), 1, colors.green),
-            ('PADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#F0FFF0'))
-        ]))
-        elements.append(Spacer(1, 0.4*cm))
-        elements.append(assinatura_table)
+        elements.append(_tabela_assinatura(dados_aprovador))
+    else:
+        elements.append(_ReservaAssinatura(*_tamanho_assinatura(doc.width)))
 
     # Monta PDF
-    doc.build(elements,
-              onFirstPage=lambda c, d: (_add_cabecalho(c, d), _add_rodape(c, d)),
-              onLaterPages=lambda c, d: (_add_cabecalho(c, d), _add_rodape(c, d)))
+    doc.build(elements, onFirstPage=modelo.desenhar_moldura, onLaterPages=modelo.desenhar_moldura)
+
+    return modelo.finalizar(file_stream, "PDF de horas extras")
 
+
+def carimbar_aprovacao(pdf_original, dados_aprovador: Dict) -> io.BytesIO:
+    """
+    Aplica o bloco de assinatura digital sobre um PDF gerado por `gerar_pdf_horas_extras` sem aprovação,
+    desenhando só o bloco em uma página sobreposta, na posição reservada. O resultado equivale a gerar o
+    documento completo com `dados_aprovador`. Levanta ValueError se o documento não tiver a reserva ou
+    se o bloco não couber nela; nesses casos o documento deve ser gerado novamente por completo.
+    """
+    leitor = PdfReader(pdf_original)
+    keywords = (leitor.metadata or {}).get("/Keywords") or ""
+    if not keywords.startswith(PREFIXO_RESERVA_ASSINATURA):
+        raise ValueError("O PDF não possui espaço reservado para a assinatura.")
+    pagina, x, y, altura = keywords[len(PREFIXO_RESERVA_ASSINATURA):].split(":")
+    x, y, altura = float(x), float(y), float(altura)
+
+    escritor = PdfWriter(clone_from=leitor)
+    pagina_alvo = escritor.pages[int(pagina) - 1]
+    tamanho_pagina = (float(pagina_alvo.mediabox.width), float(pagina_alvo.mediabox.height))
+
+    assinatura_table = _tabela_assinatura(dados_aprovador)
+    _, altura_tabela = assinatura_table.wrap(tamanho_pagina[0], tamanho_pagina[1])
+    if altura_tabela > altura + 0.01:
+        raise ValueError("O bloco de assinatura não cabe no espaço reservado.")
+
+    sobreposicao = io.BytesIO()
+    c = pdf_canvas.Canvas(sobreposicao, pagesize=tamanho_pagina)
+    # O bloco é alinhado ao topo da reserva, como o fluxo do documento faria
+    assinatura_table.drawOn(c, x, y + altura - altura_tabela)
+    c.save()
+    sobreposicao.seek(0)
+
+    pagina_alvo.merge_page(PdfReader(sobreposicao).pages[0])
+    # O documento assinado não pode ser carimbado de novo
+    escritor.add_metadata({"/Keywords": ""})
+
+    file_stream = io.BytesIO()
+    escritor.write(file_stream)
     file_stream.seek(0)
     return file_stream
+
+
+def gerar_pdf_relatorio_equipe(dados_relatorio: Dict, perfil: Optional[str] = None) -> io.BytesIO:
+    """
+    Gera o PDF consolidado de horas extras de uma equipe: um resumo por colaborador
+    seguido do detalhamento de cada dia com horas extras.
+    """
+    file_stream = io.BytesIO()
+
+    membros = dados_relatorio.get("membros", [])
+    detalhes = dados_relatorio.get("detalhes", [])
+    periodo = f"{dados_relatorio['data_inicio'].strftime('%d/%m/%Y')} a {dados_relatorio['data_fim'].strftime('%d/%m/%Y')}"
+
+    modelo = modelo_pdf(perfil)
+    styles = modelo.styles
+    doc = modelo.documento(file_stream)
+    estilo_tabela = modelo.estilo_tabela_relatorio
+
+    elements = []
+
+    # Título
+    elements.append(Paragraph("Relatório de Horas Extras da Equipe", styles['CenterH2']))
+    elements.append(Spacer(1, 0.3*cm))
+    elements.append(Paragraph(f"<b>{escape(dados_relatorio.get('nome_equipe', 'N/A'))}</b> — Período: {periodo}", styles['CenterText']))
+    elements.append(Spacer(1, 0.5*cm))
+
+    # Resumo por colaborador
+    total_geral = sum((membro['total_horas_extras'] for membro in membros), timedelta())
+    elements.append(Paragraph("Resumo por Colaborador", styles['h2_custom']))
+    resumo_data = [['COLABORADOR', 'MATRÍCULA', 'DIAS', 'HORAS EXTRAS']]
+    for membro in membros:
+        resumo_data.append([
+            Paragraph(escape(membro['nome']), styles['Normal']),
+            membro.get('matricula') or '-',
+            str(membro['dias']),
+            formatar_timedelta(membro['total_horas_extras'])
+        ])
+    resumo_data.append(['', '', 'TOTAL', formatar_timedelta(total_geral)])
+    resumo_table = Table(resumo_data, colWidths=[doc.width*0.46, doc.width*0.18, doc.width*0.12, doc.width*0.24], repeatRows=1)
+    resumo_table.setStyle(estilo_tabela)
+    resumo_table.setStyle(modelo.estilo_linha_total)
+    elements.append(resumo_table)
+    elements.append(Spacer(1, 0.8*cm))
+
+    # Detalhamento dos dias: uma tabela por colaborador (tabelas menores são quebradas entre páginas bem mais rápido)
+    if detalhes:
+        elements.append(Paragraph("Detalhamento dos Dias com Horas Extras", styles['h2_custom']))
+        col_widths = [doc.width*0.20, doc.width*0.58, doc.width*0.22]
+        inicio = 0
+        while inicio < len(detalhes):
+            # Os dias chegam agrupados por colaborador; o ID separa homônimos
+            colaborador = detalhes[inicio]['colaborador']
+            nome = detalhes[inicio]['nome']
+            fim = inicio
+            while fim < len(detalhes) and detalhes[fim]['colaborador'] == colaborador:
+                fim += 1
+
+            detalhe_data = [['DATA', 'BATIDAS DO PONTO', 'HORAS EXTRAS']]
+            for dia in detalhes[inicio:fim]:
+                detalhe_data.append([
+                    dia['data'].strftime('%d/%m/%Y'),
+                    dia['batidas_str'],
+                    formatar_timedelta(dia['horas_extras_timedelta'])
+                ])
+            detalhe_table = Table(detalhe_data, colWidths=col_widths, repeatRows=1)
+            detalhe_table.setStyle(estilo_tabela)
+            elements.append(Paragraph(f"<b>{escape(nome)}</b>", styles['Normal']))
+            elements.append(Spacer(1, 0.15*cm))
+            elements.append(detalhe_table)
+            elements.append(Spacer(1, 0.4*cm))
+            inicio = fim
+
+    elements.append(Spacer(1, 0.8*cm))
+    elements.append(Paragraph(f"Data de geração: {date.today().strftime('%d / %m / %Y')}", styles['Normal']))
+
+    # Monta PDF
+    doc.build(elements, onFirstPage=modelo.desenhar_moldura, onLaterPages=modelo.desenhar_moldura)
+
+    return modelo.finalizar(file_stream, "Relatório de horas extras da equipe")
+
+
+def gerar_pdf_totais_fechamento(dados_fechamento: Dict, perfil: Optional[str] = None) -> io.BytesIO:
+    """
+    Gera a página de totais do fechamento mensal: solicitações aprovadas, dias e horas extras
+    de cada colaborador no período.
+    """
+    file_stream = io.BytesIO()
+    modelo = modelo_pdf(perfil)
+    styles = modelo.styles
+    doc = modelo.documento(file_stream)
+
+    colaboradores = dados_fechamento.get("colaboradores", [])
+    periodo = f"{dados_fechamento['data_inicio'].strftime('%d/%m/%Y')} a {dados_fechamento['data_fim'].strftime('%d/%m/%Y')}"
+
+    elements = []
+    elements.append(Paragraph("Fechamento de Horas Extras", styles['CenterH2']))
+    elements.append(Spacer(1, 0.3*cm))
+    elements.append(Paragraph(f"Período: {periodo}", styles['CenterText']))
+    elements.append(Spacer(1, 0.5*cm))
+
+    elements.append(Paragraph("Totais por Colaborador", styles['h2_custom']))
+    totais_data = [['COLABORADOR', 'SOLICITAÇÕES', 'DIAS', 'HORAS EXTRAS']]
+    for colaborador in colaboradores:
+        totais_data.append([
+            Paragraph(escape(colaborador['nome']), styles['Normal']),
+            str(colaborador['solicitacoes']),
+            str(colaborador['dias']),
+            formatar_timedelta(colaborador['total_horas_extras'])
+        ])
+    totais_data.append([
+        '', str(sum(c['solicitacoes'] for c in colaboradores)), str(sum(c['dias'] for c in colaboradores)),
+        formatar_timedelta(sum((c['total_horas_extras'] for c in colaboradores), timedelta()))
+    ])
+    totais_table = Table(totais_data, colWidths=[doc.width*0.46, doc.width*0.18, doc.width*0.12, doc.width*0.24], repeatRows=1)
+    totais_table.setStyle(modelo.estilo_tabela_relatorio)
+    totais_table.setStyle(modelo.estilo_linha_total)
+    elements.append(totais_table)
+    elements.append(Spacer(1, 0.4*cm))
+    elements.append(Paragraph(
+        "Os dias e as horas consideram apenas as datas dentro do período. Os documentos de cada solicitação seguem esta página.",
+        styles['SignatureStyle']
+    ))
+    elements.append(Spacer(1, 0.8*cm))
+    elements.append(Paragraph(f"Data de geração: {date.today().strftime('%d / %m / %Y')}", styles['Normal']))
+
+    doc.build(elements, onFirstPage=modelo.desenhar_moldura, onLaterPages=modelo.desenhar_moldura)
+
+    return modelo.finalizar(file_stream, "PDF de totais do fechamento")
+
+
+def consolidar_pdfs(destino: Union[str, Path], capa: io.BytesIO, titulo_capa: str, secoes: List[Dict]) -> int:
+    """
+    Junta a capa e os documentos das seções em um único PDF gravado em `destino`, com um marcador por
+    seção e, dentro dele, um por documento. `secoes` é uma lista de {"titulo", "documentos": [{"titulo",
+    "caminho"}]}. Os documentos são lidos do disco um de cada vez e, a cada PDF_CONSOLIDADO_LOTE anexados,
+    os objetos idênticos são unificados: o escritor não acumula uma cópia do logo e do rodapé por
+    documento (o pypdf ainda mantém os documentos de origem lidos até o fim). Retorna a quantidade de páginas.
+    """
+    escritor = PdfWriter()
+    escritor.append(PdfReader(capa), outline_item=titulo_capa, import_outline=False)
+
+    anexados = 0
+    for secao in secoes:
+        marcador_secao = None
+        for documento in secao["documentos"]:
+            primeira_pagina = len(escritor.pages)
+            with open(documento["caminho"], "rb") as arquivo:
+                leitor = PdfReader(arquivo)
+                escritor.append(leitor, import_outline=False)
+            escritor.reset_translation(leitor)
+            if marcador_secao is None:
+                marcador_secao = escritor.add_outline_item(secao["titulo"], primeira_pagina, is_open=False)
+            escritor.add_outline_item(documento["titulo"], primeira_pagina, parent=marcador_secao)
+
+            anexados += 1
+            if anexados % PDF_CONSOLIDADO_LOTE == 0:
+                escritor.compress_identical_objects()
+
+    # Uma passada só unifica objetos cujas referências já são iguais (ex: a imagem do rodapé só fica
+    # idêntica depois que a sua máscara é unificada)
+    for _ in range(PASSADAS_UNIFICACAO):
+        escritor.compress_identical_objects()
+    escritor.write(destino)
+    return len(escritor.pages)
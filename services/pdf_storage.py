@@ -0,0 +1,90 @@
+# services/pdf_storage.py
+import os
+import mmap
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+logger = logging.getLogger(__name__)
+
+PDF_STORAGE_DIR = os.getenv("PDF_STORAGE_DIR", "./data/pdfs")
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class ArmazenamentoPDF:
+    """
+    Armazenamento local de PDFs endereçado por conteúdo: cada documento é gravado uma única vez,
+    em um arquivo cujo nome é o SHA-256 do próprio conteúdo (ex: ./data/pdfs/ab/abcdef....pdf).
+    """
+
+    def __init__(self, diretorio: str = PDF_STORAGE_DIR):
+        self.diretorio = Path(diretorio)
+
+    def caminho(self, pdf_hash: str) -> Path:
+        """Caminho do arquivo de um documento; os dois primeiros caracteres do hash formam o subdiretório."""
+        return self.diretorio / pdf_hash[:2] / f"{pdf_hash}.pdf"
+
+    def existe(self, pdf_hash: str) -> bool:
+        return self.caminho(pdf_hash).is_file()
+
+    def salvar(self, conteudo: BytesLike) -> str:
+        """Grava o documento (se ainda não existir) e retorna o seu hash."""
+        pdf_hash = hashlib.sha256(conteudo).hexdigest()
+        destino = self.caminho(pdf_hash)
+        if destino.is_file():
+            return pdf_hash
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # Grava em um arquivo temporário no mesmo diretório e renomeia: leitores nunca veem um PDF pela metade
+        descritor, temporario = tempfile.mkstemp(dir=destino.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, destino)
+        except BaseException:
+            Path(temporario).unlink(missing_ok=True)
+            raise
+        logger.info(f"PDF {pdf_hash[:12]} armazenado ({len(conteudo)} bytes).")
+        return pdf_hash
+
+    def criar_temporario(self) -> Path:
+        """Arquivo vazio no diretório do armazenamento, para documentos grandes gravados direto em disco (ver `importar`)."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        os.close(descritor)
+        return Path(temporario)
+
+    def importar(self, temporario: Union[str, Path]) -> str:
+        """Move para o armazenamento um documento já gravado em disco e retorna o seu hash, lendo-o em blocos."""
+        temporario = Path(temporario)
+        sha256 = hashlib.sha256()
+        with open(temporario, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+                sha256.update(bloco)
+        pdf_hash = sha256.hexdigest()
+        destino = self.caminho(pdf_hash)
+        if destino.is_file():
+            temporario.unlink(missing_ok=True)
+            return pdf_hash
+
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporario, destino)
+        logger.info(f"PDF {pdf_hash[:12]} armazenado ({destino.stat().st_size} bytes).")
+        return pdf_hash
+
+    @contextmanager
+    def mapear(self, pdf_hash: str) -> Iterator[mmap.mmap]:
+        """
+        Abre o documento mapeado em memória, somente leitura. O objeto retornado se comporta como um
+        arquivo (read/seek) e aceita fatiamento sem copiar o conteúdo para o heap do processo.
+        """
+        with open(self.caminho(pdf_hash), "rb") as arquivo:
+            with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                yield mapa
+
+
+armazenamento_pdf = ArmazenamentoPDF()
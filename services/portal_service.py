@@ -1,14 +1,157 @@
 # database/portal_service.py
 import os
+import time
+import queue
+import asyncio
+import functools
+import threading
 import pyodbc
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from collections import defaultdict
-from database.bot_queries import buscar_responsavel_por_equipe
+from datetime import date, datetime, timedelta
+from database.bot_queries import buscar_responsaveis_por_equipes, registrar_nome_responsavel
+from services.calculo_ponto import calcular_horas_extras_lote, JORNADA_PADRAO_MINUTOS
+from utils.cache import CacheTTL, FRESCO, OBSOLETO, EXPIRADO
 
 logger = logging.getLogger(__name__)
 
+# --- Configuração do pool de conexões com o banco corporativo ---
+POOL_TAMANHO = int(os.getenv("CORP_DB_POOL_SIZE", "4"))
+TIMEOUT_CONEXAO = int(os.getenv("CORP_DB_CONNECT_TIMEOUT", "5"))
+TIMEOUT_CONSULTA = int(os.getenv("CORP_DB_QUERY_TIMEOUT", "15"))
+# Tempo máximo (em segundos) aguardando uma conexão livre no pool
+TIMEOUT_ESPERA_POOL = float(os.getenv("CORP_DB_POOL_WAIT", "10"))
+# Conexões ociosas há mais tempo que isso são validadas com um SELECT 1 antes do uso
+INTERVALO_VERIFICACAO = 60
+# Quantidade máxima de IDs por cláusula IN
+TAMANHO_LOTE_IN = 1000
+# Linhas lidas por vez em consultas volumosas (ex: batidas de uma equipe inteira)
+TAMANHO_BLOCO_LEITURA = 5000
+
+# --- Cache de perfis de colaboradores (cargo, equipe e departamento mudam raramente) ---
+PERFIL_CACHE_MAX_ITENS = int(os.getenv("PERFIL_CACHE_MAX_ITENS", "2048"))
+PERFIL_CACHE_TTL = int(os.getenv("PERFIL_CACHE_TTL", "3600"))
+# Por quanto tempo após o TTL um perfil ainda é servido enquanto é recarregado em segundo plano
+PERFIL_CACHE_JANELA_OBSOLETA = int(os.getenv("PERFIL_CACHE_JANELA_OBSOLETA", "86400"))
+# TTL para IDs sem colaborador ativo no portal (cache negativo)
+PERFIL_CACHE_TTL_NEGATIVO = int(os.getenv("PERFIL_CACHE_TTL_NEGATIVO", "300"))
+
+# Quando ativo, o pareamento das batidas e o total diário de horas extras são calculados no SQL Server
+PONTO_AGREGACAO_SERVIDOR = os.getenv("PONTO_AGREGACAO_SERVIDOR", "false").lower() in ("1", "true", "sim")
+# Janela, em dias, da consulta de ponto usada na seleção de dias para lançamento
+DIAS_PONTO_RECENTE = 25
+
+
+class PoolConexoesCorporativas:
+    """Pool limitado de conexões pyodbc reaproveitadas entre as consultas."""
+
+    def __init__(self, connection_string: str, tamanho: int = POOL_TAMANHO):
+        self.connection_string = connection_string
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._fechado = False
+
+    def _nova_conexao(self) -> pyodbc.Connection:
+        """Abre uma nova conexão já configurada com o timeout por consulta."""
+        try:
+            conexao = pyodbc.connect(self.connection_string, timeout=TIMEOUT_CONEXAO, autocommit=True)
+        except Exception as e:
+            logger.error(f"Falha ao conectar ao banco de dados corporativo: {e}", exc_info=True)
+            raise
+        conexao.timeout = TIMEOUT_CONSULTA
+        return conexao
+
+    @staticmethod
+    def _conexao_saudavel(conexao: pyodbc.Connection) -> bool:
+        """Verifica se a conexão ainda responde antes de entregá-la a uma consulta."""
+        try:
+            cursor = conexao.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    @staticmethod
+    def _descartar(conexao: Optional[pyodbc.Connection]):
+        """Fecha uma conexão que não deve voltar ao pool."""
+        if conexao is None:
+            return
+        try:
+            conexao.close()
+        except pyodbc.Error:
+            pass
+
+    def _obter(self) -> pyodbc.Connection:
+        """Reaproveita uma conexão ociosa saudável ou abre uma nova."""
+        while True:
+            try:
+                conexao, ultimo_uso = self._livres.get_nowait()
+            except queue.Empty:
+                return self._nova_conexao()
+
+            if time.monotonic() - ultimo_uso < INTERVALO_VERIFICACAO or self._conexao_saudavel(conexao):
+                return conexao
+
+            logger.warning("Conexão ociosa com o banco corporativo não respondeu à verificação. Descartando.")
+            self._descartar(conexao)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool, devolvendo-a (ou descartando-a em caso de erro) ao final."""
+        if self._fechado:
+            raise RuntimeError("O pool de conexões corporativas já foi encerrado.")
+        if not self._vagas.acquire(timeout=TIMEOUT_ESPERA_POOL):
+            raise TimeoutError("Nenhuma conexão livre com o banco corporativo dentro do tempo limite.")
+
+        conexao = None
+        try:
+            conexao = self._obter()
+            yield conexao
+        except pyodbc.Error:
+            # Erros de driver (timeout, queda de rede) podem deixar a conexão inutilizável
+            self._descartar(conexao)
+            conexao = None
+            raise
+        finally:
+            if conexao is not None:
+                if self._fechado:
+                    self._descartar(conexao)
+                else:
+                    self._livres.put((conexao, time.monotonic()))
+            self._vagas.release()
+
+    def verificar_saude(self) -> int:
+        """Valida todas as conexões ociosas, descarta as quebradas e retorna quantas seguem ativas."""
+        saudaveis = []
+        while True:
+            try:
+                conexao, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            if self._conexao_saudavel(conexao):
+                saudaveis.append(conexao)
+            else:
+                self._descartar(conexao)
+        for conexao in saudaveis:
+            self._livres.put((conexao, time.monotonic()))
+        return len(saudaveis)
+
+    def fechar(self):
+        """Fecha todas as conexões ociosas e impede novos empréstimos."""
+        self._fechado = True
+        while True:
+            try:
+                conexao, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conexao)
+
+
 class PortalDatabaseService:
     """Serviço para consultas read-only ao banco de dados corporativo (SQL Server)."""
 
@@ -21,20 +164,30 @@ class PortalDatabaseService:
             f"PWD={os.getenv('CORP_DB_PASSWORD')};"
             f"TrustServerCertificate=yes;"
         )
-        self.connection = None
+        self.pool = PoolConexoesCorporativas(self.connection_string)
+        # Executor dedicado: consultas lentas não disputam o executor padrão do loop
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.tamanho, thread_name_prefix="portal-db")
+        self.cache_perfis = CacheTTL(
+            "perfis_colaboradores",
+            max_itens=PERFIL_CACHE_MAX_ITENS,
+            ttl=PERFIL_CACHE_TTL,
+            ttl_negativo=PERFIL_CACHE_TTL_NEGATIVO,
+            janela_obsoleta=PERFIL_CACHE_JANELA_OBSOLETA,
+        )
 
-    def _conectar(self):
-        """Estabelece uma conexão com o banco de dados."""
-        try:
-            self.connection = pyodbc.connect(self.connection_string, timeout=5)
-        except Exception as e:
-            logger.error(f"Falha ao conectar ao banco de dados corporativo: {e}", exc_info=True)
-            raise
+    async def _executar(self, funcao, *args, **kwargs):
+        """Executa um método síncrono de consulta no executor dedicado, sem bloquear o event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
+
+    async def verificar_saude(self) -> int:
+        """Versão assíncrona da verificação de saúde das conexões ociosas do pool."""
+        return await self._executar(self.pool.verificar_saude)
 
-    def _fechar_conexao(self):
-        """Fecha a conexão com o banco de dados."""
-        if self.connection:
-            self.connection.close()
+    def fechar(self):
+        """Encerra o executor e as conexões do pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.fechar()
 
     # ==========================================================
     # 🔎 NOVO MÉTODO — Buscar colaborador por CPF
@@ -54,10 +207,10 @@ class PortalDatabaseService:
         WHERE c.cpf = ? AND c.desligamento_data IS NULL;
         """
         try:
-            self._conectar()
-            cursor = self.connection.cursor()
-            cursor.execute(query, (cpf,))
-            row = cursor.fetchone()
+            with self.pool.conexao() as conexao:
+                cursor = conexao.cursor()
+                cursor.execute(query, (cpf,))
+                row = cursor.fetchone()
             if row:
                 return {
                     "colaborador_id": row.colaborador_id,
@@ -69,8 +222,10 @@ class PortalDatabaseService:
         except Exception as e:
             logger.error(f"Erro ao buscar colaborador por CPF {cpf}: {e}", exc_info=True)
             return None
-        finally:
-            self._fechar_conexao()
+
+    async def buscar_colaborador_por_cpf_async(self, cpf: str) -> Optional[Dict]:
+        """Versão assíncrona de `buscar_colaborador_por_cpf`."""
+        return await self._executar(self.buscar_colaborador_por_cpf, cpf)
 
     # ==========================================================
     # 🔎 ORQUESTRADOR
@@ -81,44 +236,69 @@ class PortalDatabaseService:
         com os dados de responsável do banco de dados do bot (PostgreSQL).
         """
         logger.info(f"Buscando dados completos para o discord_id: {id_discord}")
+        resultado = await self.buscar_dados_completos_colaboradores([id_discord])
+        return resultado.get(int(id_discord))
 
-        # 1. Busca os dados primários do colaborador no banco corporativo
-        dados_colaborador = self.buscar_dados_colaborador_por_discord_id(id_discord)
+    async def buscar_dados_completos_colaboradores(self, ids_discord: List[int]) -> Dict[int, Dict]:
+        """
+        Versão em lote do orquestrador. Faz uma única consulta corporativa (IN) para os
+        colaboradores e uma ao banco do bot para os responsáveis. O nome de cada responsável vem
+        do cache de perfis (TTL), de modo que desligamentos e mudanças de nome aparecem sem
+        intervenção; o nome gravado em `responsaveis_equipes` é atualizado quando muda e só é
+        usado diretamente se o banco corporativo estiver indisponível.
+        """
+        # 1. Busca os dados primários dos colaboradores no banco corporativo
+        colaboradores = await self.buscar_dados_colaboradores_por_discord_ids_async(ids_discord)
 
-        if not dados_colaborador:
-            logger.warning(f"Nenhum colaborador encontrado no DB corporativo para o discord_id: {id_discord}")
-            return None
+        for id_discord in ids_discord:
+            if int(id_discord) not in colaboradores:
+                logger.warning(f"Nenhum colaborador encontrado no DB corporativo para o discord_id: {id_discord}")
 
-        # Adiciona placeholders para os dados do responsável
-        dados_colaborador['nome_responsavel'] = "Não definido"
-        dados_colaborador['responsavel_id_discord'] = None
-        
-        id_equipe = dados_colaborador.get('id_equipe')
-        
-        # 2. Se o colaborador tem uma equipe, busca o responsável no banco de dados do BOT
-        if id_equipe:
-            logger.info(f"Colaborador pertence à equipe {id_equipe}. Buscando responsável no DB do bot.")
-            
-            dados_map_responsavel = await buscar_responsavel_por_equipe(int(id_equipe))
-            
-            if dados_map_responsavel:
-                id_discord_resp = dados_map_responsavel['responsavel_discord_id']
-                logger.info(f"Responsável encontrado no DB do bot com discord_id: {id_discord_resp}. Buscando nome...")
-                
-                info_responsavel = self.buscar_dados_colaborador_por_discord_id(id_discord_resp)
-                
-                if info_responsavel:
-                    dados_colaborador['nome_responsavel'] = info_responsavel.get('nome')
-                    dados_colaborador['responsavel_id_discord'] = id_discord_resp
-                    logger.info(f"Nome do responsável '{info_responsavel.get('nome')}' encontrado e adicionado.")
-                else:
-                    logger.warning(f"O ID Discord do responsável ({id_discord_resp}) foi encontrado no mapeamento, mas não há um colaborador correspondente no DB corporativo.")
+        if not colaboradores:
+            return {}
+
+        # 2. Busca os responsáveis de todas as equipes envolvidas no banco de dados do BOT
+        ids_equipes = {int(dados['id_equipe']) for dados in colaboradores.values() if dados.get('id_equipe')}
+        responsaveis = await buscar_responsaveis_por_equipes(list(ids_equipes)) if ids_equipes else {}
+
+        # 3. Nome atual dos responsáveis, em uma única consulta em lote (quase sempre respondida pelo cache)
+        nomes_gravados = {int(dados['responsavel_discord_id']): dados.get('responsavel_nome') for dados in responsaveis.values()}
+        if nomes_gravados:
+            try:
+                perfis_responsaveis = await self.buscar_dados_colaboradores_por_discord_ids_async(list(nomes_gravados))
+            except Exception as e:
+                logger.warning(f"Falha ao consultar os responsáveis no DB corporativo ({e}). Usando os nomes gravados.")
             else:
+                for id_discord_resp, nome_gravado in nomes_gravados.items():
+                    perfil = perfis_responsaveis.get(id_discord_resp)
+                    # Renomeado: o nome gravado (usado também no fechamento mensal) acompanha o portal
+                    if perfil and perfil['nome'] != nome_gravado:
+                        await registrar_nome_responsavel(id_discord_resp, perfil['nome'])
+                for dados in responsaveis.values():
+                    perfil = perfis_responsaveis.get(int(dados['responsavel_discord_id']))
+                    # Sem colaborador ativo no portal (ex: desligado), o responsável aparece como não definido
+                    dados['responsavel_nome'] = perfil['nome'] if perfil else None
+
+        for dados_colaborador in colaboradores.values():
+            # Adiciona placeholders para os dados do responsável
+            dados_colaborador['nome_responsavel'] = "Não definido"
+            dados_colaborador['responsavel_id_discord'] = None
+
+            id_equipe = dados_colaborador.get('id_equipe')
+            if not id_equipe:
+                logger.info(f"Colaborador {dados_colaborador['id_discord']} não está associado a nenhuma equipe.")
+                continue
+
+            dados_responsavel = responsaveis.get(int(id_equipe))
+            if not dados_responsavel:
                 logger.info(f"Nenhum responsável mapeado para a equipe {id_equipe} no DB do bot.")
-        else:
-            logger.info("Colaborador não está associado a nenhuma equipe.")
+            elif not dados_responsavel.get('responsavel_nome'):
+                logger.warning(f"O ID Discord do responsável ({dados_responsavel['responsavel_discord_id']}) foi encontrado no mapeamento, mas não há um colaborador correspondente no DB corporativo.")
+            else:
+                dados_colaborador['nome_responsavel'] = dados_responsavel['responsavel_nome']
+                dados_colaborador['responsavel_id_discord'] = dados_responsavel['responsavel_discord_id']
 
-        return dados_colaborador
+        return colaboradores
     
     # ==========================================================
     # 🔎 EQUIPES
@@ -126,33 +306,47 @@ class PortalDatabaseService:
     def buscar_todas_equipes(self) -> List[Dict]:
         """Busca todas as equipes ativas do banco de dados corporativo."""
         query = "SELECT id, descricao FROM PortalCorporativo.portalrh.equipe ORDER BY descricao"
-        try:
-            self._conectar()
-            cursor = self.connection.cursor()
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
             cursor.execute(query)
             columns = [column[0] for column in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
-        finally:
-            self._fechar_conexao()
+
+    async def buscar_todas_equipes_async(self) -> List[Dict]:
+        """Versão assíncrona de `buscar_todas_equipes`."""
+        return await self._executar(self.buscar_todas_equipes)
 
     def buscar_equipes_autocomplete(self, search_term: str) -> List[Dict]:
         """Busca equipes no banco de dados para a função de autocomplete."""
         query = "SELECT id, descricao FROM PortalCorporativo.portalrh.equipe WHERE descricao LIKE ? ORDER BY descricao"
-        try:
-            self._conectar()
-            cursor = self.connection.cursor()
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
             cursor.execute(query, f"%{search_term}%")
             columns = [column[0] for column in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
-        finally:
-            self._fechar_conexao()
+
+    async def buscar_equipes_autocomplete_async(self, search_term: str) -> List[Dict]:
+        """Versão assíncrona de `buscar_equipes_autocomplete`."""
+        return await self._executar(self.buscar_equipes_autocomplete, search_term)
 
     # ==========================================================
     # 🔎 COLABORADOR POR DISCORD
     # ==========================================================
-    def buscar_dados_colaborador_por_discord_id(self, id_discord: int) -> Optional[Dict]:
-        """Busca os dados básicos de um colaborador pelo seu ID do Discord."""
-        query = """
+    def buscar_dados_colaboradores_por_discord_ids(self, ids_discord: List[int]) -> Dict[int, Dict]:
+        """Busca os dados básicos de vários colaboradores em uma única consulta (IN), indexados pelo ID do Discord."""
+        ids_unicos = list(dict.fromkeys(int(id_discord) for id_discord in ids_discord))
+        resultado = {}
+        # O SQL Server aceita no máximo 2100 parâmetros por comando
+        for inicio in range(0, len(ids_unicos), TAMANHO_LOTE_IN):
+            lote = ids_unicos[inicio:inicio + TAMANHO_LOTE_IN]
+            for linha in self._consultar_colaboradores_por_discord_ids(lote):
+                resultado[int(linha['id_discord'])] = linha
+        return resultado
+
+    def _consultar_colaboradores_por_discord_ids(self, ids_discord: List[int]) -> List[Dict]:
+        """Executa a consulta IN para um lote de IDs do Discord."""
+        marcadores = ", ".join("?" for _ in ids_discord)
+        query = f"""
         SELECT
             c.id as colaborador_id, c.nome, c.email, c.id_discord, c.matricula, c.id_equipe,
             car.descricao as nome_cargo,
@@ -161,28 +355,96 @@ class PortalDatabaseService:
         LEFT JOIN PortalCorporativo.portalrh.cargo as car ON c.id_cargo = car.id
         LEFT JOIN PortalCorporativo.portalrh.equipe as eq ON c.id_equipe = eq.id
         LEFT JOIN PortalCorporativo.portalrh.departamento as dep ON eq.id_departamento = dep.id
-        WHERE c.id_discord = ? AND c.desligamento_data IS NULL;
+        WHERE c.id_discord IN ({marcadores}) AND c.desligamento_data IS NULL;
         """
-        try:
-            self._conectar()
-            cursor = self.connection.cursor()
-            cursor.execute(query, id_discord)
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            cursor.execute(query, *ids_discord)
             columns = [column[0] for column in cursor.description]
-            row = cursor.fetchone()
-            return dict(zip(columns, row)) if row else None
-        finally:
-            self._fechar_conexao()
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    async def _carregar_perfis(self, ids_discord: List[int]) -> Dict[int, Dict]:
+        """Consulta os perfis no banco corporativo (sem cache)."""
+        return await self._executar(self.buscar_dados_colaboradores_por_discord_ids, ids_discord)
+
+    async def buscar_dados_colaboradores_por_discord_ids_async(self, ids_discord: List[int]) -> Dict[int, Dict]:
+        """
+        Versão assíncrona e com cache de `buscar_dados_colaboradores_por_discord_ids`.
+        Perfis obsoletos são devolvidos na hora e recarregados em segundo plano; só os IDs
+        ausentes do cache vão ao banco corporativo, em uma única consulta.
+        """
+        resultado: Dict[int, Dict] = {}
+        obsoletos, faltantes, expirados = [], [], {}
+
+        for id_discord in dict.fromkeys(int(i) for i in ids_discord):
+            estado, perfil = self.cache_perfis.consultar(id_discord)
+            if estado in (FRESCO, OBSOLETO):
+                if perfil is not None:
+                    resultado[id_discord] = dict(perfil)
+                if estado == OBSOLETO:
+                    obsoletos.append(id_discord)
+            else:
+                faltantes.append(id_discord)
+                if estado == EXPIRADO and perfil is not None:
+                    expirados[id_discord] = perfil
+
+        if obsoletos:
+            self.cache_perfis.recarregar_em_segundo_plano(obsoletos, self._carregar_perfis)
+
+        if faltantes:
+            try:
+                perfis = await self._carregar_perfis(faltantes)
+            except Exception as e:
+                if not expirados:
+                    raise
+                # Banco corporativo indisponível: usa o último perfil conhecido
+                logger.warning(f"Falha ao consultar perfis no DB corporativo ({e}). Servindo {len(expirados)} perfil(is) expirado(s) do cache.")
+                perfis = expirados
+            else:
+                for id_discord in faltantes:
+                    self.cache_perfis.definir(id_discord, perfis.get(id_discord))
+            resultado.update({id_discord: dict(perfil) for id_discord, perfil in perfis.items()})
+
+        return resultado
+
+    def buscar_dados_colaborador_por_discord_id(self, id_discord: int) -> Optional[Dict]:
+        """Busca os dados básicos de um colaborador pelo seu ID do Discord."""
+        return self.buscar_dados_colaboradores_por_discord_ids([id_discord]).get(int(id_discord))
+
+    async def buscar_dados_colaborador_por_discord_id_async(self, id_discord: int) -> Optional[Dict]:
+        """Versão assíncrona (e com cache) de `buscar_dados_colaborador_por_discord_id`."""
+        perfis = await self.buscar_dados_colaboradores_por_discord_ids_async([id_discord])
+        return perfis.get(int(id_discord))
 
     # ==========================================================
     # 🔎 PONTO
     # ==========================================================
-    def buscar_detalhes_ponto_recente(self, id_discord: int) -> List[Dict]:
+    def buscar_detalhes_ponto_recente(self, id_discord: int, agregar_no_servidor: Optional[bool] = None) -> List[Dict]:
         """
         Busca todas as batidas de ponto dos últimos dias e processa os dados
         para calcular o total trabalhado e as horas extras por dia.
         """
         data_fim = datetime.now()
-        data_inicio = data_fim - timedelta(days=25)
+        data_inicio = data_fim - timedelta(days=DIAS_PONTO_RECENTE)
+        return self.buscar_detalhes_ponto_periodo(id_discord, data_inicio, data_fim, agregar_no_servidor)
+
+    def buscar_detalhes_ponto_periodo(self, id_discord: int, data_inicio: date, data_fim: date,
+                                      agregar_no_servidor: Optional[bool] = None) -> List[Dict]:
+        """
+        Calcula o total trabalhado e as horas extras por dia de um colaborador no período.
+
+        Com `agregar_no_servidor`, o pareamento das batidas e o total diário são feitos no
+        SQL Server e só os dias com horas extras trafegam pela rede. O cálculo em Python
+        continua sendo a referência e é usado como fallback se a consulta agregada falhar.
+        """
+        if agregar_no_servidor is None:
+            agregar_no_servidor = PONTO_AGREGACAO_SERVIDOR
+
+        if agregar_no_servidor:
+            try:
+                return self._buscar_horas_extras_agregadas(id_discord, data_inicio, data_fim)
+            except pyodbc.Error as e:
+                logger.warning(f"Falha na agregação de ponto no SQL Server para id_discord {id_discord} ({e}). Usando o cálculo em Python.")
 
         query = """
         SELECT pm.data, pm.hora
@@ -191,36 +453,158 @@ class PortalDatabaseService:
         WHERE c.id_discord = ? AND pm.data BETWEEN ? AND ? and ISNULL(pm.justificativa,'') <> 'EXC'
         ORDER BY pm.data, pm.hora;
         """
-        marcacoes_por_dia = defaultdict(list)
-        try:
-            self._conectar()
-            cursor = self.connection.cursor()
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
             cursor.execute(query, id_discord, data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'))
-            for row in cursor.fetchall():
-                marcacoes_por_dia[row.data].append(datetime.strptime(row.hora, '%H:%M').time())
-        finally:
-            self._fechar_conexao()
+            rows = cursor.fetchall()
+
+        dias = calcular_horas_extras_lote(
+            datas=[row.data for row in rows],
+            horas=[row.hora for row in rows],
+            colaboradores=[id_discord] * len(rows),
+        )
+        return [
+            {"data": dia["data"], "batidas_str": dia["batidas_str"], "horas_extras_timedelta": dia["horas_extras_timedelta"]}
+            for dia in dias
+        ]
+
+    def _buscar_horas_extras_agregadas(self, id_discord: int, data_inicio: date, data_fim: date) -> List[Dict]:
+        """Pareia as batidas (entrada/saída) e soma o dia no próprio SQL Server com funções de janela."""
+        query = """
+        WITH batidas AS (
+            SELECT
+                pm.data,
+                CAST(LEFT(pm.hora, CHARINDEX(':', pm.hora) - 1) AS INT) * 60
+                    + CAST(SUBSTRING(pm.hora, CHARINDEX(':', pm.hora) + 1, 2) AS INT) AS minutos,
+                ROW_NUMBER() OVER (PARTITION BY pm.data ORDER BY pm.hora) AS posicao
+            FROM PortalCorporativo.portalrh.ponto_marcacao as pm
+            JOIN PortalCorporativo.portalrh.colaborador as c ON pm.pis = c.pis_numero
+            WHERE c.id_discord = ? AND pm.data BETWEEN ? AND ? and ISNULL(pm.justificativa,'') <> 'EXC'
+        ),
+        pares AS (
+            -- Cada entrada (posição ímpar) é pareada com a batida seguinte (saída)
+            SELECT data, minutos, posicao,
+                   LEAD(minutos) OVER (PARTITION BY data ORDER BY posicao) AS proxima
+            FROM batidas
+        ),
+        dias AS (
+            SELECT
+                data,
+                COUNT(*) AS quantidade,
+                SUM(CASE WHEN posicao % 2 = 1 THEN proxima - minutos ELSE 0 END) AS minutos_trabalhados,
+                STRING_AGG(
+                    RIGHT('0' + CAST(minutos / 60 AS VARCHAR(2)), 2) + ':' + RIGHT('0' + CAST(minutos % 60 AS VARCHAR(2)), 2),
+                    ' - '
+                ) WITHIN GROUP (ORDER BY posicao) AS batidas_str
+            FROM pares
+            GROUP BY data
+        )
+        SELECT data, batidas_str, minutos_trabalhados - ? AS minutos_extras
+        FROM dias
+        WHERE quantidade % 2 = 0 AND minutos_trabalhados > ?
+        ORDER BY data DESC;
+        """
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            cursor.execute(
+                query, id_discord, data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'),
+                JORNADA_PADRAO_MINUTOS, JORNADA_PADRAO_MINUTOS
+            )
+            rows = cursor.fetchall()
+
+        return [
+            {"data": row.data, "batidas_str": row.batidas_str, "horas_extras_timedelta": timedelta(minutes=row.minutos_extras)}
+            for row in rows
+        ]
+
+    async def buscar_detalhes_ponto_recente_async(self, id_discord: int, agregar_no_servidor: Optional[bool] = None) -> List[Dict]:
+        """Versão assíncrona de `buscar_detalhes_ponto_recente`."""
+        return await self._executar(self.buscar_detalhes_ponto_recente, id_discord, agregar_no_servidor)
+
+    async def buscar_detalhes_ponto_periodo_async(self, id_discord: int, data_inicio: date, data_fim: date,
+                                                  agregar_no_servidor: Optional[bool] = None) -> List[Dict]:
+        """Versão assíncrona de `buscar_detalhes_ponto_periodo`."""
+        return await self._executar(self.buscar_detalhes_ponto_periodo, id_discord, data_inicio, data_fim, agregar_no_servidor)
+
+    def buscar_horas_extras_por_discord(self, data_inicio: date, data_fim: date) -> List[Dict]:
+        """
+        Calcula em lote as horas extras por dia de todos os colaboradores ativos vinculados ao
+        Discord no período. Usado pela sincronização do ledger; o campo "colaborador" é o id_discord.
+        """
+        query = """
+        SELECT c.id_discord, pm.data, pm.hora
+        FROM PortalCorporativo.portalrh.ponto_marcacao as pm
+        JOIN PortalCorporativo.portalrh.colaborador as c ON pm.pis = c.pis_numero
+        WHERE c.id_discord IS NOT NULL AND c.desligamento_data IS NULL
+            AND pm.data BETWEEN ? AND ? and ISNULL(pm.justificativa,'') <> 'EXC'
+        ORDER BY c.id_discord, pm.data, pm.hora;
+        """
+        colaboradores, datas, horas = [], [], []
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            cursor.execute(query, data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'))
+            while True:
+                bloco = cursor.fetchmany(TAMANHO_BLOCO_LEITURA)
+                if not bloco:
+                    break
+                for row in bloco:
+                    colaboradores.append(int(row.id_discord))
+                    datas.append(row.data)
+                    horas.append(row.hora)
+
+        logger.info(f"{len(horas)} batida(s) lidas entre {data_inicio} e {data_fim} para o ledger de horas extras.")
+        return calcular_horas_extras_lote(datas, horas, colaboradores)
+
+    async def buscar_horas_extras_por_discord_async(self, data_inicio: date, data_fim: date) -> List[Dict]:
+        """Versão assíncrona de `buscar_horas_extras_por_discord`."""
+        return await self._executar(self.buscar_horas_extras_por_discord, data_inicio, data_fim)
+
+    def buscar_horas_extras_equipe(self, id_equipe: int, data_inicio: date, data_fim: date) -> Dict:
+        """
+        Busca, em uma única consulta, as batidas de todos os membros ativos de uma equipe no
+        período e calcula as horas extras de todos eles em lote.
+        Retorna {"membros": {colaborador_id: {...}}, "dias": [dias com horas extras]}.
+        """
+        query = """
+        SELECT c.id AS colaborador_id, c.nome, c.matricula, c.id_discord, pm.data, pm.hora
+        FROM PortalCorporativo.portalrh.colaborador as c
+        LEFT JOIN PortalCorporativo.portalrh.ponto_marcacao as pm
+            ON pm.pis = c.pis_numero
+            AND pm.data BETWEEN ? AND ?
+            AND ISNULL(pm.justificativa,'') <> 'EXC'
+        WHERE c.id_equipe = ? AND c.desligamento_data IS NULL
+        ORDER BY c.id, pm.data, pm.hora;
+        """
+        membros: Dict[int, Dict] = {}
+        colaboradores, datas, horas = [], [], []
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            cursor.execute(query, data_inicio.strftime('%Y-%m-%d'), data_fim.strftime('%Y-%m-%d'), id_equipe)
+            # Lê em blocos e guarda só as colunas necessárias, sem manter os objetos Row
+            while True:
+                bloco = cursor.fetchmany(TAMANHO_BLOCO_LEITURA)
+                if not bloco:
+                    break
+                for row in bloco:
+                    if row.colaborador_id not in membros:
+                        membros[row.colaborador_id] = {
+                            "colaborador_id": row.colaborador_id,
+                            "nome": row.nome,
+                            "matricula": row.matricula,
+                            "id_discord": row.id_discord,
+                        }
+                    if row.data is not None:
+                        colaboradores.append(row.colaborador_id)
+                        datas.append(row.data)
+                        horas.append(row.hora)
+
+        logger.info(f"Relatório da equipe {id_equipe}: {len(membros)} membro(s) e {len(horas)} batida(s) no período.")
+        return {"membros": membros, "dias": calcular_horas_extras_lote(datas, horas, colaboradores)}
+
+    async def buscar_horas_extras_equipe_async(self, id_equipe: int, data_inicio: date, data_fim: date) -> Dict:
+        """Versão assíncrona de `buscar_horas_extras_equipe`."""
+        return await self._executar(self.buscar_horas_extras_equipe, id_equipe, data_inicio, data_fim)
 
-        dias_detalhados = []
-        for dia, batidas in marcacoes_por_dia.items():
-            if len(batidas) % 2 != 0:
-                logger.warning(f"Dia {dia} para id_discord {id_discord} tem um número ímpar de batidas. Ignorando.")
-                continue
 
-            total_trabalhado = timedelta()
-            for i in range(0, len(batidas), 2):
-                entrada = datetime.combine(dia, batidas[i])
-                saida = datetime.combine(dia, batidas[i+1])
-                total_trabalhado += (saida - entrada)
-            
-            jornada_padrao = timedelta(hours=8)
-            horas_extras = total_trabalhado - jornada_padrao if total_trabalhado > jornada_padrao else timedelta(0)
-
-            if horas_extras > timedelta(0):
-                dias_detalhados.append({
-                    "data": dia,
-                    "batidas_str": " - ".join([t.strftime('%H:%M') for t in batidas]),
-                    "horas_extras_timedelta": horas_extras
-                })
-        
-        return sorted(dias_detalhados, key=lambda x: x['data'], reverse=True)
+# Instância única compartilhada por cogs e views: um só pool e um só executor para o banco corporativo.
+portal_service = PortalDatabaseService()
@@ -11,9 +11,11 @@ from database.queries import (
     insert_municipio, fetch_municipio_autocomplete,
     busca_entidade_id, create_municipio_administracao_link,
     check_credencial, insert_credencial, update_credenciais,
-    fetch_credenciais_por_id # Adicionada para o novo teste
+    fetch_credenciais_por_id, # Adicionada para o novo teste
+    cache_credenciais,
+    reservar_comunicados, liberar_comunicados, existem_comunicados_registrados
 )
-from database.models import municipios, administracoes, municipios_administracoes, credenciais
+from database.models import municipios, administracoes, municipios_administracoes, credenciais, comunicados
 
 # --- Fixture de Conexão e Limpeza ---
 @pytest_asyncio.fixture(scope="function", autouse=True)
@@ -68,6 +70,15 @@ async def test_inserir_municipio_com_sucesso():
     assert len(fetch_res) == 1
     assert fetch_res[0]["nom_municipio"] == nome
 
+@pytest.mark.asyncio
+async def test_autocomplete_municipio_ignora_acentos_e_prioriza_prefixo():
+    """Verifica se o autocomplete encontra nomes sem acento a partir de termos acentuados, com prefixos primeiro."""
+    await insert_municipio("Joao Pessoa", "22222222222222")
+    await insert_municipio("Sao Joao Del Rei", "33333333333333")
+
+    fetch_res = await fetch_municipio_autocomplete("JOÃO")
+    assert [mun["nom_municipio"] for mun in fetch_res] == ["Joao Pessoa", "Sao Joao Del Rei"]
+
 @pytest.mark.asyncio
 async def test_inserir_municipio_duplicado_falha():
     """Verifica se a inserção de um município duplicado falha graciosamente."""
@@ -152,6 +163,21 @@ async def test_fetch_credenciais_retorna_dados_corretos(setup_data):
     assert credencial_encontrada["senha"] == "senha_secreta"
     assert credencial_encontrada["status_validade"] is True
 
+@pytest.mark.asyncio
+async def test_fetch_credenciais_usa_cache_e_reflete_atualizacao(setup_data):
+    """Verifica se consultas repetidas vêm do cache e se a atualização da credencial invalida o município."""
+    cod_mun = setup_data["cod_municipio"]
+    entity_id = await create_municipio_administracao_link(cod_mun, setup_data["cod_administracao"])
+    await insert_credencial(entity_id, "12345678901", "senha_antiga", True)
+
+    await fetch_credenciais_por_id(cod_mun)
+    hits_antes = cache_credenciais.hits
+    assert (await fetch_credenciais_por_id(cod_mun))[0]["senha"] == "senha_antiga"
+    assert cache_credenciais.hits == hits_antes + 1
+
+    await update_credenciais(entity_id, {"senha": "senha_nova"})
+    assert (await fetch_credenciais_por_id(cod_mun))[0]["senha"] == "senha_nova"
+
 @pytest.mark.asyncio
 async def test_busca_entidade_inexistente_retorna_none(setup_data):
     """Verifica se a busca por uma entidade com um ID de administração inválido retorna None."""
@@ -161,3 +187,50 @@ async def test_busca_entidade_inexistente_retorna_none(setup_data):
     # Ação e Verificação
     entity_id = await busca_entidade_id(cod_mun, cod_adm_invalido)
     assert entity_id is None
+
+
+# --- Testes para Comunicados Postados ---
+
+def _comunicado(numero: int) -> dict:
+    return {
+        "link": f"https://teste.local/comunicado/{numero}/",
+        "titulo_comunicado": f"Comunicado {numero}",
+        "data_comunicado": "05/02/2025" if numero % 2 else "Data não encontrada",
+    }
+
+@pytest.mark.asyncio
+async def test_reservar_comunicados_registra_so_os_novos_e_libera_os_nao_postados():
+    """Uma única inserção registra os comunicados novos; os já registrados (ou reservados por outra instância) ficam de fora."""
+    await database.execute(comunicados.delete().where(comunicados.c.url.like("https://teste.local/%")))
+    try:
+        assert [c["link"] for c in await reservar_comunicados([_comunicado(1)])] == [_comunicado(1)["link"]]
+        assert await existem_comunicados_registrados() is True
+
+        novos = await reservar_comunicados([_comunicado(3), _comunicado(2), _comunicado(1)])
+        assert [c["titulo_comunicado"] for c in novos] == ["Comunicado 3", "Comunicado 2"]
+        assert await reservar_comunicados([_comunicado(3), _comunicado(2)]) == []
+
+        await liberar_comunicados([_comunicado(2)["link"]])
+        assert [c["titulo_comunicado"] for c in await reservar_comunicados([_comunicado(2)])] == ["Comunicado 2"]
+    finally:
+        await database.execute(comunicados.delete().where(comunicados.c.url.like("https://teste.local/%")))
+
+
+@pytest.mark.asyncio
+async def test_reservar_comunicados_corta_textos_ao_tamanho_das_colunas():
+    """Um título longo não derruba o lote; a data fica como o texto exibido no portal."""
+    longo = {**_comunicado(4), "titulo_comunicado": "T" * 400}
+    await database.execute(comunicados.delete().where(comunicados.c.url.like("https://teste.local/%")))
+    try:
+        novos = await reservar_comunicados([longo, _comunicado(5)])
+        assert [c["link"] for c in novos] == [longo["link"], _comunicado(5)["link"]]
+
+        linhas = {
+            row["url"]: row for row in await database.fetch_all(
+                comunicados.select().where(comunicados.c.url.like("https://teste.local/%"))
+            )
+        }
+        assert len(linhas[longo["link"]]["titulo_comunicado"]) == 255
+        assert linhas[_comunicado(5)["link"]]["data_postagem"] == "05/02/2025"
+    finally:
+        await database.execute(comunicados.delete().where(comunicados.c.url.like("https://teste.local/%")))
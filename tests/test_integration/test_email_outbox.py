@@ -0,0 +1,117 @@
+# tests/test_integration/test_email_outbox.py
+import os
+import asyncio
+import smtplib
+import pytest
+import pytest_asyncio
+from datetime import timedelta
+
+from database.db_manager import database
+from database.bot_queries import reservar_emails_outbox
+from database.models import email_outbox
+from services.email_service import CaixaSaidaEmail
+from services.pdf_storage import ArmazenamentoPDF
+
+
+class _EntregaFalsa:
+    """Registra as mensagens em vez de enviá-las; com `erro`, toda tentativa falha com ele."""
+
+    def __init__(self, erro: Exception = None):
+        self.erro = erro
+        self.enviadas = []
+
+    async def enviar(self, mensagem, destinatarios):
+        if self.erro is not None:
+            raise self.erro
+        self.enviadas.append((mensagem, destinatarios))
+
+    async def encerrar_se_ociosa(self):
+        pass
+
+    async def fechar(self):
+        pass
+
+
+@pytest_asyncio.fixture(scope="function", autouse=True)
+async def db_connection():
+    """Conecta ao banco de TESTES e esvazia a caixa de saída antes de cada teste."""
+    test_db_url = os.getenv("TEST_DATABASE_URL")
+    if not test_db_url:
+        pytest.skip("A variável de ambiente TEST_DATABASE_URL não está configurada.")
+
+    database._url = test_db_url
+    await database.connect()
+    await database.execute(email_outbox.delete())
+    yield
+    await database.disconnect()
+
+
+async def _emails():
+    return {row["assunto"]: dict(row) for row in await database.fetch_all(email_outbox.select())}
+
+
+def _caixa(entrega, tmp_path, **kwargs) -> CaixaSaidaEmail:
+    return CaixaSaidaEmail(entrega, ArmazenamentoPDF(str(tmp_path)), backoff_inicial=60, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_reservas_simultaneas_nao_repetem_emails():
+    """Duas reservas ao mesmo tempo dividem os pendentes, e um e-mail reservado não é reservado de novo."""
+    for i in range(4):
+        await database.execute(email_outbox.insert().values(assunto=f"#{i}", corpo="corpo", destinatarios=["rh@teste"]))
+
+    lotes = await asyncio.gather(
+        reservar_emails_outbox(2, timedelta(minutes=5)),
+        reservar_emails_outbox(2, timedelta(minutes=5)),
+    )
+    ids = [email["id"] for lote in lotes for email in lote]
+
+    assert len(ids) == len(set(ids)) == 4
+    assert await reservar_emails_outbox(10, timedelta(minutes=5)) == []
+
+
+@pytest.mark.asyncio
+async def test_email_com_anexo_e_enviado_e_concluido(tmp_path):
+    entrega = _EntregaFalsa()
+    caixa = _caixa(entrega, tmp_path)
+    pdf_hash = caixa.armazenamento.salvar(b"%PDF-1.4 teste")
+
+    await caixa.registrar("com anexo", "corpo", ["rh@teste", "colaborador@teste"], pdf_hash, "Formulario.pdf")
+    await asyncio.gather(*caixa._tarefas)
+
+    (mensagem, destinatarios), = entrega.enviadas
+    assert destinatarios == ["rh@teste", "colaborador@teste"]
+    anexo = mensagem.get_payload()[1]
+    assert anexo.get_filename() == "Formulario.pdf"
+    assert anexo.get_payload(decode=True) == b"%PDF-1.4 teste"
+    email = (await _emails())["com anexo"]
+    assert (email["status"], email["tentativas"]) == ("ENVIADO", 1)
+
+
+@pytest.mark.asyncio
+async def test_servidor_fora_do_ar_interrompe_o_lote_sem_gastar_tentativas(tmp_path):
+    """Com o SMTP indisponível, só o primeiro e-mail conta uma tentativa; todos ficam para depois."""
+    caixa = _caixa(_EntregaFalsa(ConnectionRefusedError("SMTP fora do ar")), tmp_path)
+    for assunto in ("a", "b", "c"):
+        await database.execute(email_outbox.insert().values(assunto=assunto, corpo="corpo", destinatarios=["rh@teste"]))
+
+    assert await caixa.processar() == 0
+
+    emails = await _emails()
+    assert [emails[assunto]["tentativas"] for assunto in ("a", "b", "c")] == [1, 0, 0]
+    assert {email["status"] for email in emails.values()} == {"PENDENTE"}
+    assert "SMTP fora do ar" in emails["a"]["ultimo_erro"]
+    assert await reservar_emails_outbox(10, timedelta(minutes=5)) == []
+
+
+@pytest.mark.asyncio
+async def test_recusa_definitiva_nao_e_repetida(tmp_path):
+    recusa = smtplib.SMTPRecipientsRefused({"rh@teste": (550, b"caixa inexistente")})
+    caixa = _caixa(_EntregaFalsa(recusa), tmp_path)
+    await database.execute(email_outbox.insert().values(assunto="recusado", corpo="corpo", destinatarios=["rh@teste"]))
+
+    await caixa.processar()
+
+    email = (await _emails())["recusado"]
+    assert (email["status"], email["tentativas"]) == ("FALHOU", 1)
+
@@ -0,0 +1,121 @@
+# tests/test_integration/test_ledger_horas_extras.py
+import pytest
+import pytest_asyncio
+import os
+from datetime import date, timedelta
+
+from database.db_manager import database
+from database.bot_queries import (
+    criar_solicitacao, cancelar_solicitacao, buscar_marca_dagua,
+    gravar_ledger_horas_extras, buscar_dias_disponiveis_ledger
+)
+from database.models import ledger_horas_extras, sincronizacoes, solicitacoes_horas_extras
+
+DISCORD_ID = 123456789
+NOME = "ledger_teste"
+
+
+@pytest_asyncio.fixture(scope="function", autouse=True)
+async def db_connection():
+    """Conecta ao banco de TESTES e limpa as tabelas do ledger antes de cada teste."""
+    test_db_url = os.getenv("TEST_DATABASE_URL")
+    if not test_db_url:
+        pytest.skip("A variável de ambiente TEST_DATABASE_URL não está configurada.")
+
+    database._url = test_db_url
+    await database.connect()
+    await database.execute(ledger_horas_extras.delete())
+    await database.execute(sincronizacoes.delete())
+    await database.execute(solicitacoes_horas_extras.delete().where(
+        solicitacoes_horas_extras.c.solicitante_discord_id == DISCORD_ID
+    ))
+    yield
+    await database.disconnect()
+
+
+def _dia(data: date, minutos_extras: int) -> dict:
+    return {
+        "colaborador": DISCORD_ID,
+        "data": data,
+        "batidas_str": "08:00 - 12:00 - 13:00 - 18:00",
+        "minutos_trabalhados": 480 + minutos_extras,
+        "horas_extras_timedelta": timedelta(minutes=minutos_extras),
+    }
+
+
+@pytest.mark.asyncio
+async def test_gravar_ledger_substitui_periodo_e_avanca_marca():
+    """Uma nova sincronização do mesmo período substitui os dias anteriores e grava a marca d'água."""
+    inicio, fim = date(2025, 3, 1), date(2025, 3, 3)
+    await gravar_ledger_horas_extras(NOME, inicio, fim, [_dia(date(2025, 3, 1), 30), _dia(date(2025, 3, 2), 60)])
+    await gravar_ledger_horas_extras(NOME, inicio, fim, [_dia(date(2025, 3, 2), 90)])
+
+    dias = await buscar_dias_disponiveis_ledger(DISCORD_ID, inicio, fim)
+
+    assert [(dia["data"], dia["minutos_extras"]) for dia in dias] == [(date(2025, 3, 2), 90)]
+    assert await buscar_marca_dagua(NOME) == fim
+
+
+@pytest.mark.asyncio
+async def test_dias_de_solicitacao_ativa_saem_do_ledger_ate_o_cancelamento():
+    """Dias incluídos em uma solicitação ficam reivindicados e voltam a ficar disponíveis ao cancelar."""
+    inicio, fim = date(2025, 3, 1), date(2025, 3, 3)
+    await gravar_ledger_horas_extras(NOME, inicio, fim, [_dia(date(2025, 3, 1), 30), _dia(date(2025, 3, 2), 60)])
+
+    solicitacao_id = await criar_solicitacao(DISCORD_ID, {"detalhes_selecionados": [{"data": "2025-03-02"}]})
+    dias = await buscar_dias_disponiveis_ledger(DISCORD_ID, inicio, fim)
+    assert [dia["data"] for dia in dias] == [date(2025, 3, 1)]
+
+    await cancelar_solicitacao(solicitacao_id, DISCORD_ID)
+    dias = await buscar_dias_disponiveis_ledger(DISCORD_ID, inicio, fim)
+    assert [dia["data"] for dia in dias] == [date(2025, 3, 2), date(2025, 3, 1)]
+
+
+class _PortalFalso:
+    """Registra qual consulta de ponto foi usada; o ponto ao vivo tem um dia com horas extras por dia."""
+
+    def __init__(self):
+        self.consultas = []
+
+    async def buscar_detalhes_ponto_recente_async(self, id_discord: int):
+        self.consultas.append("recente")
+        hoje = date.today()
+        return [
+            {"data": hoje - timedelta(days=i), "batidas_str": "08:00 - 18:00", "horas_extras_timedelta": timedelta(hours=1)}
+            for i in range(25)
+        ]
+
+    async def buscar_detalhes_ponto_periodo_async(self, id_discord: int, data_inicio: date, data_fim: date):
+        self.consultas.append("periodo")
+        return []
+
+
+@pytest.mark.asyncio
+async def test_colaborador_vinculado_depois_da_ultima_sincronizacao_consulta_ao_vivo():
+    """Sem dias anteriores à janela de reprocessamento no ledger, os 25 dias vêm do banco corporativo."""
+    ledger_service = pytest.importorskip("services.ledger_service")
+    hoje = date.today()
+    ontem = hoje - timedelta(days=1)
+    janela = ledger_service.LEDGER_DIAS_REPROCESSAMENTO
+
+    # Última sincronização incremental: o colaborador recém-vinculado só aparece nos dias reprocessados
+    await gravar_ledger_horas_extras(
+        ledger_service.NOME_SINCRONIZACAO, hoje - timedelta(days=janela), ontem,
+        [_dia(hoje - timedelta(days=i), 60) for i in range(1, janela + 1)]
+    )
+    portal = _PortalFalso()
+    ledger = ledger_service.LedgerHorasExtras(portal)
+
+    dias = await ledger.buscar_dias_disponiveis(DISCORD_ID)
+    assert portal.consultas == ["recente"]
+    assert len(dias) == 25
+
+    # Com histórico anterior à janela, o ledger volta a ser usado
+    await gravar_ledger_horas_extras(
+        ledger_service.NOME_SINCRONIZACAO, hoje - timedelta(days=10), ontem,
+        [_dia(hoje - timedelta(days=i), 60) for i in range(1, 11)]
+    )
+    portal.consultas.clear()
+    dias = await ledger.buscar_dias_disponiveis(DISCORD_ID)
+    assert portal.consultas == ["periodo"]
+    assert len(dias) == 10
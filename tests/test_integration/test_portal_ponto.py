@@ -0,0 +1,34 @@
+# tests/test_integration/test_portal_ponto.py
+import os
+import pytest
+from datetime import datetime, timedelta
+
+# Este teste compara os dois modos de cálculo contra o banco corporativo real (somente leitura).
+# Informe os IDs do Discord de colaboradores com batidas recentes, separados por vírgula.
+IDS_DISCORD = [int(i) for i in os.getenv("TEST_CORP_DISCORD_IDS", "").split(",") if i.strip()]
+
+if not os.getenv("CORP_DB_HOST") or not IDS_DISCORD:
+    pytest.skip("CORP_DB_HOST e TEST_CORP_DISCORD_IDS não configurados.", allow_module_level=True)
+
+portal_module = pytest.importorskip("services.portal_service")
+
+
+@pytest.fixture(scope="module")
+def portal():
+    servico = portal_module.PortalDatabaseService()
+    yield servico
+    servico.fechar()
+
+
+@pytest.mark.parametrize("id_discord", IDS_DISCORD)
+def test_agregacao_no_servidor_igual_ao_calculo_em_python(portal, id_discord):
+    """A agregação feita no SQL Server deve produzir exatamente os mesmos dias, batidas e horas extras."""
+    referencia = portal.buscar_detalhes_ponto_recente(id_discord, agregar_no_servidor=False)
+    agregado = portal._buscar_horas_extras_agregadas(id_discord, *_janela_padrao())
+    assert agregado == referencia
+
+
+def _janela_padrao():
+    """Mesma janela de 25 dias usada por `buscar_detalhes_ponto_recente`."""
+    data_fim = datetime.now()
+    return data_fim - timedelta(days=25), data_fim
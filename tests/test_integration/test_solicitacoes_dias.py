@@ -0,0 +1,141 @@
+# tests/test_integration/test_solicitacoes_dias.py
+import pytest
+import pytest_asyncio
+import os
+from datetime import date
+
+from database.db_manager import database
+from database.bot_queries import (
+    criar_solicitacao, cancelar_solicitacao, atualizar_status_solicitacao, buscar_datas_bloqueadas,
+    iterar_solicitacoes_aprovadas
+)
+from database.models import solicitacoes_horas_extras
+
+DISCORD_ID = 987654321
+
+
+@pytest_asyncio.fixture(scope="function", autouse=True)
+async def db_connection():
+    """Conecta ao banco de TESTES e remove as solicitações do colaborador de teste."""
+    test_db_url = os.getenv("TEST_DATABASE_URL")
+    if not test_db_url:
+        pytest.skip("A variável de ambiente TEST_DATABASE_URL não está configurada.")
+
+    database._url = test_db_url
+    await database.connect()
+    # ON DELETE CASCADE remove também as linhas de solicitacoes_dias
+    await database.execute(solicitacoes_horas_extras.delete().where(
+        solicitacoes_horas_extras.c.solicitante_discord_id == DISCORD_ID
+    ))
+    yield
+    await database.disconnect()
+
+
+def _formulario(*datas: str) -> dict:
+    return {"detalhes_selecionados": [{"data": data} for data in datas]}
+
+
+@pytest.mark.asyncio
+async def test_datas_bloqueadas_seguem_o_status_da_solicitacao():
+    """Dias de solicitações pendentes ou aprovadas bloqueiam; reprovadas e canceladas liberam."""
+    aprovada = await criar_solicitacao(DISCORD_ID, _formulario("2025-04-01", "2025-04-02"))
+    reprovada = await criar_solicitacao(DISCORD_ID, _formulario("2025-04-03"))
+    cancelada = await criar_solicitacao(DISCORD_ID, _formulario("2025-04-04"))
+    await criar_solicitacao(DISCORD_ID, _formulario("2025-04-05"))
+
+    await atualizar_status_solicitacao(aprovada, 'APROVADO', 1)
+    await atualizar_status_solicitacao(reprovada, 'REPROVADO', 1)
+    await cancelar_solicitacao(cancelada, DISCORD_ID)
+
+    assert sorted(await buscar_datas_bloqueadas(DISCORD_ID)) == [
+        date(2025, 4, 1), date(2025, 4, 2), date(2025, 4, 5)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_mesmo_dia_nao_pode_estar_em_duas_solicitacoes_ativas():
+    """O índice único recusa um dia já reivindicado, sem gravar a segunda solicitação."""
+    primeira = await criar_solicitacao(DISCORD_ID, _formulario("2025-04-10"))
+    assert primeira is not None
+    assert await criar_solicitacao(DISCORD_ID, _formulario("2025-04-09", "2025-04-10")) is None
+
+    linhas = await database.fetch_all(solicitacoes_horas_extras.select().where(
+        solicitacoes_horas_extras.c.solicitante_discord_id == DISCORD_ID
+    ))
+    assert len(linhas) == 1
+
+    # Depois de cancelada, o dia volta a poder ser solicitado
+    await cancelar_solicitacao(primeira, DISCORD_ID)
+    assert await criar_solicitacao(DISCORD_ID, _formulario("2025-04-10")) is not None
+
+
+@pytest.mark.asyncio
+async def test_iterar_solicitacoes_aprovadas_filtra_pelo_periodo_e_ordena_por_nome():
+    """Só entram as aprovadas com algum dia no período, na ordem do nome do colaborador."""
+    def formulario(nome: str, *datas: str) -> dict:
+        return {**_formulario(*datas), "dados_colaborador": {"nome": nome}}
+
+    bruno = await criar_solicitacao(DISCORD_ID, formulario("Bruno", "2025-06-30", "2025-07-01"))
+    ana = await criar_solicitacao(DISCORD_ID, formulario("Ana", "2025-07-15"))
+    fora_do_periodo = await criar_solicitacao(DISCORD_ID, formulario("Ana", "2025-08-01"))
+    pendente = await criar_solicitacao(DISCORD_ID, formulario("Carla", "2025-07-20"))
+    for solicitacao_id in (bruno, ana, fora_do_periodo):
+        await atualizar_status_solicitacao(solicitacao_id, 'APROVADO', 1)
+
+    ids = [s["id"] async for s in iterar_solicitacoes_aprovadas(date(2025, 7, 1), date(2025, 7, 31))]
+
+    assert ids == [ana, bruno]
+    assert pendente not in ids
+
+
+@pytest.mark.asyncio
+async def test_aprovacao_grava_status_pdf_e_email_juntos(monkeypatch):
+    """A aprovação vincula o PDF assinado e grava o e-mail; se o e-mail não puder ser gravado, nada muda."""
+    from database.models import email_outbox
+    from services import email_service
+    from services.email_service import caixa_saida_email
+    from views.rh_view import aprovar_solicitacao
+
+    monkeypatch.setattr(caixa_saida_email, "disparar", lambda: None)
+    formulario = {**_formulario("2025-05-02"), "dados_colaborador": {"nome": "Teste Aprovação"}, "justificativa": "Fechamento"}
+    assunto = "Solicitação de Horas Extras - Teste Aprovação"
+    await database.execute(email_outbox.delete().where(email_outbox.c.assunto == assunto))
+
+    async def situacao(solicitacao_id):
+        linha = await database.fetch_one(solicitacoes_horas_extras.select().where(solicitacoes_horas_extras.c.id == solicitacao_id))
+        emails = await database.fetch_all(email_outbox.select().where(email_outbox.c.assunto == assunto))
+        return linha["status"], linha["pdf_assinado_hash"], [email["anexo_pdf_hash"] for email in emails]
+
+    try:
+        solicitacao_id = await criar_solicitacao(DISCORD_ID, formulario)
+
+        monkeypatch.setattr(email_service, "EMAIL_RH_RECIPIENT", None)
+        with pytest.raises(RuntimeError):
+            await aprovar_solicitacao(solicitacao_id, 1, formulario, "a" * 64)
+        assert await situacao(solicitacao_id) == ('PENDENTE_APROVACAO_RESPONSAVEL', None, [])
+
+        monkeypatch.setattr(email_service, "EMAIL_RH_RECIPIENT", "rh@teste")
+        assert await aprovar_solicitacao(solicitacao_id, 1, formulario, "b" * 64) is True
+        # Um segundo clique não aprova de novo nem grava outro e-mail
+        assert await aprovar_solicitacao(solicitacao_id, 1, formulario, "c" * 64) is False
+        assert await situacao(solicitacao_id) == ('APROVADO', "b" * 64, ["b" * 64])
+    finally:
+        await database.execute(email_outbox.delete().where(email_outbox.c.assunto == assunto))
+
+
+@pytest.mark.asyncio
+async def test_reprovacao_distingue_falha_do_banco_de_decisao_anterior(monkeypatch):
+    """Se o status não muda e a solicitação continua pendente, a falha é propagada em vez de virar "já finalizada"."""
+    from views import rh_view
+
+    solicitacao_id = await criar_solicitacao(DISCORD_ID, _formulario("2025-05-05"))
+
+    async def banco_indisponivel(*args, **kwargs):
+        return False
+    with monkeypatch.context() as m:
+        m.setattr(rh_view, "atualizar_status_solicitacao", banco_indisponivel)
+        with pytest.raises(RuntimeError):
+            await rh_view.decidir_solicitacao(solicitacao_id, 'REPROVADO', 1)
+
+    assert await rh_view.decidir_solicitacao(solicitacao_id, 'REPROVADO', 1) is True
+    assert await rh_view.decidir_solicitacao(solicitacao_id, 'REPROVADO', 1) is False
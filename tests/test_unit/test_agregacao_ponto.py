@@ -0,0 +1,79 @@
+# tests/test_unit/test_agregacao_ponto.py
+from contextlib import contextmanager
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+# Sem o driver ODBC (libodbc), o pyodbc falha com ImportError
+portal_module = pytest.importorskip("services.portal_service", exc_type=ImportError)
+
+ID_DISCORD = 123456789
+
+# Batidas brutas de ponto_marcacao, na ordem do ORDER BY pm.data, pm.hora
+BATIDAS = {
+    date(2025, 3, 3): ["08:00", "12:00", "13:00", "19:00"],                   # 600 min: 120 extras
+    date(2025, 3, 4): ["08:00", "12:00", "13:00"],                            # ímpar: ignorado
+    date(2025, 3, 5): ["08:00", "12:00", "13:00", "17:00"],                   # jornada exata: sem extras
+    date(2025, 3, 6): ["07:30", "11:45", "12:30", "18:10", "19:00", "21:05"],  # 720 min: 240 extras
+    date(2025, 3, 7): ["09:05", "12:00", "13:00", "18:30"],                   # 505 min: 25 extras
+}
+
+# O que a consulta agregada (CTEs batidas/pares/dias) devolve para as mesmas batidas
+LINHAS_AGREGADAS = [
+    SimpleNamespace(data=date(2025, 3, 7), batidas_str="09:05 - 12:00 - 13:00 - 18:30", minutos_extras=25),
+    SimpleNamespace(data=date(2025, 3, 6), batidas_str="07:30 - 11:45 - 12:30 - 18:10 - 19:00 - 21:05", minutos_extras=240),
+    SimpleNamespace(data=date(2025, 3, 3), batidas_str="08:00 - 12:00 - 13:00 - 19:00", minutos_extras=120),
+]
+
+
+class _CursorFalso:
+    def __init__(self, consultas: list):
+        self.consultas = consultas
+        self.linhas = []
+
+    def execute(self, query, *parametros):
+        self.consultas.append(parametros)
+        if "WITH batidas" in query:
+            self.linhas = LINHAS_AGREGADAS
+        else:
+            self.linhas = [SimpleNamespace(data=data, hora=hora) for data, horas in BATIDAS.items() for hora in horas]
+
+    def fetchall(self):
+        return self.linhas
+
+
+class _PoolFalso:
+    """Responde às duas consultas de ponto sem o SQL Server."""
+
+    def __init__(self):
+        self.consultas = []
+
+    @contextmanager
+    def conexao(self):
+        yield SimpleNamespace(cursor=lambda: _CursorFalso(self.consultas))
+
+    def fechar(self):
+        pass
+
+
+@pytest.fixture
+def portal():
+    servico = portal_module.PortalDatabaseService()
+    servico.pool = _PoolFalso()
+    yield servico
+    servico.fechar()
+
+
+def test_linhas_agregadas_equivalem_ao_calculo_em_python(portal):
+    """As linhas no formato da agregação do SQL Server viram os mesmos dias que `calcular_horas_extras_lote`."""
+    inicio, fim = date(2025, 3, 1), date(2025, 3, 31)
+
+    referencia = portal.buscar_detalhes_ponto_periodo(ID_DISCORD, inicio, fim, agregar_no_servidor=False)
+    agregado = portal.buscar_detalhes_ponto_periodo(ID_DISCORD, inicio, fim, agregar_no_servidor=True)
+
+    assert agregado == referencia
+    assert [dia["data"] for dia in agregado] == [date(2025, 3, 7), date(2025, 3, 6), date(2025, 3, 3)]
+    # A jornada descontada no SQL é a mesma do cálculo em Python
+    jornada = portal_module.JORNADA_PADRAO_MINUTOS
+    assert portal.pool.consultas[-1] == (ID_DISCORD, "2025-03-01", "2025-03-31", jornada, jornada)
@@ -0,0 +1,136 @@
+# tests/test_unit/test_cache.py
+import asyncio
+import pytest
+from utils import cache as cache_module
+from utils.cache import CacheTTL, FRESCO, OBSOLETO, EXPIRADO, AUSENTE
+
+class Relogio:
+    """Substitui time.monotonic para controlar a passagem do tempo nos testes."""
+    def __init__(self):
+        self.agora = 1000.0
+    def __call__(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(cache_module.time, "monotonic", relogio)
+    return relogio
+
+def test_estados_ttl_e_janela_obsoleta(relogio):
+    """Uma chave passa de fresca a obsoleta e depois a expirada."""
+    cache = CacheTTL("teste", ttl=10, janela_obsoleta=20)
+    assert cache.consultar("a") == (AUSENTE, None)
+    cache.definir("a", 1)
+    assert cache.consultar("a") == (FRESCO, 1)
+    relogio.agora += 15
+    assert cache.consultar("a") == (OBSOLETO, 1)
+    relogio.agora += 20
+    assert cache.consultar("a") == (EXPIRADO, 1)
+    stats = cache.estatisticas()
+    assert (stats["hits"], stats["hits_obsoletos"], stats["misses"]) == (1, 1, 2)
+
+def test_cache_negativo_usa_ttl_proprio(relogio):
+    """Resultados None expiram com o TTL negativo e não têm janela obsoleta."""
+    cache = CacheTTL("teste", ttl=100, ttl_negativo=5, janela_obsoleta=100)
+    cache.definir("x", None)
+    assert cache.consultar("x") == (FRESCO, None)
+    relogio.agora += 6
+    assert cache.consultar("x")[0] == EXPIRADO
+    assert cache.estatisticas()["hits_negativos"] == 1
+
+def test_lru_remove_mais_antigo():
+    """Ao exceder o limite, a chave usada há mais tempo é descartada."""
+    cache = CacheTTL("teste", max_itens=2, ttl=60)
+    cache.definir("a", 1)
+    cache.definir("b", 2)
+    cache.consultar("a")
+    cache.definir("c", 3)
+    assert cache.consultar("b")[0] == AUSENTE
+    assert cache.consultar("a") == (FRESCO, 1)
+
+@pytest.mark.asyncio
+async def test_obter_agrupa_cargas_concorrentes():
+    """Chamadas simultâneas para a mesma chave executam o carregador uma única vez."""
+    cache = CacheTTL("teste", ttl=60)
+    chamadas = 0
+
+    async def carregador():
+        nonlocal chamadas
+        chamadas += 1
+        await asyncio.sleep(0.01)
+        return "valor"
+
+    resultados = await asyncio.gather(*(cache.obter("k", carregador) for _ in range(10)))
+    assert resultados == ["valor"] * 10
+    assert chamadas == 1
+
+@pytest.mark.asyncio
+async def test_recarregar_ignora_ttl_e_agrupa_com_cargas_em_andamento():
+    """Uma recarga forçada troca um valor ainda fresco e se junta a uma carga já em andamento."""
+    cache = CacheTTL("teste", ttl=60)
+    cache.definir("k", 0)
+    chamadas = 0
+
+    async def carregador():
+        nonlocal chamadas
+        chamadas += 1
+        await asyncio.sleep(0.01)
+        return chamadas
+
+    assert await cache.recarregar("k", carregador) == 1
+    assert await asyncio.gather(cache.recarregar("k", carregador), cache.recarregar("k", carregador)) == [2, 2]
+    assert cache.consultar("k") == (FRESCO, 2)
+
+@pytest.mark.asyncio
+async def test_obter_serve_obsoleto_e_recarrega_em_segundo_plano(relogio):
+    """Valores obsoletos voltam imediatamente e são atualizados em segundo plano."""
+    cache = CacheTTL("teste", ttl=10, janela_obsoleta=100)
+    cache.definir("k", "antigo")
+    relogio.agora += 20
+
+    async def carregador():
+        return "novo"
+
+    assert await cache.obter("k", carregador) == "antigo"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert cache.consultar("k") == (FRESCO, "novo")
+
+@pytest.mark.asyncio
+async def test_obter_usa_valor_expirado_quando_carga_falha(relogio):
+    """Se o carregador falhar, o último valor conhecido é devolvido."""
+    cache = CacheTTL("teste", ttl=10)
+    cache.definir("k", "ultimo")
+    relogio.agora += 50
+
+    async def carregador():
+        raise ConnectionError("banco fora do ar")
+
+    assert await cache.obter("k", carregador) == "ultimo"
+    with pytest.raises(ConnectionError):
+        await cache.obter("outra", carregador)
+
+@pytest.mark.asyncio
+async def test_carga_em_andamento_nao_regrava_chave_invalidada():
+    """Uma carga iniciada antes de invalidar/limpar não grava o valor antigo; a consulta seguinte carrega de novo."""
+    for descartar in (lambda cache: cache.invalidar("k"), lambda cache: cache.limpar()):
+        cache = CacheTTL("teste", ttl=60)
+        banco = {"k": "antigo"}
+        lendo, liberar = asyncio.Event(), asyncio.Event()
+
+        async def carregador():
+            valor = banco["k"]
+            lendo.set()
+            await liberar.wait()
+            return valor
+
+        carga = asyncio.create_task(cache.obter("k", carregador))
+        await lendo.wait()
+        banco["k"] = "novo"
+        descartar(cache)
+        liberar.set()
+
+        assert await carga == "antigo"
+        assert cache.consultar("k") == (AUSENTE, None)
+        assert await cache.obter("k", carregador) == "novo"
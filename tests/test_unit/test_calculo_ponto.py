@@ -0,0 +1,99 @@
+# tests/test_unit/test_calculo_ponto.py
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+from services.calculo_ponto import calcular_horas_extras_lote, horas_para_minutos, montar_relatorio_equipe
+
+
+def calculo_referencia(marcacoes):
+    """Regra original (laço por batida): pares entrada/saída, jornada de 8h, dias ímpares ignorados."""
+    por_dia = defaultdict(list)
+    for colaborador, dia, hora in marcacoes:
+        por_dia[(colaborador, dia)].append(datetime.strptime(hora, '%H:%M').time())
+
+    resultado = []
+    for (colaborador, dia), batidas in por_dia.items():
+        if len(batidas) % 2 != 0:
+            continue
+        total = timedelta()
+        for i in range(0, len(batidas), 2):
+            total += datetime.combine(dia, batidas[i + 1]) - datetime.combine(dia, batidas[i])
+        extras = total - timedelta(hours=8) if total > timedelta(hours=8) else timedelta(0)
+        if extras > timedelta(0):
+            resultado.append((colaborador, dia, " - ".join(t.strftime('%H:%M') for t in batidas), extras))
+    return sorted(resultado, key=lambda x: (x[0], -x[1].toordinal()))
+
+
+def test_horas_para_minutos():
+    """Strings 'HH:MM' (com ou sem zero à esquerda) viram minutos desde a meia-noite."""
+    assert list(horas_para_minutos(["00:00", "08:05", "7:30", "23:59"])) == [0, 485, 450, 1439]
+    assert len(horas_para_minutos([])) == 0
+
+
+def test_dia_simples_com_horas_extras():
+    """Um dia de 9h30 trabalhadas gera 1h30 de horas extras."""
+    dia = date(2025, 3, 10)
+    resultado = calcular_horas_extras_lote([dia] * 4, ["08:00", "12:00", "13:00", "18:30"])
+    assert resultado == [{
+        "colaborador": None,
+        "data": dia,
+        "batidas_str": "08:00 - 12:00 - 13:00 - 18:30",
+        "minutos_trabalhados": 570,
+        "horas_extras_timedelta": timedelta(hours=1, minutes=30),
+    }]
+
+
+def test_ignora_dias_impares_e_sem_extras():
+    """Dias com batidas ímpares ou sem horas extras não são retornados."""
+    d1, d2 = date(2025, 3, 10), date(2025, 3, 11)
+    datas = [d1, d1, d1, d2, d2]
+    horas = ["08:00", "12:00", "13:00", "08:00", "16:00"]
+    assert calcular_horas_extras_lote(datas, horas) == []
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_lote_igual_ao_calculo_referencia(semente):
+    """O cálculo vetorizado reproduz exatamente a regra original para vários colaboradores e dias."""
+    rng = random.Random(semente)
+    marcacoes = []
+    for colaborador in range(1, 30):
+        for deslocamento in range(40):
+            dia = date(2025, 1, 1) + timedelta(days=deslocamento)
+            quantidade = rng.choice([0, 2, 3, 4, 4, 4, 6])
+            minutos = sorted(rng.sample(range(6 * 60, 23 * 60), quantidade))
+            marcacoes.extend((colaborador, dia, f"{m // 60:02d}:{m % 60:02d}") for m in minutos)
+    rng.shuffle(marcacoes)
+    # As consultas entregam as batidas de cada dia em ordem cronológica
+    marcacoes.sort(key=lambda m: m[2])
+
+    resultado = calcular_horas_extras_lote(
+        datas=[m[1] for m in marcacoes],
+        horas=[m[2] for m in marcacoes],
+        colaboradores=[m[0] for m in marcacoes],
+    )
+    obtido = [(d["colaborador"], d["data"], d["batidas_str"], d["horas_extras_timedelta"]) for d in resultado]
+    assert obtido == calculo_referencia(marcacoes)
+
+
+def test_relatorio_equipe_separa_homonimos():
+    """Colaboradores com o mesmo nome têm totais e dias próprios, identificados pelo ID."""
+    membros = {
+        1: {"nome": "Ana Souza", "matricula": "001"},
+        2: {"nome": "Ana Souza", "matricula": "002"},
+        3: {"nome": "Bruno", "matricula": "003"},
+    }
+    dias = [
+        {"colaborador": 2, "data": date(2025, 3, 4), "horas_extras_timedelta": timedelta(hours=3)},
+        {"colaborador": 1, "data": date(2025, 3, 3), "horas_extras_timedelta": timedelta(hours=1)},
+        {"colaborador": 3, "data": date(2025, 3, 1), "horas_extras_timedelta": timedelta(hours=2)},
+        {"colaborador": 1, "data": date(2025, 3, 1), "horas_extras_timedelta": timedelta(hours=1)},
+    ]
+
+    relatorio = montar_relatorio_equipe(dias, membros)
+
+    assert [(linha["colaborador"], linha["matricula"], linha["dias"]) for linha in relatorio["membros"]] == [
+        (2, "002", 1), (1, "001", 2), (3, "003", 1)
+    ]
+    assert [(dia["colaborador"], dia["data"].day) for dia in relatorio["detalhes"]] == [(1, 1), (1, 3), (2, 4), (3, 1)]
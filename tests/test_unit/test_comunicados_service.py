@@ -0,0 +1,228 @@
+# tests/test_unit/test_comunicados_service.py
+import json
+import time
+import asyncio
+from datetime import datetime, time as horario
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+
+from services import comunicados_service
+from services.comunicados_service import (
+    PoliticaConsulta, PortalComunicados, SICOM_URL, _extrair_comunicados, espera_solicitada,
+)
+
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def _pagina(*titulos: str) -> str:
+    artigos = "".join(
+        f'<article class="post"><div class="post_text">'
+        f'<h2><a href="https://portal/{i}">{titulo}</a> <span class="date">0{i}/01/2025</span></h2>'
+        f'<p>Resumo do comunicado {i}.</p></div></article>'
+        for i, titulo in enumerate(titulos, start=1)
+    )
+    return f"<html><body>{artigos}</body></html>"
+
+
+class _Portal:
+    """Responde como o portal: 304 quando o ETag enviado confere com o da página atual."""
+
+    def __init__(self, html: str, etag: str = None):
+        self.html = html
+        self.etag = etag
+        self.requisicoes = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requisicoes.append(request)
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        cabecalhos = {"ETag": self.etag} if self.etag else {}
+        return httpx.Response(200, text=self.html, headers=cabecalhos)
+
+
+@pytest.mark.asyncio
+async def test_extrai_os_comunicados_mais_recentes():
+    portal = PortalComunicados(transport=httpx.MockTransport(_Portal(_pagina("Primeiro", "Segundo", "Terceiro"))), intervalo_requisicoes=0)
+    try:
+        comunicados = await portal.buscar(limit=2)
+    finally:
+        await portal.fechar()
+
+    assert comunicados == [
+        {"titulo_comunicado": "Primeiro", "data_comunicado": "01/01/2025", "resumo": "Resumo do comunicado 1.", "link": "https://portal/1"},
+        {"titulo_comunicado": "Segundo", "data_comunicado": "02/01/2025", "resumo": "Resumo do comunicado 2.", "link": "https://portal/2"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pagina_nao_modificada_nao_e_analisada_de_novo():
+    """Com ETag o portal responde 304; sem ETag, o hash do corpo identifica a página repetida."""
+    for etag in ('"v1"', None):
+        servidor = _Portal(_pagina("Primeiro", "Segundo"), etag=etag)
+        portal = PortalComunicados(transport=httpx.MockTransport(servidor), intervalo_requisicoes=0)
+        try:
+            primeira = await portal.buscar(limit=2)
+            segunda = await portal.buscar(limit=2)
+        finally:
+            await portal.fechar()
+
+        assert segunda == primeira
+        assert (portal.consultas, portal.nao_modificadas, portal.extracoes) == (2, 1, 1)
+        assert servidor.requisicoes[1].headers.get("If-None-Match") == etag
+        assert str(servidor.requisicoes[0].url) == SICOM_URL
+
+
+@pytest.mark.asyncio
+async def test_pagina_alterada_e_analisada_e_limite_maior_reaproveita_o_corpo():
+    servidor = _Portal(_pagina("Primeiro"), etag='"v1"')
+    portal = PortalComunicados(transport=httpx.MockTransport(servidor), intervalo_requisicoes=0)
+    try:
+        await portal.buscar(limit=1)
+        servidor.html, servidor.etag = _pagina("Novo", "Primeiro"), '"v2"'
+        assert [c["titulo_comunicado"] for c in await portal.buscar(limit=1)] == ["Novo"]
+        # Mesma página (304), mas com mais comunicados pedidos: analisa o corpo guardado
+        assert [c["titulo_comunicado"] for c in await portal.buscar(limit=5)] == ["Novo", "Primeiro"]
+    finally:
+        await portal.fechar()
+
+    assert (portal.consultas, portal.extracoes) == (3, 3)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 20])
+def test_extracao_da_pagina_salva_confere_com_a_referencia(limit):
+    """
+    comunicados_sicom.json guarda o resultado da análise da árvore completa da página (antes do
+    recorte): inclui artigo sem data, artigo sem título, artigo sem a classe "post" e um
+    "<article class=post>" dentro de um script.
+    """
+    html = (FIXTURES / "comunicados_sicom.html").read_text(encoding="utf-8")
+    referencia = json.loads((FIXTURES / "comunicados_sicom.json").read_text(encoding="utf-8"))
+
+    assert _extrair_comunicados(html, limit) == referencia[str(limit)]
+
+
+def test_artigos_em_comentarios_e_scripts_nao_contam_no_recorte():
+    falsos = '<!-- <article class="post">antigo</article> --><script>var s = \'<article class="post">\';</script>'
+    html = _pagina("Primeiro", "Segundo", "Terceiro").replace("<body>", f"<body>{falsos}")
+    html = html.replace('<article class="post"><div class="post_text"><h2><a href="https://portal/2"',
+                        f'{falsos}<article class="post"><div class="post_text"><h2><a href="https://portal/2"')
+
+    assert [c["titulo_comunicado"] for c in _extrair_comunicados(html, 2)] == ["Primeiro", "Segundo"]
+    assert _extrair_comunicados("<html><body><p>Página nova</p></body></html>", 2) is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_compartilhado_agrupa_consultas_e_e_renovado_pela_tarefa(monkeypatch):
+    """Vários /comunicados simultâneos fazem uma consulta; a tarefa agendada renova o snapshot antes do TTL."""
+    servidor = _Portal(_pagina("Primeiro"))
+    portal = PortalComunicados(transport=httpx.MockTransport(servidor), intervalo_requisicoes=0)
+    monkeypatch.setattr(comunicados_service, "portal_comunicados", portal)
+    comunicados_service.cache_comunicados.limpar()
+    try:
+        snapshots = await asyncio.gather(*(comunicados_service.obter_comunicados_recentes() for _ in range(10)))
+        assert len(servidor.requisicoes) == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+        servidor.html = _pagina("Novo", "Primeiro")
+        atualizado = await comunicados_service.atualizar_comunicados_recentes()
+        assert [c["titulo_comunicado"] for c in atualizado] == ["Novo", "Primeiro"]
+        assert await comunicados_service.obter_comunicados_recentes() is atualizado
+        assert len(servidor.requisicoes) == 2
+    finally:
+        comunicados_service.cache_comunicados.limpar()
+        await portal.fechar()
+
+
+def _politica() -> PoliticaConsulta:
+    return PoliticaConsulta(
+        intervalo_minimo=60, intervalo_maximo=300, intervalo_fora_expediente=3600, intervalo_erro_maximo=1800,
+        inicio_expediente=horario(8), fim_expediente=horario(18),
+    )
+
+
+def test_politica_espaca_consultas_sem_novidade_e_volta_ao_minimo():
+    politica = _politica()
+    quarta_as_10h = datetime(2025, 1, 8, 10, tzinfo=FUSO)
+
+    esperas = []
+    for _ in range(6):
+        politica.registrar_sem_novidade()
+        esperas.append(politica.proxima_espera(quarta_as_10h))
+    assert esperas == [90, 135, 202.5, 300, 300, 300]
+
+    politica.registrar_novidade()
+    assert politica.proxima_espera(quarta_as_10h) == 60
+
+
+def test_politica_fora_do_expediente_consulta_na_abertura():
+    politica = _politica()
+
+    assert politica.proxima_espera(datetime(2025, 1, 8, 7, 30, tzinfo=FUSO)) == 1800  # abre às 8h
+    assert politica.proxima_espera(datetime(2025, 1, 8, 19, tzinfo=FUSO)) == 3600
+    # Sexta às 17h59 ainda é expediente; sábado, não
+    assert politica.em_expediente(datetime(2025, 1, 10, 17, 59, tzinfo=FUSO))
+    assert not politica.em_expediente(datetime(2025, 1, 11, 10, tzinfo=FUSO))
+    # Nunca menos que o intervalo mínimo, mesmo a segundos da abertura
+    assert politica.proxima_espera(datetime(2025, 1, 8, 7, 59, 50, tzinfo=FUSO)) == 60
+
+
+def test_politica_dobra_a_espera_nos_erros_e_respeita_retry_after():
+    politica = _politica()
+    quarta_as_10h = datetime(2025, 1, 8, 10, tzinfo=FUSO)
+
+    esperas = []
+    for _ in range(6):
+        politica.registrar_erro()
+        esperas.append(politica.proxima_espera(quarta_as_10h))
+    assert esperas == [120, 240, 480, 960, 1800, 1800]
+
+    politica.registrar_novidade()
+    politica.registrar_erro(espera_solicitada=600)
+    assert politica.proxima_espera(quarta_as_10h) == 600
+    # Fora do expediente, o erro não antecipa a consulta
+    assert politica.proxima_espera(datetime(2025, 1, 8, 19, tzinfo=FUSO)) == 3600
+
+
+def test_espera_solicitada_le_o_retry_after():
+    def erro(status, cabecalhos):
+        resposta = httpx.Response(status, headers=cabecalhos, request=httpx.Request("GET", SICOM_URL))
+        return httpx.HTTPStatusError("erro", request=resposta.request, response=resposta)
+
+    assert espera_solicitada(erro(429, {"Retry-After": "120"})) == 120
+    assert espera_solicitada(erro(503, {})) is None
+    assert espera_solicitada(erro(500, {"Retry-After": "120"})) is None
+    assert espera_solicitada(httpx.ConnectTimeout("timeout")) is None
+
+
+@pytest.mark.asyncio
+async def test_paginacao_ate_a_ultima_pagina_com_intervalo_entre_requisicoes(monkeypatch):
+    paginas = {
+        SICOM_URL: _pagina("Primeiro", "Segundo"),
+        f"{SICOM_URL}page/2/": _pagina("Terceiro", "Quarto"),
+    }
+    inicios = []
+
+    def servidor(request: httpx.Request) -> httpx.Response:
+        inicios.append(time.monotonic())
+        html = paginas.get(str(request.url))
+        return httpx.Response(200, text=html) if html else httpx.Response(404)
+
+    portal = PortalComunicados(transport=httpx.MockTransport(servidor), intervalo_requisicoes=0.05)
+    monkeypatch.setattr(comunicados_service, "portal_comunicados", portal)
+    try:
+        await portal.buscar()
+        titulos = [
+            [c["titulo_comunicado"] for c in pagina]
+            async for pagina in comunicados_service.percorrer_paginas(paginas_maximas=5)
+        ]
+    finally:
+        await portal.fechar()
+
+    # A primeira página é a já obtida; a terceira (404) encerra a paginação
+    assert titulos == [["Primeiro", "Segundo"], ["Terceiro", "Quarto"]]
+    assert len(inicios) == 3
+    assert all(depois - antes >= 0.045 for antes, depois in zip(inicios, inicios[1:]))
@@ -0,0 +1,127 @@
+# tests/test_unit/test_email_service.py
+import smtplib
+import asyncio
+import threading
+import socketserver
+import pytest
+from email.mime.text import MIMEText
+
+from services.email_service import EntregaEmail
+
+
+class _ServidorSMTP(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo, em memória, que aceita qualquer mensagem e permite simular falhas."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SessaoSMTP)
+        self.mensagens = []
+        self.conexoes = 0
+        self.recusas = []  # respostas devolvidas, em ordem, aos próximos comandos MAIL
+        self.derrubar_apos_mensagem = False  # simula o servidor encerrando a conexão ociosa
+
+    def conectar(self) -> smtplib.SMTP:
+        return smtplib.SMTP(*self.server_address, timeout=5)
+
+
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linha: str):
+        self.wfile.write(f"{linha}\r\n".encode())
+
+    def handle(self):
+        self.server.conexoes += 1
+        self.responder("220 teste")
+        while True:
+            comando = self.rfile.readline().decode().strip()
+            verbo = comando.split(" ")[0].upper()
+            if not comando or verbo == "QUIT":
+                self.responder("221 tchau")
+                return
+            if verbo in ("EHLO", "HELO"):
+                self.responder("250 teste")
+            elif verbo == "MAIL" and self.server.recusas:
+                self.responder(self.server.recusas.pop(0))
+            elif verbo == "DATA":
+                self.responder("354 envie")
+                linhas = []
+                while (linha := self.rfile.readline()) != b".\r\n":
+                    linhas.append(linha)
+                self.server.mensagens.append(b"".join(linhas))
+                self.responder("250 aceito")
+                if self.server.derrubar_apos_mensagem:
+                    self.server.derrubar_apos_mensagem = False
+                    return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.responder("250 ok")
+
+
+@pytest.fixture
+def servidor():
+    servidor = _ServidorSMTP()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _mensagem(assunto: str) -> MIMEText:
+    mensagem = MIMEText("corpo")
+    mensagem["Subject"] = assunto
+    return mensagem
+
+
+@pytest.mark.asyncio
+async def test_mensagens_reutilizam_a_conexao(servidor):
+    """Várias mensagens são entregues por uma única conexão autenticada."""
+    entrega = EntregaEmail(conectar=servidor.conectar, remetente="bot@teste")
+    try:
+        for i in range(3):
+            await entrega.enviar(_mensagem(f"#{i}"), ["rh@teste"])
+    finally:
+        await entrega.fechar()
+
+    assert len(servidor.mensagens) == 3
+    assert servidor.conexoes == 1
+
+
+@pytest.mark.asyncio
+async def test_falha_descarta_a_conexao_e_propaga_o_erro(servidor):
+    """Uma recusa é repassada a quem enviou e a mensagem seguinte usa uma conexão nova."""
+    entrega = EntregaEmail(conectar=servidor.conectar, remetente="bot@teste")
+    try:
+        servidor.recusas = ["451 tente mais tarde"]
+        with pytest.raises(smtplib.SMTPSenderRefused) as erro:
+            await entrega.enviar(_mensagem("recusada"), ["rh@teste"])
+        assert erro.value.smtp_code == 451
+        await entrega.enviar(_mensagem("aceita"), ["rh@teste"])
+    finally:
+        await entrega.fechar()
+
+    assert len(servidor.mensagens) == 1
+    assert servidor.conexoes == 2
+    assert (entrega.enviados, entrega.falhas) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_conexao_encerrada_pelo_servidor_e_refeita_sem_erro(servidor):
+    """Se o servidor derrubou a conexão ociosa, a próxima mensagem reconecta na hora."""
+    entrega = EntregaEmail(conectar=servidor.conectar, remetente="bot@teste")
+    try:
+        servidor.derrubar_apos_mensagem = True
+        await entrega.enviar(_mensagem("primeira"), ["rh@teste"])
+        await asyncio.wait_for(entrega.enviar(_mensagem("segunda"), ["rh@teste"]), timeout=5)
+    finally:
+        await entrega.fechar()
+
+    assert len(servidor.mensagens) == 2
+    assert servidor.conexoes == 2
+    assert entrega.falhas == 0
+
+
+@pytest.mark.asyncio
+async def test_conexao_ociosa_e_encerrada(servidor):
+    entrega = EntregaEmail(conectar=servidor.conectar, remetente="bot@teste", conexao_ociosa=0)
+    await entrega.enviar(_mensagem("unica"), ["rh@teste"])
+    await entrega.encerrar_se_ociosa()
+    assert entrega._conexao is None
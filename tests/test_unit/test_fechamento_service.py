@@ -0,0 +1,93 @@
+# tests/test_unit/test_fechamento_service.py
+import pytest
+from datetime import date, datetime, timedelta
+from pypdf import PdfReader
+
+from services import fechamento_service, formulario_service
+from services.fechamento_service import FechamentoMensal
+from services.formulario_service import sanitizar_para_json
+from services.pdf_storage import ArmazenamentoPDF
+
+
+class _PoolLocal:
+    """Executa as renderizações no próprio processo, como o pool faria em um processo de trabalho."""
+
+    async def executar(self, funcao, *args):
+        return funcao(*args)
+
+
+def _solicitacao(solicitacao_id: int, solicitante: int, nome: str, *dias: date) -> dict:
+    formulario = {
+        "dados_colaborador": {"nome": nome, "nome_departamento": "TI", "nome_cargo": "Analista", "nome_responsavel": "Chefe"},
+        "detalhes_selecionados": [
+            {"data": dia, "batidas_str": "08:00 - 12:00 - 13:00 - 19:00", "horas_extras_timedelta": timedelta(hours=2)}
+            for dia in dias
+        ],
+        "justificativa": "Fechamento",
+        "atividades": "Conciliação",
+    }
+    return {
+        "id": solicitacao_id, "solicitante_discord_id": solicitante, "responsavel_discord_id": 99,
+        "dados_formulario": sanitizar_para_json(formulario), "pdf_assinado_hash": None,
+        "data_decisao": datetime(2025, 4, 1, 9), "responsavel_nome": "Chefe",
+    }
+
+
+@pytest.fixture
+def fechamento(monkeypatch, tmp_path):
+    armazenamento = ArmazenamentoPDF(str(tmp_path))
+    monkeypatch.setattr(fechamento_service, "armazenamento_pdf", armazenamento)
+    monkeypatch.setattr(formulario_service, "armazenamento_pdf", armazenamento)
+    monkeypatch.setattr(fechamento_service, "pool_pdf", _PoolLocal())
+    vinculados = {}
+
+    async def registrar_pdf_solicitacao(solicitacao_id, pdf_hash, assinado=False):
+        vinculados[solicitacao_id] = pdf_hash
+        return True
+
+    monkeypatch.setattr(fechamento_service, "registrar_pdf_solicitacao", registrar_pdf_solicitacao)
+
+    def com_solicitacoes(*solicitacoes):
+        async def iterar_solicitacoes_aprovadas(data_inicio, data_fim):
+            for solicitacao in solicitacoes:
+                yield solicitacao
+
+        monkeypatch.setattr(fechamento_service, "iterar_solicitacoes_aprovadas", iterar_solicitacoes_aprovadas)
+        return FechamentoMensal(renderizacoes_simultaneas=2)
+
+    return armazenamento, vinculados, com_solicitacoes
+
+
+@pytest.mark.asyncio
+async def test_fechamento_separa_homonimos_e_conta_so_os_dias_do_periodo(fechamento):
+    """Cada solicitante tem seção e totais próprios, mesmo com o mesmo nome; dias fora do mês não contam."""
+    armazenamento, vinculados, com_solicitacoes = fechamento
+    gerador = com_solicitacoes(
+        _solicitacao(1, 10, "Ana Souza", date(2025, 3, 3), date(2025, 2, 28)),
+        _solicitacao(2, 10, "Ana Souza", date(2025, 3, 10)),
+        _solicitacao(3, 20, "Ana Souza", date(2025, 3, 4)),
+    )
+
+    resultado = await gerador.gerar(date(2025, 3, 1), date(2025, 3, 31))
+
+    assert resultado["solicitacoes"] == 3
+    assert [(c["nome"], c["solicitacoes"], c["dias"], c["total_horas_extras"]) for c in resultado["colaboradores"]] == [
+        ("Ana Souza", 2, 2, timedelta(hours=4)),
+        ("Ana Souza", 1, 1, timedelta(hours=2)),
+    ]
+    # Os PDFs assinados ausentes foram gerados e vinculados às solicitações
+    assert set(vinculados) == {1, 2, 3}
+
+    leitor = PdfReader(armazenamento.caminho(resultado["pdf_hash"]))
+    titulos = [item.title if not isinstance(item, list) else [filho.title for filho in item] for item in leitor.outline]
+    assert titulos == [
+        "Totais do período",
+        "Ana Souza", ["Solicitação #1", "Solicitação #2"],
+        "Ana Souza", ["Solicitação #3"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fechamento_sem_solicitacoes_retorna_none(fechamento):
+    _, _, com_solicitacoes = fechamento
+    assert await com_solicitacoes().gerar(date(2025, 3, 1), date(2025, 3, 31)) is None
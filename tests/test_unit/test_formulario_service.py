@@ -0,0 +1,16 @@
+# tests/test_unit/test_formulario_service.py
+from datetime import date, timedelta
+
+from services.formulario_service import sanitizar_para_json, reidratar_formulario
+
+
+def test_reidratar_formulario_desfaz_sanitizacao():
+    """Verifica se o formulário lido do banco volta a ter datas e timedeltas, como na sessão original."""
+    original = {
+        "dados_colaborador": {"nome": "Fulano", "id_discord": 1},
+        "detalhes_selecionados": [
+            {"data": date(2025, 3, 2), "batidas_str": "08:00 - 18:00", "horas_extras_timedelta": timedelta(hours=2, minutes=5)}
+        ],
+        "justificativa": "Fechamento",
+    }
+    assert reidratar_formulario(sanitizar_para_json(original)) == original
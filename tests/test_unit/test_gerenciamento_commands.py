@@ -0,0 +1,25 @@
+# tests/test_unit/test_gerenciamento_commands.py
+import pytest
+
+from cogs.gerenciamento_commands import nome_corporativo
+
+
+class _PortalFalso:
+    """Responde à busca do perfil com `perfil` ou, com `erro`, falha como o SQL Server fora do ar."""
+
+    def __init__(self, perfil=None, erro: Exception = None):
+        self.perfil = perfil
+        self.erro = erro
+
+    async def buscar_dados_colaborador_por_discord_id_async(self, discord_id: int):
+        if self.erro is not None:
+            raise self.erro
+        return self.perfil
+
+
+@pytest.mark.asyncio
+async def test_nome_corporativo_e_opcional():
+    """O responsável é definido mesmo sem cadastro no portal ou com o portal indisponível."""
+    assert await nome_corporativo(_PortalFalso({"nome": "Fulana"}), 1) == "Fulana"
+    assert await nome_corporativo(_PortalFalso(None), 1) is None
+    assert await nome_corporativo(_PortalFalso(erro=ConnectionError("SQL Server fora do ar")), 1) is None
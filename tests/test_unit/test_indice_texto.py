@@ -0,0 +1,43 @@
+# tests/test_unit/test_indice_texto.py
+import pytest
+from utils.indice_texto import IndiceTexto, normalizar_texto
+
+EQUIPES = [
+    {"id": 1, "descricao": "Contabilidade Pública"},
+    {"id": 2, "descricao": "Desenvolvimento"},
+    {"id": 3, "descricao": "Gestão de Pessoas"},
+    {"id": 4, "descricao": "Suporte ao Desenvolvedor"},
+    {"id": 5, "descricao": "Públicas e Licitações"},
+]
+
+indice = IndiceTexto(EQUIPES, campos=("descricao",))
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("São Paulo", "sao paulo"),
+    ("  GESTÃO   de  Pessoas ", "gestao de pessoas"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalizar_texto(texto, esperado):
+    """Verifica se acentos, caixa e espaços extras são removidos."""
+    assert normalizar_texto(texto) == esperado
+
+def test_busca_ignora_acentos_e_caixa():
+    """Termos com ou sem acento devem encontrar os mesmos itens."""
+    assert [e["id"] for e in indice.buscar("GESTAO")] == [3]
+    assert [e["id"] for e in indice.buscar("públi")] == [5, 1]
+
+def test_ranking_prefixo_antes_de_substring():
+    """Prefixo do texto vem antes de prefixo de palavra, que vem antes de substring."""
+    assert [e["id"] for e in indice.buscar("desenvolv")] == [2, 4]
+    assert [e["id"] for e in indice.buscar("volv")] == [2, 4]
+
+def test_termo_curto_e_vazio():
+    """Termos menores que o n-grama usam varredura completa; termo vazio retorna tudo."""
+    assert [e["id"] for e in indice.buscar("de")] == [2, 3, 4, 1]
+    assert len(indice.buscar("")) == len(EQUIPES)
+    assert len(indice.buscar("", limite=2)) == 2
+
+def test_sem_correspondencia():
+    """Termos que não existem retornam lista vazia."""
+    assert indice.buscar("financeiro") == []
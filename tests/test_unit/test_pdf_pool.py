@@ -0,0 +1,67 @@
+# tests/test_unit/test_pdf_pool.py
+import io
+import os
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from pypdf import PdfReader
+
+from services.pdf_pool import PoolRenderizacaoPDF
+from services.pdf_service import gerar_pdf_horas_extras
+
+
+def _dados_formulario() -> dict:
+    return {
+        "dados_colaborador": {"nome": "Fulano de Tal"},
+        "detalhes_selecionados": [
+            {"data": date(2025, 3, 3), "batidas_str": "08:00 - 12:00 - 13:00 - 19:00", "horas_extras_timedelta": timedelta(hours=2)}
+        ],
+        "justificativa": "Fechamento",
+        "atividades": "Conciliação",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pool_renderiza_em_outro_processo_e_registra_metricas():
+    """A renderização roda nos processos do pool e os contadores refletem as tarefas concluídas."""
+    pool = PoolRenderizacaoPDF(processos=2, fila_maxima=1)
+    try:
+        await pool.iniciar()
+        resultados = [await pool.executar(gerar_pdf_horas_extras, _dados_formulario()) for _ in range(3)]
+    finally:
+        pool.fechar()
+
+    assert all(len(PdfReader(io.BytesIO(pdf.getvalue())).pages) == 1 for pdf in resultados)
+    estatisticas = pool.estatisticas()
+    assert estatisticas["concluidas"] == 3
+    assert estatisticas["pendentes"] == 0
+    assert estatisticas["tempo_maximo_renderizacao"] > 0
+    assert not pool.ativo
+
+
+@pytest.mark.asyncio
+async def test_pool_propaga_excecoes_da_tarefa():
+    """Erros levantados no processo de trabalho chegam ao chamador e contam como falha."""
+    pool = PoolRenderizacaoPDF(processos=1)
+    try:
+        with pytest.raises(ValueError):
+            await pool.executar(int, "não é um número")
+    finally:
+        pool.fechar()
+
+    assert pool.estatisticas()["falhas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_e_recriado_quando_um_processo_morre():
+    """Um processo encerrado abruptamente falha a tarefa em andamento, mas não as renderizações seguintes."""
+    pool = PoolRenderizacaoPDF(processos=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await pool.executar(os._exit, 1)
+        pdf = await pool.executar(gerar_pdf_horas_extras, _dados_formulario())
+    finally:
+        pool.fechar()
+
+    assert len(PdfReader(io.BytesIO(pdf.getvalue())).pages) == 1
+    assert pool.estatisticas()["recriacoes"] == 1
@@ -0,0 +1,158 @@
+# tests/test_unit/test_pdf_service.py
+import io
+import os
+import pytest
+from datetime import date, timedelta
+from pypdf import PdfReader
+
+from services.pdf_service import (
+    gerar_pdf_horas_extras, carimbar_aprovacao, gerar_pdf_relatorio_equipe, gerar_pdf_totais_fechamento,
+    consolidar_pdfs, PERFIL_COMPACTO, PERFIL_ORIGINAL
+)
+
+DADOS_APROVADOR = {"nome": "Responsável Silva", "id_discord": 1234567890, "data_hora": "02/03/2025 às 10:00:00"}
+
+
+def _dados_formulario(quantidade_dias: int) -> dict:
+    return {
+        "dados_colaborador": {"nome": "Fulano de Tal", "nome_departamento": "TI", "nome_cargo": "Analista", "nome_responsavel": "Responsável Silva"},
+        "detalhes_selecionados": [
+            {"data": date(2025, 3, 1) + timedelta(days=i), "batidas_str": "08:00 - 12:00 - 13:00 - 19:00", "horas_extras_timedelta": timedelta(hours=2)}
+            for i in range(quantidade_dias)
+        ],
+        "justificativa": "Fechamento do mês",
+        "atividades": "Conciliação",
+    }
+
+
+def _textos_posicionados(pdf_bytes: bytes) -> list:
+    """Extrai (página, texto, x, y) de cada trecho de texto do documento."""
+    trechos = []
+    for numero, pagina in enumerate(PdfReader(io.BytesIO(pdf_bytes)).pages):
+        def visitante(texto, cm, tm, font_dict, font_size, numero=numero):
+            if texto.strip():
+                trechos.append((numero, texto.strip(), round(tm[4] * cm[0] + cm[4], 1), round(tm[5] * cm[3] + cm[5], 1)))
+        pagina.extract_text(visitor_text=visitante)
+    return trechos
+
+
+@pytest.mark.parametrize("quantidade_dias", [1, 25])
+def test_carimbo_equivale_a_geracao_completa(quantidade_dias):
+    """O PDF carimbado tem os mesmos textos, nas mesmas posições e páginas, que o gerado já com a aprovação."""
+    dados = _dados_formulario(quantidade_dias)
+    original = gerar_pdf_horas_extras(dados)
+
+    carimbado = carimbar_aprovacao(original, DADOS_APROVADOR).getvalue()
+    completo = gerar_pdf_horas_extras({**dados, "dados_aprovador": DADOS_APROVADOR}).getvalue()
+
+    assert len(PdfReader(io.BytesIO(carimbado)).pages) == len(PdfReader(io.BytesIO(completo)).pages)
+    assert _textos_posicionados(carimbado) == _textos_posicionados(completo)
+    assert any("Aprovado Digitalmente" in trecho[1] for trecho in _textos_posicionados(carimbado))
+
+
+def test_documento_assinado_nao_pode_ser_carimbado_novamente():
+    """Sem a reserva nas keywords (documento já assinado ou de outro tipo), o carimbo é recusado."""
+    carimbado = carimbar_aprovacao(gerar_pdf_horas_extras(_dados_formulario(1)), DADOS_APROVADOR)
+    with pytest.raises(ValueError):
+        carimbar_aprovacao(carimbado, DADOS_APROVADOR)
+
+    relatorio = gerar_pdf_relatorio_equipe({
+        "nome_equipe": "Equipe", "data_inicio": date(2025, 3, 1), "data_fim": date(2025, 3, 31),
+        "membros": [], "detalhes": [],
+    })
+    with pytest.raises(ValueError):
+        carimbar_aprovacao(relatorio, DADOS_APROVADOR)
+
+
+def test_assinatura_que_nao_cabe_na_reserva_e_recusada():
+    """Um nome longo demais quebraria linha e ultrapassaria o espaço reservado."""
+    original = gerar_pdf_horas_extras(_dados_formulario(1))
+    with pytest.raises(ValueError):
+        carimbar_aprovacao(original, {**DADOS_APROVADOR, "nome": "Nome Muito Longo " * 6})
+
+
+
+def _imagens(pdf: io.BytesIO) -> list:
+    pagina = PdfReader(pdf).pages[0]
+    return sorted((imagem.image.size, imagem.data) for imagem in pagina.images)
+
+
+def test_imagens_do_modelo_sao_reaproveitadas_entre_documentos():
+    """Documentos gerados em sequência embutem o logo e o rodapé (com a máscara de transparência) completos."""
+    imagens = [_imagens(gerar_pdf_horas_extras(_dados_formulario(1), perfil=PERFIL_ORIGINAL)) for _ in range(2)]
+
+    assert [tamanho for tamanho, _ in imagens[0]] == [(599, 392), (1660, 88)]
+    assert imagens[0] == imagens[1]
+
+
+def test_perfil_compacto_reduz_imagens_e_documento():
+    """O perfil compacto embute as imagens na resolução de impressão e gera um arquivo bem menor."""
+    original = gerar_pdf_horas_extras(_dados_formulario(5), perfil=PERFIL_ORIGINAL)
+    compacto = gerar_pdf_horas_extras(_dados_formulario(5), perfil=PERFIL_COMPACTO)
+
+    assert [tamanho for tamanho, _ in _imagens(compacto)] == [(296, 194), (591, 31)]
+    assert compacto.getbuffer().nbytes < original.getbuffer().nbytes * 0.7
+    assert _textos_posicionados(compacto.getvalue()) == _textos_posicionados(original.getvalue())
+
+
+def test_imagens_sao_compartilhadas_entre_paginas():
+    """Em um documento com várias páginas, todas referenciam os mesmos XObjects de imagem."""
+    leitor = PdfReader(gerar_pdf_horas_extras(_dados_formulario(60), perfil=PERFIL_COMPACTO))
+    assert len(leitor.pages) > 1
+
+    referencias = {
+        tuple(sorted((nome, ref.idnum) for nome, ref in pagina["/Resources"]["/XObject"].items()))
+        for pagina in leitor.pages
+    }
+    assert len(referencias) == 1
+
+
+def test_consolidar_pdfs_com_marcadores_e_imagens_unificadas(tmp_path):
+    """O consolidado tem a capa, um marcador por seção com os documentos e um único logo para todas as páginas."""
+    secoes = []
+    for nome, quantidade in (("Ana", 2), ("Bruno", 1)):
+        documentos = []
+        for indice in range(quantidade):
+            caminho = tmp_path / f"{nome}_{indice}.pdf"
+            caminho.write_bytes(gerar_pdf_horas_extras(_dados_formulario(2)).getvalue())
+            documentos.append({"titulo": f"Solicitação #{indice}", "caminho": str(caminho)})
+        secoes.append({"titulo": nome, "documentos": documentos})
+    capa = gerar_pdf_totais_fechamento({
+        "data_inicio": date(2025, 3, 1), "data_fim": date(2025, 3, 31),
+        "colaboradores": [{"nome": "Ana", "solicitacoes": 2, "dias": 4, "total_horas_extras": timedelta(hours=8)}],
+    })
+
+    destino = tmp_path / "consolidado.pdf"
+    assert consolidar_pdfs(destino, capa, "Totais do período", secoes) == 4
+
+    leitor = PdfReader(destino)
+    titulos = [item.title if not isinstance(item, list) else [filho.title for filho in item] for item in leitor.outline]
+    assert titulos == ["Totais do período", "Ana", ["Solicitação #0", "Solicitação #1"], "Bruno", ["Solicitação #0"]]
+    assert [leitor.get_destination_page_number(item) for item in leitor.outline if not isinstance(item, list)] == [0, 1, 3]
+    assert "Totais por Colaborador" in leitor.pages[0].extract_text()
+    assert "08:00" in leitor.pages[1].extract_text()
+
+    logos = {ref.idnum for pagina in leitor.pages[1:] for ref in pagina["/Resources"]["/XObject"].values()}
+    assert len(logos) == 2  # logo e rodapé, compartilhados pelos três documentos
+
+
+def test_relatorio_equipe_escapa_textos_e_separa_homonimos():
+    """Nomes com & e < não quebram o ReportLab, e homônimos têm tabelas de detalhamento próprias."""
+    def dia(colaborador, nome, dia_do_mes):
+        return {"colaborador": colaborador, "nome": nome, "data": date(2025, 3, dia_do_mes),
+                "batidas_str": "08:00 - 12:00 - 13:00 - 19:00", "horas_extras_timedelta": timedelta(hours=2)}
+
+    pdf = gerar_pdf_relatorio_equipe({
+        "nome_equipe": "P&D <Inovação>",
+        "data_inicio": date(2025, 3, 1), "data_fim": date(2025, 3, 31),
+        "membros": [
+            {"colaborador": 1, "nome": "Ana & Cia", "matricula": "001", "dias": 1, "total_horas_extras": timedelta(hours=2)},
+            {"colaborador": 2, "nome": "Ana & Cia", "matricula": "002", "dias": 1, "total_horas_extras": timedelta(hours=2)},
+        ],
+        "detalhes": [dia(1, "Ana & Cia", 3), dia(2, "Ana & Cia", 4)],
+    }).getvalue()
+
+    texto = "".join(pagina.extract_text() for pagina in PdfReader(io.BytesIO(pdf)).pages)
+    assert "P&D <Inovação>" in texto
+    # Duas linhas no resumo e um título de detalhamento para cada colaborador
+    assert texto.count("Ana & Cia") == 4
@@ -0,0 +1,52 @@
+# tests/test_unit/test_pdf_storage.py
+import hashlib
+
+from services.pdf_storage import ArmazenamentoPDF
+
+PDF = b"%PDF-1.4\n% documento de teste\n%%EOF\n"
+
+
+def test_salvar_retorna_hash_do_conteudo(tmp_path):
+    """O documento é gravado sob o SHA-256 do seu conteúdo, em um subdiretório com o prefixo do hash."""
+    armazenamento = ArmazenamentoPDF(tmp_path)
+    pdf_hash = armazenamento.salvar(PDF)
+
+    assert pdf_hash == hashlib.sha256(PDF).hexdigest()
+    assert armazenamento.caminho(pdf_hash) == tmp_path / pdf_hash[:2] / f"{pdf_hash}.pdf"
+    assert armazenamento.caminho(pdf_hash).read_bytes() == PDF
+
+
+def test_salvar_o_mesmo_conteudo_nao_regrava(tmp_path):
+    """Conteúdo repetido reaproveita o arquivo existente e não deixa temporários para trás."""
+    armazenamento = ArmazenamentoPDF(tmp_path)
+    pdf_hash = armazenamento.salvar(PDF)
+    modificado_em = armazenamento.caminho(pdf_hash).stat().st_mtime_ns
+
+    assert armazenamento.salvar(memoryview(PDF)) == pdf_hash
+    assert armazenamento.caminho(pdf_hash).stat().st_mtime_ns == modificado_em
+    assert [p.name for p in (tmp_path / pdf_hash[:2]).iterdir()] == [f"{pdf_hash}.pdf"]
+
+
+def test_mapear_le_o_documento_como_arquivo(tmp_path):
+    """O mapeamento em memória aceita read/seek, como o fluxo de e-mail espera de um stream."""
+    armazenamento = ArmazenamentoPDF(tmp_path)
+    pdf_hash = armazenamento.salvar(PDF)
+
+    assert not armazenamento.existe("0" * 64)
+    with armazenamento.mapear(pdf_hash) as pdf:
+        pdf.seek(0)
+        assert pdf.read() == PDF
+        assert pdf[:8] == b"%PDF-1.4"
+
+
+def test_importar_move_o_temporario_para_o_armazenamento(tmp_path):
+    """Um documento gravado direto em disco entra no armazenamento sob o seu hash, sem deixar o temporário."""
+    armazenamento = ArmazenamentoPDF(tmp_path)
+    temporario = armazenamento.criar_temporario()
+    temporario.write_bytes(PDF)
+
+    pdf_hash = armazenamento.importar(temporario)
+
+    assert pdf_hash == hashlib.sha256(PDF).hexdigest()
+    assert armazenamento.caminho(pdf_hash).read_bytes() == PDF
+    assert not temporario.exists()
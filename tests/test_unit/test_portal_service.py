@@ -0,0 +1,61 @@
+# tests/test_unit/test_portal_service.py
+import pytest
+
+# Sem o driver ODBC (libodbc), o pyodbc falha com ImportError
+portal_module = pytest.importorskip("services.portal_service", exc_type=ImportError)
+
+COLABORADOR = 10
+RESPONSAVEL = 20
+
+
+@pytest.fixture
+def portal(monkeypatch):
+    """Serviço com o banco corporativo e o banco do bot substituídos por dicionários."""
+    servico = portal_module.PortalDatabaseService()
+    servico.perfis = {COLABORADOR: {"id_discord": COLABORADOR, "nome": "Fulano", "id_equipe": 1}}
+    servico.indisponivel = False
+    servico.nomes_registrados = []
+
+    async def carregar_perfis(ids_discord):
+        if servico.indisponivel:
+            raise ConnectionError("SQL Server fora do ar")
+        return {i: dict(servico.perfis[i]) for i in ids_discord if i in servico.perfis}
+
+    async def buscar_responsaveis(ids_equipes):
+        return {1: {"responsavel_discord_id": RESPONSAVEL, "responsavel_nome": "Chefe Antigo"}}
+
+    async def registrar_nome(id_discord, nome):
+        servico.nomes_registrados.append((id_discord, nome))
+        return True
+
+    monkeypatch.setattr(servico, "_carregar_perfis", carregar_perfis)
+    monkeypatch.setattr(portal_module, "buscar_responsaveis_por_equipes", buscar_responsaveis)
+    monkeypatch.setattr(portal_module, "registrar_nome_responsavel", registrar_nome)
+    yield servico
+    servico.fechar()
+
+
+@pytest.mark.asyncio
+async def test_nome_do_responsavel_acompanha_o_portal(portal):
+    """Renomeado, o nome novo aparece e é gravado; desligado, volta a "Não definido" em vez do nome gravado."""
+    portal.perfis[RESPONSAVEL] = {"id_discord": RESPONSAVEL, "nome": "Chefe Novo", "id_equipe": 2}
+    dados = await portal.buscar_dados_completos_colaborador(COLABORADOR)
+    assert dados["nome_responsavel"] == "Chefe Novo"
+    assert portal.nomes_registrados == [(RESPONSAVEL, "Chefe Novo")]
+
+    del portal.perfis[RESPONSAVEL]
+    portal.cache_perfis.limpar()
+    dados = await portal.buscar_dados_completos_colaborador(COLABORADOR)
+    assert dados["nome_responsavel"] == "Não definido"
+    assert dados["responsavel_id_discord"] is None
+
+
+@pytest.mark.asyncio
+async def test_nome_gravado_e_usado_com_o_portal_indisponivel(portal):
+    """Com o colaborador em cache e o portal fora do ar, o nome gravado do responsável é usado."""
+    await portal.buscar_dados_completos_colaborador(COLABORADOR)
+    portal.indisponivel = True
+    portal.cache_perfis.invalidar(RESPONSAVEL)
+
+    dados = await portal.buscar_dados_completos_colaborador(COLABORADOR)
+    assert dados["nome_responsavel"] == "Chefe Antigo"
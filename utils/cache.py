@@ -0,0 +1,198 @@
+# utils/cache.py
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estados possíveis de uma chave consultada no cache
+FRESCO = "fresco"        # dentro do TTL
+OBSOLETO = "obsoleto"    # TTL vencido, mas ainda pode ser servido enquanto é recarregado
+EXPIRADO = "expirado"    # fora da janela de obsolescência; só serve como último recurso
+AUSENTE = "ausente"
+
+
+class CacheTTL:
+    """
+    Cache LRU em memória com TTL, cache negativo (valores None) e stale-while-revalidate.
+    Cargas concorrentes da mesma chave são agrupadas em uma única chamada ao carregador. Uma
+    carga que estava em andamento quando a chave foi invalidada não grava o seu resultado.
+    """
+
+    def __init__(self, nome: str, max_itens: int = 1024, ttl: float = 300,
+                 ttl_negativo: Optional[float] = None, janela_obsoleta: float = 0):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.ttl_negativo = ttl if ttl_negativo is None else ttl_negativo
+        self.janela_obsoleta = janela_obsoleta
+        # chave -> (valor, expira_em, obsoleto_ate)
+        self._itens: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._carregando: Dict[Hashable, asyncio.Future] = {}
+        self._recarregando: set = set()
+        self._tarefas: set = set()
+        # Gerações incrementadas por invalidar/limpar: cargas iniciadas antes descartam o resultado
+        self._geracoes: Dict[Hashable, int] = {}
+        self._geracao_global = 0
+        self.hits = 0
+        self.hits_negativos = 0
+        self.hits_obsoletos = 0
+        self.misses = 0
+        self.falhas_recarga = 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def consultar(self, chave: Hashable) -> Tuple[str, Any]:
+        """Retorna (estado, valor) de uma chave, atualizando os contadores."""
+        entrada = self._itens.get(chave)
+        if entrada is None:
+            self.misses += 1
+            return AUSENTE, None
+
+        valor, expira_em, obsoleto_ate = entrada
+        agora = time.monotonic()
+        if agora < expira_em:
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            if valor is None:
+                self.hits_negativos += 1
+            return FRESCO, valor
+        if agora < obsoleto_ate:
+            self._itens.move_to_end(chave)
+            self.hits_obsoletos += 1
+            return OBSOLETO, valor
+
+        self.misses += 1
+        return EXPIRADO, valor
+
+    def definir(self, chave: Hashable, valor: Any):
+        """Grava um valor; None é tratado como resultado negativo, com TTL próprio e sem janela obsoleta."""
+        agora = time.monotonic()
+        if valor is None:
+            expira_em = obsoleto_ate = agora + self.ttl_negativo
+        else:
+            expira_em = agora + self.ttl
+            obsoleto_ate = expira_em + self.janela_obsoleta
+
+        self._itens[chave] = (valor, expira_em, obsoleto_ate)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def invalidar(self, chave: Hashable):
+        """Remove uma chave do cache; a carga em andamento dela, se houver, não é mais aproveitada."""
+        self._itens.pop(chave, None)
+        self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+        self._carregando.pop(chave, None)
+
+    def limpar(self):
+        """Remove todas as chaves do cache, descartando também as cargas em andamento."""
+        self._itens.clear()
+        self._geracoes.clear()
+        self._geracao_global += 1
+        self._carregando.clear()
+
+    def _geracao(self, chave: Hashable) -> Tuple[int, int]:
+        return self._geracao_global, self._geracoes.get(chave, 0)
+
+    def _definir_se_atual(self, chave: Hashable, valor: Any, geracao: Tuple[int, int]):
+        """Grava o resultado de uma carga, a menos que a chave tenha sido invalidada depois que ela começou."""
+        if self._geracao(chave) == geracao:
+            self.definir(chave, valor)
+        else:
+            logger.debug(f"Carga de '{chave}' no cache '{self.nome}' descartada: a chave foi invalidada durante a carga.")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de uso do cache."""
+        consultas = self.hits + self.hits_obsoletos + self.misses
+        return {
+            "nome": self.nome,
+            "itens": len(self._itens),
+            "hits": self.hits,
+            "hits_negativos": self.hits_negativos,
+            "hits_obsoletos": self.hits_obsoletos,
+            "misses": self.misses,
+            "falhas_recarga": self.falhas_recarga,
+            "taxa_acerto": (self.hits + self.hits_obsoletos) / consultas if consultas else 0.0,
+        }
+
+    def _manter_referencia(self, tarefa: asyncio.Task):
+        """Evita que tarefas de recarga em segundo plano sejam coletadas antes de terminar."""
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    def recarregar_em_segundo_plano(self, chaves: Iterable[Hashable],
+                                    carregador_lote: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        """Agenda a recarga de várias chaves obsoletas, ignorando as que já estão sendo recarregadas."""
+        pendentes = [chave for chave in chaves if chave not in self._recarregando]
+        if not pendentes:
+            return
+        self._recarregando.update(pendentes)
+        geracoes = {chave: self._geracao(chave) for chave in pendentes}
+
+        async def _recarregar():
+            try:
+                resultado = await carregador_lote(pendentes)
+                for chave in pendentes:
+                    self._definir_se_atual(chave, resultado.get(chave), geracoes[chave])
+            except Exception as e:
+                # Mantém os valores obsoletos: a próxima consulta tenta novamente
+                self.falhas_recarga += 1
+                logger.warning(f"Falha ao recarregar {len(pendentes)} chave(s) do cache '{self.nome}': {e}")
+            finally:
+                self._recarregando.difference_update(pendentes)
+
+        self._manter_referencia(asyncio.create_task(_recarregar()))
+
+    async def obter(self, chave: Hashable, carregador: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Read-through: retorna o valor em cache ou o carrega. Valores obsoletos são servidos
+        imediatamente enquanto a recarga ocorre em segundo plano; se a carga falhar, o último
+        valor conhecido (mesmo expirado) é usado antes de propagar o erro.
+        """
+        estado, valor = self.consultar(chave)
+        if estado == FRESCO:
+            return valor
+        if estado == OBSOLETO:
+            self.recarregar_em_segundo_plano([chave], lambda chaves: self._carregar_como_lote(chave, carregador))
+            return valor
+
+        try:
+            return await self._carregar(chave, carregador)
+        except Exception:
+            if estado == EXPIRADO:
+                logger.warning(f"Falha ao carregar '{chave}' no cache '{self.nome}'. Servindo o último valor conhecido.")
+                return valor
+            raise
+
+    async def recarregar(self, chave: Hashable, carregador: Callable[[], Awaitable[Any]]) -> Any:
+        """Carrega a chave mesmo que ainda esteja fresca, aproveitando uma carga já em andamento."""
+        return await self._carregar(chave, carregador)
+
+    @staticmethod
+    async def _carregar_como_lote(chave: Hashable, carregador: Callable[[], Awaitable[Any]]) -> Dict[Hashable, Any]:
+        return {chave: await carregador()}
+
+    async def _carregar(self, chave: Hashable, carregador: Callable[[], Awaitable[Any]]) -> Any:
+        """Carrega uma chave, agrupando chamadas concorrentes em uma única execução do carregador."""
+        futuro = self._carregando.get(chave)
+        if futuro is None:
+            geracao = self._geracao(chave)
+
+            async def _executar():
+                try:
+                    valor = await carregador()
+                    self._definir_se_atual(chave, valor, geracao)
+                    return valor
+                finally:
+                    # Depois de uma invalidação, outra carga da mesma chave pode já estar registrada
+                    if self._carregando.get(chave) is futuro:
+                        del self._carregando[chave]
+
+            futuro = asyncio.ensure_future(_executar())
+            self._carregando[chave] = futuro
+        # shield: o cancelamento de um chamador não cancela a carga compartilhada
+        return await asyncio.shield(futuro)
@@ -0,0 +1,80 @@
+# utils/indice_texto.py
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Set
+
+import unidecode
+
+TAMANHO_NGRAMA = 3
+
+
+def normalizar_texto(texto: str) -> str:
+    """Remove acentos, caixa e espaços repetidos (ex: " São  Paulo" -> "sao paulo")."""
+    return " ".join(unidecode.unidecode(texto or "").lower().split())
+
+
+def _ngramas(texto: str) -> Set[str]:
+    """Retorna os n-gramas de um texto já normalizado."""
+    return {texto[i:i + TAMANHO_NGRAMA] for i in range(len(texto) - TAMANHO_NGRAMA + 1)}
+
+
+class IndiceTexto:
+    """
+    Índice em memória de n-gramas para buscas por substring com acentos e caixa ignorados.
+    Os resultados são ranqueados: prefixo do texto, depois prefixo de palavra, depois substring.
+    A ordem original dos itens é usada como critério de desempate.
+    """
+
+    def __init__(self, itens: Iterable[Dict], campos: Sequence[str]):
+        self.itens: List[Dict] = list(itens)
+        self._textos: List[List[str]] = [
+            [normalizar_texto(str(item.get(campo) or "")) for campo in campos] for item in self.itens
+        ]
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        for posicao, textos in enumerate(self._textos):
+            for texto in textos:
+                for ngrama in _ngramas(texto):
+                    self._postings[ngrama].add(posicao)
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def _candidatos(self, termo: str) -> Iterable[int]:
+        """Restringe a busca aos itens que contêm todos os n-gramas do termo."""
+        if len(termo) < TAMANHO_NGRAMA:
+            return range(len(self.itens))
+
+        conjuntos = sorted((self._postings.get(ngrama, set()) for ngrama in _ngramas(termo)), key=len)
+        candidatos = set(conjuntos[0])
+        for conjunto in conjuntos[1:]:
+            candidatos &= conjunto
+            if not candidatos:
+                break
+        return candidatos
+
+    @staticmethod
+    def _rank(textos: List[str], termo: str):
+        """0 = prefixo do texto, 1 = prefixo de uma palavra, 2 = substring, None = sem correspondência."""
+        melhor = None
+        for texto in textos:
+            if texto.startswith(termo):
+                return 0
+            if f" {termo}" in texto:
+                melhor = 1
+            elif melhor is None and termo in texto:
+                melhor = 2
+        return melhor
+
+    def buscar(self, termo: str, limite: int = 25) -> List[Dict]:
+        """Busca itens cujo texto contém o termo, já ranqueados e limitados."""
+        termo = normalizar_texto(termo)
+        if not termo:
+            return self.itens[:limite]
+
+        ranqueados = []
+        for posicao in self._candidatos(termo):
+            rank = self._rank(self._textos[posicao], termo)
+            if rank is not None:
+                ranqueados.append((rank, posicao))
+
+        ranqueados.sort()
+        return [self.itens[posicao] for _, posicao in ranqueados[:limite]]
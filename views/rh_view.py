@@ -1,21 +1,26 @@
 # views/rh_views.py
 import discord
-import asyncio
 import logging
-from typing import Dict, List, Any
-from datetime import timedelta, datetime, date
-import io
+from typing import Dict, List
+from datetime import timedelta, datetime
 import os
-from decimal import Decimal
+from pathlib import Path
 
 # Importando os serviços e queries
-from services.portal_service import PortalDatabaseService
-from services.pdf_service import gerar_pdf_horas_extras
-from services.email_service import enviar_email_com_anexo
+from services.portal_service import portal_service
+from services.ledger_service import ledger_horas_extras
+from services.formulario_service import (
+    sanitizar_para_json, reidratar_formulario, gerar_e_armazenar_pdf, carimbar_pdf_armazenado
+)
+from services.pdf_storage import armazenamento_pdf
+from services.pdf_pool import pool_pdf
+from services.email_service import caixa_saida_email
+from database.db_manager import database
 from database.bot_queries import (
     criar_solicitacao, 
     atualizar_status_solicitacao, 
-    buscar_datas_bloqueadas, 
+    buscar_solicitacao,
+    registrar_pdf_solicitacao,
     cancelar_solicitacao
 )
 
@@ -40,20 +45,6 @@ def formatar_timedelta(td: timedelta) -> str:
     minutes, _ = divmod(remainder, 60)
     return f"{hours:02d}:{minutes:02d}"
 
-def sanitizar_para_json(data: Any) -> Any:
-    """Converte tipos de dados não serializáveis (Decimal, date, etc.) para tipos JSON."""
-    if isinstance(data, dict):
-        return {key: sanitizar_para_json(value) for key, value in data.items()}
-    if isinstance(data, list):
-        return [sanitizar_para_json(item) for item in data]
-    if isinstance(data, Decimal):
-        return float(data)
-    if isinstance(data, timedelta):
-        return data.total_seconds()
-    if isinstance(data, (date, datetime)):
-        return data.isoformat()
-    return data
-
 # --- Views do Fluxo de Aprovação em Etapas ---
 
 # ETAPA 1: View com Botões de Tipo de Compensação
@@ -106,7 +97,7 @@ class SelecaoDiasView(discord.ui.View):
         self.dados_colaborador = dados_colaborador
         self.id_discord = dados_colaborador['id_discord']
         self.tipo_compensacao = tipo_compensacao
-        self.db_service = PortalDatabaseService()
+        self.db_service = portal_service
         self.dias_detalhados_cache: List[Dict] = []
         self.dias_selecionados_cache: List[str] = []
 
@@ -127,13 +118,7 @@ class SelecaoDiasView(discord.ui.View):
 
     async def preparar_view(self):
         try:
-            dias_potenciais = self.db_service.buscar_detalhes_ponto_recente(self.id_discord)
-            datas_ja_bloqueadas = await buscar_datas_bloqueadas(int(self.id_discord))
-            set_datas_bloqueadas = set(datas_ja_bloqueadas)
-
-            self.dias_detalhados_cache = [
-                dia for dia in dias_potenciais if dia['data'] not in set_datas_bloqueadas
-            ]
+            self.dias_detalhados_cache = await ledger_horas_extras.buscar_dias_disponiveis(int(self.id_discord))
             
             if not self.dias_detalhados_cache:
                 self.add_item(discord.ui.Button(label="Nenhuma hora extra disponível para lançamento.", disabled=True))
@@ -218,15 +203,14 @@ class RevisaoFinalView(discord.ui.View):
             return
 
         try:
-            pdf_stream = await asyncio.get_running_loop().run_in_executor(None, gerar_pdf_horas_extras, self.dados_formulario)
-            pdf_bytes = pdf_stream.getvalue()
+            caminho_pdf = await armazenar_pdf_solicitacao(solicitacao_id, self.dados_formulario)
             
             nome_colaborador = self.dados_formulario['dados_colaborador']['nome'].replace(' ', '')
             data_hoje = datetime.now().strftime('%d%m%Y')
             nome_arquivo = f"{nome_colaborador}{data_hoje}.pdf"
             
-            pdf_file_for_dm = discord.File(io.BytesIO(pdf_bytes), filename=nome_arquivo)
-            view_encaminhar = EncaminharParaResponsavelView(solicitacao_id, self.dados_formulario, io.BytesIO(pdf_bytes))
+            pdf_file_for_dm = discord.File(str(caminho_pdf), filename=nome_arquivo)
+            view_encaminhar = EncaminharParaResponsavelView(solicitacao_id)
 
             await interaction.user.send(
                 "Seu formulário está pronto. Revise o PDF e, se estiver tudo certo, clique abaixo para enviá-lo ao seu responsável.",
@@ -247,115 +231,227 @@ class RevisaoFinalView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Solicitação cancelada.", embed=None, view=None)
         self.stop()
 
-# ETAPA 4.5: View de Encaminhamento para o COLABORADOR 
-class EncaminharParaResponsavelView(discord.ui.View):
-    def __init__(self, solicitacao_id: int, dados_formulario: Dict, pdf_stream: io.BytesIO):
-        super().__init__(timeout=3600.0) # Timeout de 1 hora para a ação
+# ETAPAS 4.5 e 5: Botões persistentes das solicitações
+# O custom_id de cada botão carrega a ação e o ID da solicitação ("solicitacao:<acao>:<id>"). Os botões
+# são registrados uma única vez com `bot.add_dynamic_items`, funcionam após reinicializações do bot e
+# carregam a solicitação do banco apenas quando clicados: nada da solicitação fica em memória.
+ACOES_SOLICITACAO = {
+    "encaminhar": {"label": "Enviar para o Responsável", "style": discord.ButtonStyle.primary, "emoji": "▶️"},
+    "cancelar": {"label": "Cancelar Solicitação", "style": discord.ButtonStyle.danger, "emoji": "✖️"},
+    "aprovar": {"label": "Aprovar", "style": discord.ButtonStyle.success, "emoji": None},
+    "reprovar": {"label": "Reprovar", "style": discord.ButtonStyle.danger, "emoji": None},
+}
+
+async def armazenar_pdf_solicitacao(solicitacao_id: int, dados_formulario: Dict, assinado: bool = False) -> Path:
+    """Gera o PDF, grava no armazenamento endereçado por conteúdo e vincula o hash à solicitação."""
+    pdf_hash = await pool_pdf.executar(gerar_e_armazenar_pdf, dados_formulario)
+    await registrar_pdf_solicitacao(solicitacao_id, pdf_hash, assinado=assinado)
+    return armazenamento_pdf.caminho(pdf_hash)
+
+async def obter_pdf_solicitacao(solicitacao: Dict, dados_formulario: Dict) -> Path:
+    """Caminho do PDF de revisão já armazenado; solicitações sem PDF armazenado têm o documento gerado uma única vez."""
+    pdf_hash = solicitacao.get("pdf_hash")
+    if pdf_hash and armazenamento_pdf.existe(pdf_hash):
+        return armazenamento_pdf.caminho(pdf_hash)
+    return await armazenar_pdf_solicitacao(solicitacao["id"], dados_formulario)
+
+async def assinar_pdf_solicitacao(solicitacao: Dict, dados_formulario: Dict, dados_aprovador: Dict) -> str:
+    """
+    Gera o PDF assinado carimbando o bloco de assinatura sobre o PDF de revisão já armazenado; se o
+    documento não tiver o espaço reservado (ex: PDFs antigos), gera o documento assinado por completo.
+    Retorna o hash do PDF assinado, que só é vinculado à solicitação na aprovação.
+    """
+    caminho_pdf = await obter_pdf_solicitacao(solicitacao, dados_formulario)
+    try:
+        return await pool_pdf.executar(carimbar_pdf_armazenado, caminho_pdf.stem, dados_aprovador)
+    except ValueError as e:
+        logger.warning(f"Não foi possível carimbar o PDF da solicitação {solicitacao['id']} ({e}). Gerando o documento completo.")
+        dados_para_assinar = dict(dados_formulario)  # shallow copy
+        dados_para_assinar["dados_aprovador"] = dados_aprovador
+        return await pool_pdf.executar(gerar_e_armazenar_pdf, dados_para_assinar)
+
+async def decidir_solicitacao(solicitacao_id: int, status: str, responsavel_id: int) -> bool:
+    """
+    Transição condicional de uma solicitação pendente para `status`. Retorna False se ela já tinha
+    sido decidida; se o banco falhou e ela continua pendente, levanta RuntimeError.
+    """
+    if await atualizar_status_solicitacao(solicitacao_id, status, responsavel_id,
+                                          status_atual='PENDENTE_APROVACAO_RESPONSAVEL'):
+        return True
+    # Sem a transição, ou outra decisão chegou antes, ou o banco falhou
+    atual = await buscar_solicitacao(solicitacao_id)
+    if atual and atual["status"] == 'PENDENTE_APROVACAO_RESPONSAVEL':
+        raise RuntimeError("não foi possível atualizar o status da solicitação.")
+    return False
+
+async def aprovar_solicitacao(solicitacao_id: int, responsavel_id: int, dados_formulario: Dict, pdf_assinado_hash: str) -> bool:
+    """
+    Aprova a solicitação, vincula o PDF assinado e grava o e-mail para o RH numa única transação:
+    ou tudo fica registrado, ou a solicitação continua pendente. Retorna False se ela já tinha sido
+    decidida; falhas do banco ou da composição do e-mail são propagadas.
+    """
+    async with database.transaction():
+        if not await decidir_solicitacao(solicitacao_id, 'APROVADO', responsavel_id):
+            return False
+        if not await registrar_pdf_solicitacao(solicitacao_id, pdf_assinado_hash, assinado=True):
+            raise RuntimeError("não foi possível vincular o PDF assinado à solicitação.")
+        await caixa_saida_email.gravar_horas_extras(dados_formulario, pdf_assinado_hash)
+    caixa_saida_email.disparar()
+    return True
+
+def nome_arquivo_solicitacao(dados_formulario: Dict) -> str:
+    return f"Solicitacao_{dados_formulario['dados_colaborador']['nome'].replace(' ', '')}.pdf"
+
+class BotaoSolicitacao(discord.ui.DynamicItem[discord.ui.Button], template=r"solicitacao:(?P<acao>encaminhar|cancelar|aprovar|reprovar):(?P<id>[0-9]+)"):
+    def __init__(self, acao: str, solicitacao_id: int, disabled: bool = False):
+        self.acao = acao
         self.solicitacao_id = solicitacao_id
-        self.dados_formulario = dados_formulario
-        self.pdf_stream = pdf_stream
+        super().__init__(discord.ui.Button(
+            custom_id=f"solicitacao:{acao}:{solicitacao_id}", disabled=disabled, row=0, **ACOES_SOLICITACAO[acao]
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["acao"], int(match["id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        solicitacao = await buscar_solicitacao(self.solicitacao_id)
+        if not solicitacao:
+            await interaction.response.edit_message(content="⚠️ Esta solicitação não foi encontrada.", view=None)
+            return
+        if solicitacao["status"] != 'PENDENTE_APROVACAO_RESPONSAVEL':
+            await interaction.response.edit_message(content="⚠️ Esta solicitação já foi finalizada.", view=None)
+            return
+
+        dados_formulario = reidratar_formulario(solicitacao["dados_formulario"])
+        if self.acao in ("encaminhar", "cancelar"):
+            if interaction.user.id != solicitacao["solicitante_discord_id"]:
+                await interaction.response.send_message("❌ Apenas o autor pode agir sobre esta solicitação.", ephemeral=True)
+                return
+        elif str(interaction.user.id) != str(dados_formulario['dados_colaborador'].get('responsavel_id_discord')):
+            await interaction.response.send_message("❌ Apenas o responsável pode decidir esta solicitação.", ephemeral=True)
+            return
 
-    @discord.ui.button(label="Enviar para o Responsável", style=discord.ButtonStyle.primary, emoji="▶️", row=0)
-    async def encaminhar(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await getattr(self, f"_{self.acao}")(interaction, solicitacao, dados_formulario)
+
+    # ETAPA 4.5: ações do COLABORADOR
+    async def _encaminhar(self, interaction: discord.Interaction, solicitacao: Dict, dados_formulario: Dict):
         # Desabilita todos os botões para evitar cliques duplos
-        for item in self.children:
-            item.disabled = True
-        await interaction.response.edit_message(content="🔄 Encaminhando para o seu responsável para aprovação...", view=self)
-        
-        responsavel_id_discord = self.dados_formulario['dados_colaborador'].get('responsavel_id_discord') ## MUDAR RESPNSAVEL AQUI
+        await interaction.response.edit_message(
+            content="🔄 Encaminhando para o seu responsável para aprovação...",
+            view=EncaminharParaResponsavelView(self.solicitacao_id, desabilitado=True)
+        )
+
+        responsavel_id_discord = dados_formulario['dados_colaborador'].get('responsavel_id_discord') ## MUDAR RESPNSAVEL AQUI
         if not responsavel_id_discord:
-            await interaction.edit_original_response(content="❌ Não foi possível encontrar o Discord do seu responsável no sistema.")
+            await interaction.edit_original_response(
+                content="❌ Não foi possível encontrar o Discord do seu responsável no sistema.",
+                view=EncaminharParaResponsavelView(self.solicitacao_id)
+            )
             return
 
-        nome_arquivo = f"Solicitacao_{self.dados_formulario['dados_colaborador']['nome'].replace(' ', '')}.pdf"
-        self.pdf_stream.seek(0)
-        pdf_file = discord.File(self.pdf_stream, filename=nome_arquivo)
-        view_aprovacao = AprovacaoResponsavelView(self.solicitacao_id, self.dados_formulario, self.pdf_stream)
-
         try:
+            # O arquivo é enviado direto do armazenamento, sem gerar nem carregar o PDF em memória novamente
+            caminho_pdf = await obter_pdf_solicitacao(solicitacao, dados_formulario)
+            pdf_file = discord.File(str(caminho_pdf), filename=nome_arquivo_solicitacao(dados_formulario))
             responsavel = await interaction.client.fetch_user(int(responsavel_id_discord))
             await responsavel.send(
-                f"Olá! Você recebeu uma nova solicitação de horas extras de **{self.dados_formulario['dados_colaborador']['nome']}** para aprovação.",
+                f"Olá! Você recebeu uma nova solicitação de horas extras de **{dados_formulario['dados_colaborador']['nome']}** para aprovação.",
                 file=pdf_file,
-                view=view_aprovacao
+                view=AprovacaoResponsavelView(self.solicitacao_id)
             )
             await interaction.edit_original_response(content="✅ Formulário enviado com sucesso para o seu responsável!")
         except Exception as e:
             logger.error(f"Falha ao enviar DM para o responsável {responsavel_id_discord}: {e}")
-            await interaction.edit_original_response(content="❌ Falha ao enviar a solicitação para o seu responsável.")
-        
-        self.stop()
+            # Reabilita os botões para que o envio possa ser repetido (ou a solicitação cancelada)
+            await interaction.edit_original_response(
+                content="❌ Falha ao enviar a solicitação para o seu responsável. Tente novamente em instantes.",
+                view=EncaminharParaResponsavelView(self.solicitacao_id)
+            )
 
-    # --- BOTÃO NOVO ADICIONADO AQUI ---
-    @discord.ui.button(label="Cancelar Solicitação", style=discord.ButtonStyle.danger, emoji="✖️", row=0)
-    async def cancelar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Desabilita todos os botões
-        for item in self.children:
-            item.disabled = True
-        
-        # Atualiza o status no banco de dados
+    async def _cancelar(self, interaction: discord.Interaction, solicitacao: Dict, dados_formulario: Dict):
         success = await cancelar_solicitacao(self.solicitacao_id, interaction.user.id)
-        
+        view_desabilitada = EncaminharParaResponsavelView(self.solicitacao_id, desabilitado=True)
         if success:
-            await interaction.response.edit_message(content="❌ Sua solicitação foi cancelada com sucesso.", view=self)
+            await interaction.response.edit_message(content="❌ Sua solicitação foi cancelada com sucesso.", view=view_desabilitada)
         else:
-            await interaction.response.edit_message(content="⚠️ Ocorreu um erro ao tentar cancelar sua solicitação.", view=self)
-
-        self.stop()
-
-# ETAPA 5: View de Aprovação para o RESPONSÁVEL 
-class AprovacaoResponsavelView(discord.ui.View):
-    def __init__(self, solicitacao_id: int, dados_formulario: Dict, pdf_original_stream: io.BytesIO):
-        super().__init__(timeout=86400)
-        self.solicitacao_id = solicitacao_id
-        self.dados_formulario = dados_formulario
-        self.pdf_original_stream = pdf_original_stream
+            await interaction.response.edit_message(content="⚠️ Ocorreu um erro ao tentar cancelar sua solicitação.", view=view_desabilitada)
 
-    @discord.ui.button(label="Aprovar", style=discord.ButtonStyle.success)
-    async def aprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
+    # ETAPA 5: ações do RESPONSÁVEL
+    async def _aprovar(self, interaction: discord.Interaction, solicitacao: Dict, dados_formulario: Dict):
         await interaction.response.edit_message(content="🔄 Processando aprovação e assinando o PDF...", view=None)
-        
+
         dados_aprovador = {
             "nome": interaction.user.display_name,
             "id_discord": interaction.user.id,
             "data_hora": datetime.now().strftime('%d/%m/%Y às %H:%M:%S')
         }
-        
-        dados_para_assinar = dict(self.dados_formulario)  # shallow copy
-        dados_para_assinar["dados_aprovador"] = dados_aprovador
-
 
-        loop = asyncio.get_running_loop()
-        pdf_assinado_stream = await loop.run_in_executor(None, gerar_pdf_horas_extras, dados_para_assinar)
-        success = await loop.run_in_executor(None, enviar_email_com_anexo, self.dados_formulario, pdf_assinado_stream)
+        try:
+            # Assina antes de decidir: se algo falhar, a solicitação continua pendente e o botão pode ser usado de novo.
+            # A transição de status é condicional: um segundo clique não gera outra aprovação nem outro e-mail.
+            pdf_assinado_hash = await assinar_pdf_solicitacao(solicitacao, dados_formulario, dados_aprovador)
+            aprovada = await aprovar_solicitacao(self.solicitacao_id, interaction.user.id, dados_formulario, pdf_assinado_hash)
+        except Exception as e:
+            logger.error(f"Falha ao aprovar a solicitação {self.solicitacao_id}: {e}", exc_info=True)
+            await interaction.edit_original_response(
+                content="❌ Não foi possível concluir a aprovação. A solicitação continua pendente; tente novamente em instantes.",
+                view=AprovacaoResponsavelView(self.solicitacao_id)
+            )
+            return
+        if not aprovada:
+            await interaction.edit_original_response(content="⚠️ Esta solicitação já foi finalizada.")
+            return
 
-        await atualizar_status_solicitacao(self.solicitacao_id, 'APROVADO', interaction.user.id)
+        await self._notificar_colaborador(
+            interaction, dados_formulario,
+            f"✅ Boas notícias! Sua solicitação de horas extras foi **aprovada** por {interaction.user.display_name}."
+        )
+        await interaction.edit_original_response(content=f"✅ Solicitação de {dados_formulario['dados_colaborador']['nome']} **aprovada** com sucesso!")
 
-        # Notifica o colaborador que fez a solicitação original.
+    async def _reprovar(self, interaction: discord.Interaction, solicitacao: Dict, dados_formulario: Dict):
+        await interaction.response.edit_message(content="🔄 Registrando a reprovação...", view=None)
         try:
-            colaborador_id = int(self.dados_formulario['dados_colaborador']['id_discord'])
-            colaborador = await interaction.client.fetch_user(colaborador_id)
-            if colaborador:
-                await colaborador.send(f"✅ Boas notícias! Sua solicitação de horas extras foi **aprovada** por {interaction.user.display_name}.")
+            reprovada = await decidir_solicitacao(self.solicitacao_id, 'REPROVADO', interaction.user.id)
         except Exception as e:
-            logger.error(f"Falha ao notificar o colaborador {colaborador_id} sobre a aprovação: {e}")
+            logger.error(f"Falha ao reprovar a solicitação {self.solicitacao_id}: {e}", exc_info=True)
+            await interaction.edit_original_response(
+                content="❌ Não foi possível registrar a reprovação. A solicitação continua pendente; tente novamente em instantes.",
+                view=AprovacaoResponsavelView(self.solicitacao_id)
+            )
+            return
+        if not reprovada:
+            await interaction.edit_original_response(content="⚠️ Esta solicitação já foi finalizada.")
+            return
 
-        await interaction.edit_original_response(content=f"✅ Solicitação de {self.dados_formulario['dados_colaborador']['nome']} **aprovada** com sucesso!")
-        self.stop()
-        
-    @discord.ui.button(label="Reprovar", style=discord.ButtonStyle.danger)
-    async def reprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.edit_message(content="❌ Solicitação reprovada.", view=None)
-        await atualizar_status_solicitacao(self.solicitacao_id, 'REPROVADO', interaction.user.id)
+        await interaction.edit_original_response(content="❌ Solicitação reprovada.")
+
+        await self._notificar_colaborador(
+            interaction, dados_formulario,
+            f"❌ Sua solicitação de horas extras foi **reprovada** por {interaction.user.display_name}."
+        )
 
-        # --- MELHORIA APLICADA AQUI ---
-        # Notifica o colaborador sobre a reprovação.
+    @staticmethod
+    async def _notificar_colaborador(interaction: discord.Interaction, dados_formulario: Dict, mensagem: str):
+        """Notifica, por DM, o colaborador que fez a solicitação original."""
+        colaborador_id = dados_formulario['dados_colaborador'].get('id_discord')
         try:
-            colaborador_id = int(self.dados_formulario['dados_colaborador']['id_discord'])
-            colaborador = await interaction.client.fetch_user(colaborador_id)
+            colaborador = await interaction.client.fetch_user(int(colaborador_id))
             if colaborador:
-                await colaborador.send(f"❌ Sua solicitação de horas extras foi **reprovada** por {interaction.user.display_name}.")
+                await colaborador.send(mensagem)
         except Exception as e:
-            logger.error(f"Falha ao notificar o colaborador {colaborador_id} sobre a reprovação: {e}")
+            logger.error(f"Falha ao notificar o colaborador {colaborador_id}: {e}")
 
-        self.stop()
+# ETAPA 4.5: View de Encaminhamento para o COLABORADOR
+class EncaminharParaResponsavelView(discord.ui.View):
+    def __init__(self, solicitacao_id: int, desabilitado: bool = False):
+        super().__init__(timeout=None)
+        self.add_item(BotaoSolicitacao("encaminhar", solicitacao_id, disabled=desabilitado))
+        self.add_item(BotaoSolicitacao("cancelar", solicitacao_id, disabled=desabilitado))
+
+# ETAPA 5: View de Aprovação para o RESPONSÁVEL
+class AprovacaoResponsavelView(discord.ui.View):
+    def __init__(self, solicitacao_id: int):
+        super().__init__(timeout=None)
+        self.add_item(BotaoSolicitacao("aprovar", solicitacao_id))
+        self.add_item(BotaoSolicitacao("reprovar", solicitacao_id))